@@ -1,4 +1,5 @@
 # analyzer-portrait-of-talents/analyzer.py
+# Демонстрационный расчёт: сервис (main.py) считает полной моделью из analyzer_main.py.
 # Минимальная рабочая реализация функции analyze(assignment_id, answers),
 # которая на вход получает:
 #   - assignment_id: int
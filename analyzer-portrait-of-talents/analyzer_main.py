@@ -1,20 +1,86 @@
 # Модуль анализа результатов "Портрет Талантов"
 # Тест 1: P, A, E, I — ПОЛНОЕ СООТВЕТСТВИЕ ТЗ
 
-from typing import List, Dict, Any
-
-# === Шкала перевода баллов в проценты (точно по ТЗ) ===
-P_A_E_I_PERCENTS = {
-    0: 0.0, 1: 1.4, 2: 2.8, 3: 4.2, 4: 5.6, 5: 6.9, 6: 8.3, 7: 9.7, 8: 11.1, 9: 12.5,
-    10: 13.9, 11: 15.3, 12: 16.7, 13: 18.1, 14: 19.4, 15: 20.8, 16: 22.2, 17: 23.6, 18: 25.0,
-    19: 26.4, 20: 27.8, 21: 29.2, 22: 30.6, 23: 31.9, 24: 33.3, 25: 40.0, 26: 46.7, 27: 53.3,
-    28: 60.0, 29: 66.7, 30: 68.41, 31: 70.17, 32: 71.92, 33: 73.68, 34: 75.43, 35: 77.19,
-    36: 78.94, 37: 80.69, 38: 82.45, 39: 84.20, 40: 85.96, 41: 87.71, 42: 89.46, 43: 91.22,
-    44: 92.97, 45: 94.73, 46: 96.48, 47: 98.24, 48: 100.0
-}
+import re
+import json
+import heapq
+import hashlib
+import logging
+from bisect import bisect_left
+from time import perf_counter
+from types import MappingProxyType
+from typing import List, Dict, Any, Callable, Mapping, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # пакетный режим недоступен, построчный analyze работает без NumPy
+    np = None
+
+logger = logging.getLogger("analyzer")
+
+# === Шкала перевода баллов в проценты (точно по ТЗ; индекс — балл, значения уже округлены) ===
+P_A_E_I_PERCENTS = (
+    0.0, 1.4, 2.8, 4.2, 5.6, 6.9, 8.3, 9.7, 11.1, 12.5,  # 0–9
+    13.9, 15.3, 16.7, 18.1, 19.4, 20.8, 22.2, 23.6, 25.0, 26.4,  # 10–19
+    27.8, 29.2, 30.6, 31.9, 33.3, 40.0, 46.7, 53.3, 60.0, 66.7,  # 20–29
+    68.41, 70.17, 71.92, 73.68, 75.43, 77.19, 78.94, 80.69, 82.45, 84.2,  # 30–39
+    85.96, 87.71, 89.46, 91.22, 92.97, 94.73, 96.48, 98.24, 100.0,  # 40–48
+)
+
+# === Перевод балла в процент по таблице (общий для построчного и пакетного расчёта) ===
+# Балл вне таблицы (больше максимума, отрицательный или дробный) даёт 100.0
+PERCENT_OUT_OF_RANGE = 100.0
+
+def percent_lookup(table: Tuple[float, ...], score: Any) -> float:
+    if isinstance(score, float):
+        if not score.is_integer():
+            return PERCENT_OUT_OF_RANGE
+        score = int(score)
+    if 0 <= score < len(table):
+        return table[score]
+    return PERCENT_OUT_OF_RANGE
+
+# === Уровни выраженности: общие неизменяемые записи, выбираемые по таблице границ ===
+# Границы — верхние значения уровней включительно: bisect_left(границы, балл) даёт номер уровня.
+def level_record(level: str, indicator: str, category: str) -> Mapping[str, str]:
+    return MappingProxyType({"level": level, "indicator": indicator, "category": category})
+
+# === Ключи текстов интерпретаций ===
+# Стабильный ключ вида "paei.P.low" / "team.Sh.high" позволяет отдавать в ответе ссылку
+# на текст вместо самого текста; тексты клиенты берут один раз из каталога /interpretations.
+def text_keys(prefix: str, texts: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    return {
+        scale: {category: f"{prefix}.{scale}.{category}" for category in by_category}
+        for scale, by_category in texts.items()
+    }
+
+def percent_array(table: Tuple[float, ...]):
+    # NumPy-копия таблицы для пакетного расчёта; последний элемент — значение вне таблицы
+    return np.array(table + (PERCENT_OUT_OF_RANGE,))
+
+def percent_lookup_array(percents, raw):
+    outside = len(percents) - 1
+    inside = (raw >= 0) & (raw < outside) & (raw == np.floor(raw))
+    return percents[np.where(inside, raw, outside).astype(np.int64)]
+
+# === Топ-k шкал (общий для построчного и пакетного расчёта) ===
+# Порядок: по убыванию балла, при равенстве — шкала, стоящая раньше. Так же ведёт себя
+# устойчивая сортировка sorted(..., reverse=True), которой отчёты строились раньше.
+def top_k(scores: Sequence[Any], k: int) -> List[int]:
+    """Номера k шкал с наибольшими баллами."""
+    if len(scores) <= 4 * k:
+        # Несколько шкал (факторы мотивации) быстрее отсортировать целиком, чем вести кучу
+        return sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k]
+    return heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+
+def top_k_rows(score_matrix, k: int):
+    """(N, шкалы) -> (N, k): номера k наибольших шкал в каждой строке, с тем же порядком при равенстве."""
+    if np is None:
+        raise RuntimeError("Пакетный режим требует установленного numpy")
+    return np.argsort(-np.asarray(score_matrix), axis=1, kind="stable")[:, :k]
 
 # === Интерпретации по стилям (только поле 0 и поле 1, остальное — "Не выявлены.") ===
-INTERPRETATIONS = {
+PAEI_INTERPRETATIONS = {
     "P": {
         "low": (
             "Поле 0: Стиль \"Р\" внешне проявляется в нашей компетентности и нацеленности на успех. "
@@ -177,91 +243,48 @@ INTERPRETATIONS = {
     }
 }
 
-# === Определение уровня выраженности и индикатора ===
-def get_expression_level_and_indicator(raw_score: int) -> Dict[str, str]:
-    if raw_score <= 19:
-        return {"level": "низкий", "indicator": "red", "category": "low"}
-    elif raw_score <= 24:
-        return {"level": "потенциал", "indicator": "white", "category": "potential"}
-    elif raw_score <= 29:
-        return {"level": "средний", "indicator": "yellow", "category": "medium"}
-    else:
-        return {"level": "высокий", "indicator": "green", "category": "high"}
+PAEI_TEXT_KEYS = text_keys("paei", PAEI_INTERPRETATIONS)
 
-# === Тест 1: P, A, E, I ===
-def calculate_paei_scores(answers: List[Dict]) -> List[Dict]:
-    p_result = a_result = e_result = i_result = 0
-    for ans in answers:
-        q_id = ans['question_id']
-        val = ans['answer_value']
-        # P1-P12
-        if q_id in [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]:
-            p_result += val
-        # A1-A12
-        elif q_id in [13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24]:
-            a_result += val
-        # E1-E12
-        elif q_id in [25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36]:
-            e_result += val
-        # I1-I12
-        elif q_id in [37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48]:
-            i_result += val
+# === Определение уровня выраженности и индикатора ===
+PAEI_LEVEL_THRESHOLDS = (19, 24, 29)
+PAEI_LEVELS = (
+    level_record("низкий", "red", "low"),
+    level_record("потенциал", "white", "potential"),
+    level_record("средний", "yellow", "medium"),
+    level_record("высокий", "green", "high"),
+)
+
+def get_expression_level_and_indicator(raw_score: int) -> Mapping[str, str]:
+    return PAEI_LEVELS[bisect_left(PAEI_LEVEL_THRESHOLDS, raw_score)]
+
+# === Вопросы Теста 1 по шкалам ===
+# P1-P12 → вопросы 1–12, A1-A12 → 13–24, E1-E12 → 25–36, I1-I12 → 37–48
+PAEI_SCALE_ITEMS = {
+    "P": tuple(range(1, 13)),
+    "A": tuple(range(13, 25)),
+    "E": tuple(range(25, 37)),
+    "I": tuple(range(37, 49)),
+}
 
+def paei_results(state: Dict[str, Any]) -> List[Dict]:
     results = []
-
-    # P_result
-    p_level_info = get_expression_level_and_indicator(p_result)
-    p_interp = INTERPRETATIONS["P"][p_level_info["category"]]
-    results.append({
-        "parameter_name": "P_result",
-        "raw_score": p_result,
-        "standardized_score": round(P_A_E_I_PERCENTS.get(p_result, 100.0), 2),
-        "expression_level": p_level_info["level"],
-        "indicator": p_level_info["indicator"],
-        "interpretation_text": p_interp
-    })
-
-    # A_result
-    a_level_info = get_expression_level_and_indicator(a_result)
-    a_interp = INTERPRETATIONS["A"][a_level_info["category"]]
-    results.append({
-        "parameter_name": "A_result",
-        "raw_score": a_result,
-        "standardized_score": round(P_A_E_I_PERCENTS.get(a_result, 100.0), 2),
-        "expression_level": a_level_info["level"],
-        "indicator": a_level_info["indicator"],
-        "interpretation_text": a_interp
-    })
-
-    # E_result
-    e_level_info = get_expression_level_and_indicator(e_result)
-    e_interp = INTERPRETATIONS["E"][e_level_info["category"]]
-    results.append({
-        "parameter_name": "E_result",
-        "raw_score": e_result,
-        "standardized_score": round(P_A_E_I_PERCENTS.get(e_result, 100.0), 2),
-        "expression_level": e_level_info["level"],
-        "indicator": e_level_info["indicator"],
-        "interpretation_text": e_interp
-    })
-
-    # I_result
-    i_level_info = get_expression_level_and_indicator(i_result)
-    i_interp = INTERPRETATIONS["I"][i_level_info["category"]]
-    results.append({
-        "parameter_name": "I_result",
-        "raw_score": i_result,
-        "standardized_score": round(P_A_E_I_PERCENTS.get(i_result, 100.0), 2),
-        "expression_level": i_level_info["level"],
-        "indicator": i_level_info["indicator"],
-        "interpretation_text": i_interp
-    })
+    for scale, raw_score in zip(PAEI_SCALE_ITEMS, scale_scores(state, "paei")):
+        level_info = get_expression_level_and_indicator(raw_score)
+        results.append({
+            "parameter_name": f"{scale}_result",
+            "raw_score": raw_score,
+            "standardized_score": percent_lookup(P_A_E_I_PERCENTS, raw_score),
+            "expression_level": level_info["level"],
+            "indicator": level_info["indicator"],
+            "interpretation_text": PAEI_INTERPRETATIONS[scale][level_info["category"]],
+            "interpretation_key": PAEI_TEXT_KEYS[scale][level_info["category"]]
+        })
 
     return results
 
-# === Основная функция анализа ===
-def analyze(assignment_id: int, answers: List[Dict]) -> List[Dict]:
-    return calculate_paei_scores(answers)
+# === Тест 1: P, A, E, I ===
+def calculate_paei_scores(answers: List[Dict]) -> List[Dict]:
+    return paei_results(accumulate_scores(answers, TEST_SCORING_INDEXES["paei"]))
 
 ##############################*************************####################################
 
@@ -270,20 +293,17 @@ def analyze(assignment_id: int, answers: List[Dict]) -> List[Dict]:
 # Модуль анализа результатов "Портрет Талантов"
 # Тест 2: Эмоциональный интеллект — ПОЛНОЕ СООТВЕТСТВИЕ ТЗ
 
-from typing import List, Dict, Any
-
 # === Шкала для компетенций (0–18 баллов) ===
-EI_PERCENTS = {
-    0: 0.0, 1: 4.76, 2: 9.52, 3: 14.28, 4: 19.05, 5: 23.81, 6: 28.57,
-    7: 33.33, 8: 38.89, 9: 44.44, 10: 50.00, 11: 55.55, 12: 61.11,
-    13: 66.66, 14: 73.33, 15: 80.00, 16: 86.66, 17: 93.33, 18: 100.0
-}
+EI_PERCENTS = (
+    0.0, 4.76, 9.52, 14.28, 19.05, 23.81, 28.57, 33.33, 38.89, 44.44,  # 0–9
+    50.0, 55.55, 61.11, 66.66, 73.33, 80.0, 86.66, 93.33, 100.0,  # 10–18
+)
 
 # === Шкала для общего уровня EI (0–90 баллов) ===
-TOTAL_EI_PERCENTS = {i: min(round((i / 90.0) * 100, 2), 100.0) for i in range(91)}
+TOTAL_EI_PERCENTS = tuple(min(round((i / 90.0) * 100, 2), 100.0) for i in range(91))
 
 # === Интерпретации по компетенциям (дословно из ТЗ) ===
-INTERPRETATIONS = {
+EI_INTERPRETATIONS = {
     "emotional_awareness": {
         "low": "Эмоциональная осведомленность Респондента развита на низком уровне. Это может служить помехой в релевантной оценке Респондентом своих сильных сторон и ограничений, т.к. только в меньшей половине случаев Респонденту удается осознать свои эмоции и идентифицировать их причину. Рекомендуется рассматривать эту область как зону роста для Респондента.",
         "medium": "Эмоциональная осведомленность Респондента развита на среднем уровне. Это означает, что Респонденту не всегда удается осознавать свои эмоции и их последствия. Это происходит примерно в половине случаев. Тогда когда Респонденту это удается, он может оценить свои сильные стороны и ограничения, принять взвешенное решение.",
@@ -316,69 +336,73 @@ INTERPRETATIONS = {
     }
 }
 
-# === Определение уровня выраженности и индикатора ===
-def get_level_and_indicator(score: int) -> Dict[str, str]:
-    if score <= 7:
-        return {"level": "низкий", "indicator": "red", "category": "low"}
-    elif score <= 13:
-        return {"level": "средний", "indicator": "yellow", "category": "medium"}
-    else:
-        return {"level": "высокий", "indicator": "green", "category": "high"}
+EI_TEXT_KEYS = text_keys("ei", EI_INTERPRETATIONS)
 
-# === Тест 2: Эмоциональный интеллект ===
-def calculate_emotional_intelligence_scores(answers: List[Dict]) -> List[Dict]:
-    # Сопоставление: question_id -> answer_value
-    q_mapping = {ans['question_id']: ans['answer_value'] for ans in answers}
+# === Определение уровня выраженности и индикатора ===
+EI_LEVEL_THRESHOLDS = (7, 13)
+EI_LEVELS = (
+    level_record("низкий", "red", "low"),
+    level_record("средний", "yellow", "medium"),
+    level_record("высокий", "green", "high"),
+)
+
+def get_ei_level_and_indicator(score: int) -> Mapping[str, str]:
+    return EI_LEVELS[bisect_left(EI_LEVEL_THRESHOLDS, score)]
+
+# === Вопросы Теста 2 по компетенциям ===
+EI_COMPETENCY_ITEMS = {
+    "emotional_awareness": (1, 2, 4, 17, 19, 25),
+    "self_management": (3, 7, 8, 10, 18, 30),
+    "self_motivation": (5, 6, 13, 14, 16, 22),
+    "empathy": (9, 11, 20, 21, 23, 28),
+    "social_skills": (12, 15, 24, 26, 27, 29),
+}
 
-    # Расчёт баллов по компетенциям
-    emotional_awareness = sum(q_mapping.get(q, 0) for q in [1, 2, 4, 17, 19, 25])
-    self_management = sum(q_mapping.get(q, 0) for q in [3, 7, 8, 10, 18, 30])
-    self_motivation = sum(q_mapping.get(q, 0) for q in [5, 6, 13, 14, 16, 22])
-    empathy = sum(q_mapping.get(q, 0) for q in [9, 11, 20, 21, 23, 28])
-    social_skills = sum(q_mapping.get(q, 0) for q in [12, 15, 24, 26, 27, 29])
+def ei_results(state: Dict[str, Any]) -> List[Dict]:
+    competency_scores = scale_scores(state, "ei")
 
     # Общий уровень EI
-    total_ei = emotional_awareness + self_management + self_motivation + empathy + social_skills
+    total_ei = sum(competency_scores)
 
     results = []
 
     # Добавляем каждую компетенцию
-    for score, key in [
-        (emotional_awareness, "emotional_awareness"),
-        (self_management, "self_management"),
-        (self_motivation, "self_motivation"),
-        (empathy, "empathy"),
-        (social_skills, "social_skills")
-    ]:
-        level_info = get_level_and_indicator(score)
-        percentage = EI_PERCENTS.get(score, 100.0)
-        interpretation = INTERPRETATIONS[key][level_info["category"]]
+    for key, score in zip(EI_COMPETENCY_ITEMS, competency_scores):
+        level_info = get_ei_level_and_indicator(score)
+        percentage = percent_lookup(EI_PERCENTS, score)
+        interpretation = EI_INTERPRETATIONS[key][level_info["category"]]
 
         results.append({
             "parameter_name": key,
             "raw_score": score,
-            "standardized_score": round(percentage, 2),
+            "standardized_score": percentage,
             "expression_level": level_info["level"],
             "indicator": level_info["indicator"],
-            "interpretation_text": interpretation
+            "interpretation_text": interpretation,
+            "interpretation_key": EI_TEXT_KEYS[key][level_info["category"]]
         })
 
     # Добавляем общий уровень EI
-    total_level_info = get_level_and_indicator(total_ei)
-    total_percentage = TOTAL_EI_PERCENTS.get(total_ei, 100.0)
-    total_interpretation = INTERPRETATIONS["total_ei"][total_level_info["category"]]
+    total_level_info = get_ei_level_and_indicator(total_ei)
+    total_percentage = percent_lookup(TOTAL_EI_PERCENTS, total_ei)
+    total_interpretation = EI_INTERPRETATIONS["total_ei"][total_level_info["category"]]
 
     results.append({
         "parameter_name": "total_emotional_intelligence",
         "raw_score": total_ei,
-        "standardized_score": round(total_percentage, 2),
+        "standardized_score": total_percentage,
         "expression_level": total_level_info["level"],
         "indicator": total_level_info["indicator"],
-        "interpretation_text": total_interpretation
+        "interpretation_text": total_interpretation,
+        "interpretation_key": EI_TEXT_KEYS["total_ei"][total_level_info["category"]]
     })
 
     return results
 
+# === Тест 2: Эмоциональный интеллект ===
+def calculate_emotional_intelligence_scores(answers: List[Dict]) -> List[Dict]:
+    return ei_results(accumulate_scores(answers, TEST_SCORING_INDEXES["ei"]))
+
 #********** *** *** *** ***
 #********** ***
 #*********  ****
@@ -391,56 +415,49 @@ def calculate_emotional_intelligence_scores(answers: List[Dict]) -> List[Dict]:
 # === Шкалы перевода баллов в проценты (для каждой роли — отдельно, как в ТЗ) ===
 
 TEAM_ROLE_PERCENTS = {
-    'Im': {
-        0: 0.0, 1: 4.0, 2: 8.0, 3: 13.0, 4: 17.0, 5: 21.0, 6: 25.0, 7: 30.0, 8: 35.0,
-        9: 40.0, 10: 45.0, 11: 50.0, 12: 55.0, 13: 60.0, 14: 65.0, 15: 70.0, 16: 75.0,
-        17: 79.0, 18: 82.0, 19: 86.0, 20: 89.0, 21: 93.0, 22: 96.0, 23: 100.0, 24: 100.0,
-        25: 100.0, 26: 100.0, 27: 100.0, 28: 100.0, 29: 100.0, 30: 100.0, 31: 100.0,
-        32: 100.0, 33: 100.0, 34: 100.0, 35: 100.0
-    },
-    'CO': {
-        0: 0.0, 1: 4.0, 2: 8.0, 3: 13.0, 4: 17.0, 5: 21.0, 6: 25.0, 7: 31.0, 8: 38.0,
-        9: 44.0, 10: 50.0, 11: 58.0, 12: 67.0, 13: 75.0, 14: 80.0, 15: 85.0, 16: 90.0,
-        17: 95.0, 18: 100.0
-    },
-    'Sh': {
-        0: 0.0, 1: 3.0, 2: 6.0, 3: 9.0, 4: 13.0, 5: 16.0, 6: 19.0, 7: 22.0, 8: 25.0,
-        9: 30.0, 10: 35.0, 11: 40.0, 12: 45.0, 13: 50.0, 14: 56.0, 15: 63.0, 16: 69.0,
-        17: 75.0, 18: 76.0, 19: 78.0, 20: 79.0, 21: 80.0, 22: 82.0, 23: 83.0, 24: 84.0,
-        25: 86.0, 26: 87.0, 27: 88.0, 28: 89.0, 29: 91.0, 30: 92.0, 31: 93.0, 32: 95.0,
-        33: 96.0, 34: 97.0, 35: 99.0, 36: 100.0
-    },
-    'Pl': {
-        0: 0.0, 1: 6.0, 2: 13.0, 3: 19.0, 4: 25.0, 5: 31.0, 6: 38.0, 7: 44.0, 8: 50.0,
-        9: 56.0, 10: 63.0, 11: 69.0, 12: 75.0, 13: 76.0, 14: 78.0, 15: 79.0, 16: 81.0,
-        17: 82.0, 18: 84.0, 19: 85.0, 20: 87.0, 21: 88.0, 22: 90.0, 23: 91.0, 24: 93.0,
-        25: 94.0, 26: 96.0, 27: 97.0, 28: 99.0, 29: 100.0
-    },
-    'RI': {
-        0: 0.0, 1: 4.0, 2: 8.0, 3: 13.0, 4: 17.0, 5: 21.0, 6: 25.0, 7: 33.0, 8: 42.0,
-        9: 50.0, 10: 63.0, 11: 75.0, 12: 78.0, 13: 80.0, 14: 83.0, 15: 85.0, 16: 88.0,
-        17: 90.0, 18: 93.0, 19: 95.0, 20: 98.0, 21: 100.0
-    },
-    'ME': {
-        0: 0.0, 1: 5.0, 2: 10.0, 3: 15.0, 4: 20.0, 5: 25.0, 6: 31.0, 7: 38.0, 8: 44.0,
-        9: 50.0, 10: 58.0, 11: 67.0, 12: 75.0, 13: 79.0, 14: 82.0, 15: 86.0, 16: 89.0,
-        17: 93.0, 18: 96.0, 19: 100.0
-    },
-    'TW': {
-        0: 0.0, 1: 3.0, 2: 6.0, 3: 9.0, 4: 13.0, 5: 16.0, 6: 19.0, 7: 22.0, 8: 25.0,
-        9: 31.0, 10: 38.0, 11: 44.0, 12: 50.0, 13: 56.0, 14: 63.0, 15: 69.0, 16: 75.0,
-        17: 78.0, 18: 81.0, 19: 83.0, 20: 86.0, 21: 89.0, 22: 92.0, 23: 94.0, 24: 97.0,
-        25: 100.0
-    },
-    'CF': {
-        0: 0.0, 1: 8.0, 2: 17.0, 3: 25.0, 4: 33.0, 5: 42.0, 6: 50.0, 7: 58.0, 8: 67.0,
-        9: 75.0, 10: 78.0, 11: 81.0, 12: 84.0, 13: 88.0, 14: 91.0, 15: 94.0, 16: 97.0,
-        17: 100.0
-    }
+    'Im': (
+        0.0, 4.0, 8.0, 13.0, 17.0, 21.0, 25.0, 30.0, 35.0, 40.0,  # 0–9
+        45.0, 50.0, 55.0, 60.0, 65.0, 70.0, 75.0, 79.0, 82.0, 86.0,  # 10–19
+        89.0, 93.0, 96.0, 100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 100.0,  # 20–29
+        100.0, 100.0, 100.0, 100.0, 100.0, 100.0,  # 30–35
+    ),
+    'CO': (
+        0.0, 4.0, 8.0, 13.0, 17.0, 21.0, 25.0, 31.0, 38.0, 44.0,  # 0–9
+        50.0, 58.0, 67.0, 75.0, 80.0, 85.0, 90.0, 95.0, 100.0,  # 10–18
+    ),
+    'Sh': (
+        0.0, 3.0, 6.0, 9.0, 13.0, 16.0, 19.0, 22.0, 25.0, 30.0,  # 0–9
+        35.0, 40.0, 45.0, 50.0, 56.0, 63.0, 69.0, 75.0, 76.0, 78.0,  # 10–19
+        79.0, 80.0, 82.0, 83.0, 84.0, 86.0, 87.0, 88.0, 89.0, 91.0,  # 20–29
+        92.0, 93.0, 95.0, 96.0, 97.0, 99.0, 100.0,  # 30–36
+    ),
+    'Pl': (
+        0.0, 6.0, 13.0, 19.0, 25.0, 31.0, 38.0, 44.0, 50.0, 56.0,  # 0–9
+        63.0, 69.0, 75.0, 76.0, 78.0, 79.0, 81.0, 82.0, 84.0, 85.0,  # 10–19
+        87.0, 88.0, 90.0, 91.0, 93.0, 94.0, 96.0, 97.0, 99.0, 100.0,  # 20–29
+    ),
+    'RI': (
+        0.0, 4.0, 8.0, 13.0, 17.0, 21.0, 25.0, 33.0, 42.0, 50.0,  # 0–9
+        63.0, 75.0, 78.0, 80.0, 83.0, 85.0, 88.0, 90.0, 93.0, 95.0,  # 10–19
+        98.0, 100.0,  # 20–21
+    ),
+    'ME': (
+        0.0, 5.0, 10.0, 15.0, 20.0, 25.0, 31.0, 38.0, 44.0, 50.0,  # 0–9
+        58.0, 67.0, 75.0, 79.0, 82.0, 86.0, 89.0, 93.0, 96.0, 100.0,  # 10–19
+    ),
+    'TW': (
+        0.0, 3.0, 6.0, 9.0, 13.0, 16.0, 19.0, 22.0, 25.0, 31.0,  # 0–9
+        38.0, 44.0, 50.0, 56.0, 63.0, 69.0, 75.0, 78.0, 81.0, 83.0,  # 10–19
+        86.0, 89.0, 92.0, 94.0, 97.0, 100.0,  # 20–25
+    ),
+    'CF': (
+        0.0, 8.0, 17.0, 25.0, 33.0, 42.0, 50.0, 58.0, 67.0, 75.0,  # 0–9
+        78.0, 81.0, 84.0, 88.0, 91.0, 94.0, 97.0, 100.0,  # 10–17
+    )
 }
 
 # === Интерпретации по ролям (дословно из ТЗ) ===
-INTERPRETATIONS = {
+TEAM_ROLE_INTERPRETATIONS = {
     "Im": {
         "low": (
             "Поле 1\n"
@@ -715,135 +732,86 @@ INTERPRETATIONS = {
     }
 }
 
+TEAM_ROLE_TEXT_KEYS = text_keys("team", TEAM_ROLE_INTERPRETATIONS)
+
 # === Определение уровня выраженности и индикатора для каждой роли ===
-def get_level_and_indicator(role: str, score: int) -> Dict[str, str]:
-    if role == "Im":
-        if score <= 6:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 11:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 16:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "CO":
-        if score <= 6:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 10:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 13:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "Sh":
-        if score <= 8:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 13:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 17:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "Pl":
-        if score <= 4:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 8:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 12:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "RI":
-        if score <= 6:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 9:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 11:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "ME":
-        if score <= 5:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 9:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 11:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "TW":
-        if score <= 8:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 12:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 16:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    elif role == "CF":
-        if score <= 3:
-            return {"level": "низкий", "indicator": "red", "category": "low"}
-        elif score <= 6:
-            return {"level": "средний", "indicator": "yellow", "category": "medium"}
-        elif score <= 9:
-            return {"level": "высокий", "indicator": "green", "category": "high"}
-        else:
-            return {"level": "очень высокий", "indicator": "blue", "category": "very_high"}
-    else:
-        return {"level": "неизвестный", "indicator": "white", "category": "unknown"}
+TEAM_ROLE_LEVEL_THRESHOLDS = {
+    "Im": (6, 11, 16),
+    "CO": (6, 10, 13),
+    "Sh": (8, 13, 17),
+    "Pl": (4, 8, 12),
+    "RI": (6, 9, 11),
+    "ME": (5, 9, 11),
+    "TW": (8, 12, 16),
+    "CF": (3, 6, 9),
+}
+TEAM_ROLE_LEVELS = (
+    level_record("низкий", "red", "low"),
+    level_record("средний", "yellow", "medium"),
+    level_record("высокий", "green", "high"),
+    level_record("очень высокий", "blue", "very_high"),
+)
+TEAM_ROLE_UNKNOWN_LEVEL = level_record("неизвестный", "white", "unknown")
+
+def get_level_and_indicator(role: str, score: int) -> Mapping[str, str]:
+    thresholds = TEAM_ROLE_LEVEL_THRESHOLDS.get(role)
+    if thresholds is None:
+        return TEAM_ROLE_UNKNOWN_LEVEL
+    return TEAM_ROLE_LEVELS[bisect_left(thresholds, score)]
+
+# === Вопросы и поля ответов Теста 3 ===
+# Вопросы B-N (97-104): ответ — словарь { "B1": 2, "B2": 0, ..., "B8": 1 }
+TEAM_ROLE_QUESTIONS = tuple(range(97, 105))
+TEAM_ROLE_FIELDS = {
+    "Im": ("B7", "D1", "F8", "H4", "J2", "L6", "N5"),
+    "CO": ("B4", "D2", "F1", "H8", "J6", "L3", "N7"),
+    "Sh": ("B6", "D5", "F3", "H2", "J4", "L7", "N1"),
+    "Pl": ("B3", "D7", "F4", "H5", "J8", "L1", "N6"),
+    "RI": ("B1", "D3", "F6", "H7", "J5", "L8", "N4"),
+    "ME": ("B8", "D4", "F7", "H3", "J1", "L5", "N2"),
+    "TW": ("B2", "D6", "F5", "H1", "J3", "L2", "N8"),
+    "CF": ("B5", "D8", "F2", "H6", "J7", "L4", "N3"),
+}
 
-# === Тест 3: Командные роли ===
-def calculate_team_roles_scores(answers: List[Dict]) -> List[Dict]:
-    # Собираем ответы: question_id -> { "B1": 2, "B2": 0, ..., "B8": 1 }
-    role_answers = {}
-    for ans in answers:
-        q_id = ans['question_id']
-        if 97 <= q_id <= 104:  # Вопросы B-N (97-104)
-            role_answers[q_id] = ans['answer_value']  # {"B1": 2, "B2": 0, ...}
-
-    roles = {
-        "Im": ["B7", "D1", "F8", "H4", "J2", "L6", "N5"],
-        "CO": ["B4", "D2", "F1", "H8", "J6", "L3", "N7"],
-        "Sh": ["B6", "D5", "F3", "H2", "J4", "L7", "N1"],
-        "Pl": ["B3", "D7", "F4", "H5", "J8", "L1", "N6"],
-        "RI": ["B1", "D3", "F6", "H7", "J5", "L8", "N4"],
-        "ME": ["B8", "D4", "F7", "H3", "J1", "L5", "N2"],
-        "TW": ["B2", "D6", "F5", "H1", "J3", "L2", "N8"],
-        "CF": ["B5", "D8", "F2", "H6", "J7", "L4", "N3"]
-    }
+# Обратный индекс: код поля ответа -> роль, в которую оно входит
+TEAM_ROLE_BY_FIELD = {field: role for role, fields in TEAM_ROLE_FIELDS.items() for field in fields}
+
+def team_role_totals(role_answers: Mapping[Any, Any]) -> Dict[str, Any]:
+    # Один проход по полям присланных словарей — вместо перебора роль × поле × вопрос
+    totals = dict.fromkeys(TEAM_ROLE_FIELDS, 0)
+    for q_answers in role_answers.values():
+        if not isinstance(q_answers, dict):
+            continue
+        for field, value in q_answers.items():
+            role = TEAM_ROLE_BY_FIELD.get(field)
+            if role is not None:
+                totals[role] += value
+    return totals
+
+def team_roles_results(state: Dict[str, Any]) -> List[Dict]:
+    totals = team_role_totals(captured_answers(state, "team_roles"))
 
     results = []
-    for role, fields in roles.items():
-        score = 0
-        for field in fields:
-            for q_answers in role_answers.values():
-                if field in q_answers:
-                    score += q_answers[field]
-        
+    for role, score in totals.items():
         level_info = get_level_and_indicator(role, score)
-        percentage = TEAM_ROLE_PERCENTS[role].get(score, 100.0)
-        interpretation = INTERPRETATIONS[role][level_info["category"]]
+        percentage = percent_lookup(TEAM_ROLE_PERCENTS[role], score)
+        interpretation = TEAM_ROLE_INTERPRETATIONS[role][level_info["category"]]
 
         results.append({
             "parameter_name": role,
             "raw_score": score,
-            "standardized_score": round(percentage, 2),
+            "standardized_score": percentage,
             "expression_level": level_info["level"],
             "indicator": level_info["indicator"],
-            "interpretation_text": interpretation
+            "interpretation_text": interpretation,
+            "interpretation_key": TEAM_ROLE_TEXT_KEYS[role][level_info["category"]]
         })
 
     return results
 
-# === Основная функция анализа ===
-def analyze(assignment_id: int, answers: List[Dict]) -> List[Dict]:
-    # Сначала Тест 1 (P, A, E, I)
-    results = calculate_paei_scores(answers)
-    # Затем Тест 2 (Эмоциональный интеллект)
-    results.extend(calculate_emotional_intelligence_scores(answers))
-    # Теперь Тест 3 (Командные роли)
-    results.extend(calculate_team_roles_scores(answers))
-    return results
+# === Тест 3: Командные роли ===
+def calculate_team_roles_scores(answers: List[Dict]) -> List[Dict]:
+    return team_roles_results(accumulate_scores(answers, TEST_SCORING_INDEXES["team_roles"]))
 
 ######
 
@@ -851,83 +819,16 @@ def analyze(assignment_id: int, answers: List[Dict]) -> List[Dict]:
 
 ######
 
-# Модуль анализа результатов "Портрет Талантов"
-# Тест 4: Мотивация — ПОЛНОЕ СООТВЕТСТВИЕ ТЗ (дословно)
-
-# === Шкала перевода баллов в проценты (0–35 баллов) ===
-SCORE_TO_PERCENT = {
-    0: 0.0, 1: 4.0, 2: 7.0, 3: 11.0, 4: 14.0, 5: 18.0, 6: 21.0, 7: 25.0,
-    8: 30.0, 9: 35.0, 10: 40.0, 11: 45.0, 12: 50.0, 13: 56.0, 14: 63.0,
-    15: 69.0, 16: 75.0, 17: 76.0, 18: 78.0, 19: 79.0, 20: 80.0,
-    21: 82.0, 22: 83.0, 23: 84.0, 24: 86.0, 25: 87.0, 26: 88.0,
-    27: 89.0, 28: 91.0, 29: 92.0, 30: 93.0, 31: 95.0, 32: 96.0,
-    33: 97.0, 34: 99.0, 35: 100.0
-}
-
-# === Тексты для высоких и очень высоких факторов ===
-FACTOR_TEXTS = {
-    "financial": (
-        "Респондент имеет высокий уровень мотивации к финансовым успехам. Это может быть обусловлено различными причинами: "
-        "ориентация на получение дохода через достижение результатов, неудовлетворенность текущей материальной мотивацией, "
-        "отсутствие прозрачности в системе материального вознаграждения и понимания основных принципов процесса, "
-        "ощущение несправедливости в размере материального вознаграждения в сравнении с другими. "
-        "Конкретную причину рекомендуется выяснять через очное интервью либо через проведение дополнительных, более глубинных исследований факторов мотивации."
-    ),
-    "recognition": (
-        "Высокий уровень стремления Респондента к общественному признанию может быть обусловлен факторами внутренней мотивации на признание собственных результатов. "
-        "Это может быть стремление к признанию достижений как публично так и индивидуально. В данном случае стоит избегать ситуаций размытия достижений, "
-        "т.е. когда достижение в большей степени обеспечено Респондентом, но присваивается всей команде или тем, кто не участвовал в работе. "
-        "Данный мотиватор стоит учесть в дальнейшем взаимодействии с Респондентом и учитывать в управлении, форме обратной связи. "
-        "Стоит уделять внимание признанию результатов Респондента. Такой подход будет влиять на мотивацию Респондента положительно."
-    ),
-    "leadership_relations": (
-# Модуль анализа результатов "Портрет Талантов"
-# Тест 4: Мотивация — ПОЛНОЕ СООТВЕТСТВИЕ ТЗ (дословно)
-
-from typing import List, Dict, Any
-
-# === Шкала перевода баллов в проценты (0–35 баллов) ===
-SCORE_TO_PERCENT = {
-    0: 0.0, 1: 4.0, 2: 7.0, 3: 11.0, 4: 14.0, 5: 18.0, 6: 21.0, 7: 25.0,
-    8: 30.0, 9: 35.0, 10: 40.0, 11: 45.0, 12: 50.0, 13: 56.0, 14: 63.0,
-    15: 69.0, 16: 75.0, 17: 76.0, 18: 78.0, 19: 79.0, 20: 80.0,
-    21: 82.0, 22: 83.0, 23: 84.0, 24: 86.0, 25: 87.0, 26: 88.0,
-    27: 89.0, 28: 91.0, 29: 92.0, 30: 93.0, 31: 95.0, 32: 96.0,
-    33: 97.0, 34: 99.0, 35: 100.0
-}
-
-# === Тексты для высоких и очень высоких факторов ===
-FACTOR_TEXTS = {
-    "financial": (
-        "Респондент имеет высокий уровень мотивации к финансовым успехам. Это может быть обусловлено различными причинами: "
-        "ориентация на получение дохода через достижение результатов, неудовлетворенность текущей материальной мотивацией, "
-        "отсутствие прозрачности в системе материального вознаграждения и понимания основных принципов процесса, "
-        "ощущение несправедливости в размере материального вознаграждения в сравнении с другими. "
-        "Конкретную причину рекомендуется выяснять через очное интервью либо через проведение дополнительных, более глубинных исследований факторов мотивации."
-    ),
-    "recognition": (
-        "Высокий уровень стремления Респондента к общественному признанию может быть обусловлен факторами внутренней мотивации на признание собственных результатов. "
-        "Это может быть стремление к признанию достижений как публично так и индивидуально. В данном случае стоит избегать ситуаций размытия достижений, "
-        "т.е. когда достижение в большей степени обеспечено Респондентом, но присваивается всей команде или тем, кто не участвовал в работе. "
-        "Данный мотиватор стоит учесть в дальнейшем взаимодействии с Респондентом и учитывать в управлении, форме обратной связи. "
-        "Стоит уделять внимание признанию результатов Респондента. Такой подход будет влиять на мотивацию Респондента положительно."
-    ),
-    "leadership_relations": (
-cat > analyzer-portrait-of-talents/analyzer.py << 'EOF'
 # Модуль анализа результатов "Портрет Талантов"
 # Тест 4: Мотивация — ПОЛНОЕ СООТВЕТСТВИЕ ТЗ + ДОПОЛНИТЕЛЬНАЯ МЕТРИКА
 
-from typing import List, Dict, Any
-
 # === Шкала перевода баллов в проценты (0–35 баллов) ===
-SCORE_TO_PERCENT = {
-    0: 0.0, 1: 4.0, 2: 7.0, 3: 11.0, 4: 14.0, 5: 18.0, 6: 21.0, 7: 25.0,
-    8: 30.0, 9: 35.0, 10: 40.0, 11: 45.0, 12: 50.0, 13: 56.0, 14: 63.0,
-    15: 69.0, 16: 75.0, 17: 76.0, 18: 78.0, 19: 79.0, 20: 80.0,
-    21: 82.0, 22: 83.0, 23: 84.0, 24: 86.0, 25: 87.0, 26: 88.0,
-    27: 89.0, 28: 91.0, 29: 92.0, 30: 93.0, 31: 95.0, 32: 96.0,
-    33: 97.0, 34: 99.0, 35: 100.0
-}
+SCORE_TO_PERCENT = (
+    0.0, 4.0, 7.0, 11.0, 14.0, 18.0, 21.0, 25.0, 30.0, 35.0,  # 0–9
+    40.0, 45.0, 50.0, 56.0, 63.0, 69.0, 75.0, 76.0, 78.0, 79.0,  # 10–19
+    80.0, 82.0, 83.0, 84.0, 86.0, 87.0, 88.0, 89.0, 91.0, 92.0,  # 20–29
+    93.0, 95.0, 96.0, 97.0, 99.0, 100.0,  # 30–35
+)
 
 # === Тексты для высоких и очень высоких факторов ===
 FACTOR_TEXTS = {
@@ -974,50 +875,106 @@ FACTOR_TEXTS = {
     )
 }
 
+FACTOR_TEXT_KEYS = {key: f"motivation.{key}" for key in FACTOR_TEXTS}
+
 # === Определение уровня выраженности и индикатора ===
-def get_expression_level_and_indicator(percentage: float, is_motivational: bool) -> Dict[str, str]:
-    if percentage <= 25.0:
-        level = "низкий"
-        indicator = "green" if not is_motivational else "red"
-    elif percentage <= 50.0:
-        level = "средний"
-        indicator = "green" if not is_motivational else "yellow"
-    elif percentage <= 75.0:
-        level = "высокий"
-        indicator = "yellow" if not is_motivational else "green"
-    else:
-        level = "очень высокий"
-        indicator = "red" if not is_motivational else "green"
-    return {"level": level, "indicator": indicator}
+# Границы по проценту; индикатор зависит от того, гигиенический фактор или мотивирующий
+MOTIVATION_LEVEL_THRESHOLDS = (25.0, 50.0, 75.0)
+MOTIVATION_LEVELS = {
+    False: (
+        level_record("низкий", "green", "low"),
+        level_record("средний", "green", "medium"),
+        level_record("высокий", "yellow", "high"),
+        level_record("очень высокий", "red", "very_high"),
+    ),
+    True: (
+        level_record("низкий", "red", "low"),
+        level_record("средний", "yellow", "medium"),
+        level_record("высокий", "green", "high"),
+        level_record("очень высокий", "green", "very_high"),
+    ),
+}
 
-# === Тест 4: Мотивация ===
-def calculate_motivation_scores(answers: List[Dict]) -> List[Dict]:
-    # Собираем ответы: question_id -> значение
-    q_mapping = {}
-    for ans in answers:
-        q_id = ans['question_id']
-        val = ans['answer_value']
-        if isinstance(val, dict):
-            if 'value' in val:
-                q_mapping[q_id] = val['value']
-            elif 'score' in val:
-                q_mapping[q_id] = val['score']
-        elif isinstance(val, (int, float)):
-            q_mapping[q_id] = val
-        else:
-            q_mapping[q_id] = 0
+def get_motivation_level_and_indicator(percentage: float, is_motivational: bool) -> Mapping[str, str]:
+    return MOTIVATION_LEVELS[bool(is_motivational)][bisect_left(MOTIVATION_LEVEL_THRESHOLDS, percentage)]
 
-    # Гигиенические факторы
-    financial = sum(q_mapping.get(q, 0) for q in [1, 8, 14, 15, 22, 23, 46])
-    recognition = sum(q_mapping.get(q, 0) for q in [2, 9, 18, 19, 30, 36, 49])
-    leadership_relations = sum(q_mapping.get(q, 0) for q in [3, 16, 32, 35, 40, 41, 5])
-    team_collaboration = sum(q_mapping.get(q, 0) for q in [11, 20, 25, 31, 45, 51, 55])
+# === Вопросы Теста 4 по факторам ===
+# Гигиенические факторы
+HYGIENE_FACTOR_ITEMS = {
+    "financial": (1, 8, 14, 15, 22, 23, 46),
+    "recognition": (2, 9, 18, 19, 30, 36, 49),
+    "leadership_relations": (3, 16, 32, 35, 40, 41, 5),
+    "team_collaboration": (11, 20, 25, 31, 45, 51, 55),
+}
+# Факторы мотивации
+MOTIVATION_FACTOR_ITEMS = {
+    "responsibility": (4, 13, 17, 26, 27, 33, 47),
+    "career": (7, 28, 37, 42, 44, 50, 52),
+    "achievement": (24, 29, 38, 39, 48, 53, 56),
+    "work_content": (10, 12, 21, 34, 43, 54, 6),
+}
+HYGIENE_FACTORS = tuple(HYGIENE_FACTOR_ITEMS)
+MOTIVATION_FACTORS = tuple(MOTIVATION_FACTOR_ITEMS)
+
+FACTOR_NAMES = {
+    "financial": "Финансовые мотивы",
+    "recognition": "Общественное признание",
+    "leadership_relations": "Отношение с руководством",
+    "team_collaboration": "Сотрудничество в коллективе",
+    "responsibility": "Ответственность работы",
+    "career": "Карьера - продвижение по службе",
+    "achievement": "Достижение личного успеха",
+    "work_content": "Содержание работы",
+}
 
-    # Факторы мотивации
-    responsibility = sum(q_mapping.get(q, 0) for q in [4, 13, 17, 26, 27, 33, 47])
-    career = sum(q_mapping.get(q, 0) for q in [7, 28, 37, 42, 44, 50, 52])
-    achievement = sum(q_mapping.get(q, 0) for q in [24, 29, 38, 39, 48, 53, 56])
-    work_content = sum(q_mapping.get(q, 0) for q in [10, 12, 21, 34, 43, 54, 6])
+# === Поля отчёта (report_field_1…8) ===
+# Пара полей «название фактора, текст» на каждый из двух ведущих факторов группы:
+# 1–4 — гигиенические, 5–8 — мотивирующие. Строки собираются один раз при импорте:
+# MOTIVATION_REPORT_ROWS[группа][место в топе][номер фактора] -> (строка названия, строка текста)
+MOTIVATION_REPORT_TOP = 2
+
+def _report_row(field: int, text: str, key: str = None) -> Mapping[str, Any]:
+    row = {
+        "parameter_name": f"report_field_{field}",
+        "raw_score": 0,
+        "standardized_score": 0,
+        "expression_level": "report_field",
+        "indicator": "white",
+        "interpretation_text": text,
+    }
+    if key:
+        row["interpretation_key"] = key
+    return MappingProxyType(row)
+
+def _report_rows(factors: Tuple[str, ...], first_field: int) -> Tuple:
+    return tuple(
+        tuple(
+            (
+                _report_row(first_field + 2 * rank, FACTOR_NAMES[factor]),
+                _report_row(first_field + 2 * rank + 1, FACTOR_TEXTS[factor], FACTOR_TEXT_KEYS[factor]),
+            )
+            for factor in factors
+        )
+        for rank in range(MOTIVATION_REPORT_TOP)
+    )
+
+MOTIVATION_REPORT_ROWS = {
+    "hygiene": _report_rows(HYGIENE_FACTORS, 1),
+    "motivation": _report_rows(MOTIVATION_FACTORS, 5),
+}
+
+def motivation_report_fields(top_hygiene: Sequence[int], top_motivation: Sequence[int]) -> List[Mapping]:
+    # Общие неизменяемые записи, как и уровни выраженности: результаты разных назначений
+    # ссылаются на одни и те же строки, изменить их по ошибке нельзя
+    rows = []
+    for group, top in (("hygiene", top_hygiene), ("motivation", top_motivation)):
+        for rank, factor in enumerate(top):
+            rows.extend(MOTIVATION_REPORT_ROWS[group][rank][factor])
+    return rows
+
+def motivation_results(state: Dict[str, Any]) -> List[Dict]:
+    (financial, recognition, leadership_relations, team_collaboration,
+     responsibility, career, achievement, work_content) = scale_scores(state, "motivation")
 
     # Суммарные баллы
     total_hygiene = financial + recognition + leadership_relations + team_collaboration
@@ -1028,58 +985,39 @@ def calculate_motivation_scores(answers: List[Dict]) -> List[Dict]:
     motivation_percent = min(round((total_motivation / 140.0) * 100, 2), 100.0)
 
     # Определяем уровни для суммарных групп
-    hygiene_level_info = get_expression_level_and_indicator(hygiene_percent, False)
-    motivation_level_info = get_expression_level_and_indicator(motivation_percent, True)
-
-    # Список факторов для сортировки
-    hygiene_factors = [
-        ("financial", financial, "Финансовые мотивы"),
-        ("recognition", recognition, "Общественное признание"),
-        ("leadership_relations", leadership_relations, "Отношение с руководством"),
-        ("team_collaboration", team_collaboration, "Сотрудничество в коллективе")
-    ]
-    motivation_factors = [
-        ("responsibility", responsibility, "Ответственность работы"),
-        ("career", career, "Карьера - продвижение по службе"),
-        ("achievement", achievement, "Достижение личного успеха"),
-        ("work_content", work_content, "Содержание работы")
-    ]
-
-    # Сортируем по баллам (по убыванию)
-    sorted_hygiene = sorted(hygiene_factors, key=lambda x: x[1], reverse=True)
-    sorted_motivation = sorted(motivation_factors, key=lambda x: x[1], reverse=True)
+    hygiene_level_info = get_motivation_level_and_indicator(hygiene_percent, False)
+    motivation_level_info = get_motivation_level_and_indicator(motivation_percent, True)
 
-    # Берём топ-2
-    top_hygiene_1 = sorted_hygiene[0]
-    top_hygiene_2 = sorted_hygiene[1] if len(sorted_hygiene) > 1 else ("", 0, "")
-    top_motivation_1 = sorted_motivation[0]
-    top_motivation_2 = sorted_motivation[1] if len(sorted_motivation) > 1 else ("", 0, "")
+    hygiene_scores = (financial, recognition, leadership_relations, team_collaboration)
+    motivation_scores = (responsibility, career, achievement, work_content)
 
     results = []
 
     # Добавляем каждый фактор
-    for key, score, name in hygiene_factors:
-        percentage = SCORE_TO_PERCENT.get(score, 100.0)
-        level_info = get_expression_level_and_indicator(percentage, False)
+    for key, score in zip(HYGIENE_FACTORS, hygiene_scores):
+        percentage = percent_lookup(SCORE_TO_PERCENT, score)
+        level_info = get_motivation_level_and_indicator(percentage, False)
         results.append({
             "parameter_name": f"hygiene_{key}",
             "raw_score": score,
-            "standardized_score": round(percentage, 2),
+            "standardized_score": percentage,
             "expression_level": level_info["level"],
             "indicator": level_info["indicator"],
-            "interpretation_text": FACTOR_TEXTS.get(key, "Текст не найден.")
+            "interpretation_text": FACTOR_TEXTS.get(key, "Текст не найден."),
+            "interpretation_key": FACTOR_TEXT_KEYS.get(key)
         })
 
-    for key, score, name in motivation_factors:
-        percentage = SCORE_TO_PERCENT.get(score, 100.0)
-        level_info = get_expression_level_and_indicator(percentage, True)
+    for key, score in zip(MOTIVATION_FACTORS, motivation_scores):
+        percentage = percent_lookup(SCORE_TO_PERCENT, score)
+        level_info = get_motivation_level_and_indicator(percentage, True)
         results.append({
             "parameter_name": f"motivation_{key}",
             "raw_score": score,
-            "standardized_score": round(percentage, 2),
+            "standardized_score": percentage,
             "expression_level": level_info["level"],
             "indicator": level_info["indicator"],
-            "interpretation_text": FACTOR_TEXTS.get(key, "Текст не найден.")
+            "interpretation_text": FACTOR_TEXTS.get(key, "Текст не найден."),
+            "interpretation_key": FACTOR_TEXT_KEYS.get(key)
         })
 
     # Добавляем суммарные метрики
@@ -1120,29 +1058,17 @@ def calculate_motivation_scores(answers: List[Dict]) -> List[Dict]:
         "interpretation_text": burnout_interpretation
     })
 
-    # Добавляем 8 полей отчёта
-    report_fields = [
-        {"field": "1", "value": top_hygiene_1[2]},
-        {"field": "2", "value": FACTOR_TEXTS.get(top_hygiene_1[0], "Текст не найден.")},
-        {"field": "3", "value": top_hygiene_2[2]},
-        {"field": "4", "value": FACTOR_TEXTS.get(top_hygiene_2[0], "Текст не найден.")},
-        {"field": "5", "value": top_motivation_1[2]},
-        {"field": "6", "value": FACTOR_TEXTS.get(top_motivation_1[0], "Текст не найден.")},
-        {"field": "7", "value": top_motivation_2[2]},
-        {"field": "8", "value": FACTOR_TEXTS.get(top_motivation_2[0], "Текст не найден.")}
-    ]
-
-    for f in report_fields:
-        results.append({
-            "parameter_name": f"report_field_{f['field']}",
-            "raw_score": 0,
-            "standardized_score": 0,
-            "expression_level": "report_field",
-            "indicator": "white",
-            "interpretation_text": f"{f['value']}"
-        })
+    # Добавляем 8 полей отчёта: по два ведущих фактора каждой группы
+    results.extend(motivation_report_fields(
+        top_k(hygiene_scores, MOTIVATION_REPORT_TOP),
+        top_k(motivation_scores, MOTIVATION_REPORT_TOP),
+    ))
 
     return results
+
+# === Тест 4: Мотивация ===
+def calculate_motivation_scores(answers: List[Dict]) -> List[Dict]:
+    return motivation_results(accumulate_scores(answers, TEST_SCORING_INDEXES["motivation"]))
 #####################################
 ################             ########
 ###############    ##################
@@ -1155,12 +1081,9 @@ def calculate_motivation_scores(answers: List[Dict]) -> List[Dict]:
 #########               #############
 #####################################
 
-cat > analyzer-portrait-of-talents/analyzer.py << 'EOF'
 # Модуль анализа результатов "Портрет Талантов"
 # Тест 5: IQ — ПОЛНОЕ СООТВЕТСТВИЕ ТЗ (дословно)
 
-from typing import List, Dict, Any
-
 # === Ключ правильных ответов ===
 ANSWER_KEY = {
     "q1": [3],
@@ -1232,72 +1155,77 @@ SUBSCALES = {
 }
 
 # === Определение уровня интеллекта ===
+IQ_LEVEL_THRESHOLDS = (26.0, 36.0, 48.0, 58.0)
+IQ_LEVELS = ("низкий", "ниже среднего", "средний", "выше среднего", "высокий")
+
 def get_iq_level(percentage: float) -> str:
-    if percentage <= 26.0:
-        return "низкий"
-    elif percentage <= 36.0:
-        return "ниже среднего"
-    elif percentage <= 48.0:
-        return "средний"
-    elif percentage <= 58.0:
-        return "выше среднего"
-    else:
-        return "высокий"
+    return IQ_LEVELS[bisect_left(IQ_LEVEL_THRESHOLDS, percentage)]
+
+# === Предкомпилированный ключ ответов ===
+# Каждый ответ проверяется один раз; итог и субшкалы считаются по одному вектору вердиктов.
+# Ответ списком исторически засчитывается только в субшкалах (сравнение как множества целых),
+# а в общем балле считается неверным — отдельный вердикт сохраняет это поведение.
+IQ_MISSED, IQ_WRONG, IQ_CORRECT, IQ_SET_MATCH = range(4)
+
+class IQMatcher:
+    __slots__ = ("strings", "number", "int_set")
+
+    def __init__(self, correct_answers: List[Any]):
+        first = correct_answers[0]
+        # Строковые ключи: нормализованное множество вместо списка на каждый ответ
+        self.strings = frozenset(str(ca).strip() for ca in correct_answers) if isinstance(first, str) else None
+        self.number = float(first) if isinstance(first, (int, float)) else None
+        try:
+            self.int_set = sorted(int(ca) for ca in correct_answers)
+        except (TypeError, ValueError):
+            self.int_set = None
+
+    def _int_set_matches(self, values) -> bool:
+        try:
+            return sorted(int(x) for x in values) == self.int_set
+        except Exception:
+            return False
+
+    def verdict(self, user_answer: Any) -> int:
+        if user_answer is None:
+            return IQ_MISSED
+        if isinstance(user_answer, str) and self.strings is not None:
+            return IQ_CORRECT if user_answer.strip() in self.strings else IQ_WRONG
+        if isinstance(user_answer, (int, float)) and self.number is not None:
+            return IQ_CORRECT if abs(float(user_answer) - self.number) < 1e-5 else IQ_WRONG
+        if isinstance(user_answer, list):
+            # Для q29, q32: сравнение списков (независимо от порядка)
+            return IQ_SET_MATCH if self._int_set_matches(user_answer) else IQ_WRONG
+        if isinstance(user_answer, str) and ',' in user_answer:
+            # Для q29, q32: если ответ строка "2,13"
+            return IQ_CORRECT if self._int_set_matches(user_answer.split(',')) else IQ_WRONG
+        try:
+            return IQ_CORRECT if self.number is not None and float(user_answer) == self.number else IQ_WRONG
+        except Exception:
+            return IQ_WRONG
+
+IQ_QUESTIONS = tuple(ANSWER_KEY)
+IQ_MATCHERS = tuple(IQMatcher(ANSWER_KEY[q_id]) for q_id in IQ_QUESTIONS)
+IQ_SUBSCALE_POSITIONS = {
+    subscale_name: tuple(IQ_QUESTIONS.index(q_id) for q_id in questions)
+    for subscale_name, questions in SUBSCALES.items()
+}
 
-# === Тест 5: IQ ===
-def calculate_iq_scores(answers: List[Dict]) -> List[Dict]:
-    # Собираем ответы: question_id -> answer_value
-    q_mapping = {}
-    for ans in answers:
-        q_id = ans['question_id']
-        val = ans['answer_value']
-        if isinstance(val, dict):
-            if 'value' in val:
-                q_mapping[q_id] = val['value']
-            elif 'score' in val:
-                q_mapping[q_id] = val['score']
-        else:
-            q_mapping[q_id] = val
+def iq_verdicts(q_mapping: Mapping[Any, Any]) -> List[int]:
+    # Вердикты в порядке IQ_QUESTIONS
+    return [matcher.verdict(q_mapping.get(q_id)) for q_id, matcher in zip(IQ_QUESTIONS, IQ_MATCHERS)]
+
+def iq_results(state: Dict[str, Any]) -> List[Dict]:
+    # Ответы: question_id -> answer_value (словари {"value"/"score": ...} уже развёрнуты)
+    verdicts = iq_verdicts(captured_answers(state, "iq"))
 
     results = []
 
     # Подсчитываем правильные ответы
-    correct_count = 0
-    for q_id, correct_answers in ANSWER_KEY.items():
-        user_answer = q_mapping.get(q_id)
-
-        # Обработка разных типов ответов
-        is_correct = False
-        if user_answer is None:
-            is_correct = False
-        elif isinstance(user_answer, str) and isinstance(correct_answers[0], str):
-            is_correct = user_answer.strip() in [str(ca).strip() for ca in correct_answers]
-        elif isinstance(user_answer, (int, float)) and isinstance(correct_answers[0], (int, float)):
-            is_correct = abs(float(user_answer) - float(correct_answers[0])) < 1e-5
-        elif isinstance(user_answer, list) and isinstance(correct_answers[0], list):
-            # Для q29, q32: сравнение списков (независимо от порядка)
-            user_sorted = sorted([int(x) for x in user_answer])
-            correct_sorted = sorted([int(x) for x in correct_answers])
-            is_correct = user_sorted == correct_sorted
-        elif isinstance(user_answer, str) and ',' in user_answer:
-            # Для q29, q32: если ответ строка "2,13"
-            try:
-                user_list = [int(x.strip()) for x in user_answer.split(',')]
-                correct_list = [int(x) for x in correct_answers]
-                is_correct = sorted(user_list) == sorted(correct_list)
-            except:
-                is_correct = False
-        else:
-            try:
-                is_correct = float(user_answer) == float(correct_answers[0])
-            except:
-                is_correct = False
-
-        if is_correct:
-            correct_count += 1
+    correct_count = verdicts.count(IQ_CORRECT)
 
     # Интегральный показатель IQ
-    total_questions = 50
+    total_questions = len(IQ_MATCHERS)
     iq_percentage = round((correct_count / total_questions) * 100, 2)
     iq_level = get_iq_level(iq_percentage)
 
@@ -1312,44 +1240,12 @@ def calculate_iq_scores(answers: List[Dict]) -> List[Dict]:
     })
 
     # Подсчитываем по субшкалам
-    for subscale_name, questions in SUBSCALES.items():
-        total = len(questions)
-        correct = 0
-        missed = 0
-        for q_id in questions:
-            user_answer = q_mapping.get(q_id)
-            if user_answer is None:
-                missed += 1
-                continue
-            correct_answers = ANSWER_KEY.get(q_id, [])
-            is_correct = False
-            if isinstance(user_answer, str) and isinstance(correct_answers[0], str):
-                is_correct = user_answer.strip() in [str(ca).strip() for ca in correct_answers]
-            elif isinstance(user_answer, (int, float)) and isinstance(correct_answers[0], (int, float)):
-                is_correct = abs(float(user_answer) - float(correct_answers[0])) < 1e-5
-            elif isinstance(user_answer, list):
-                try:
-                    user_list = [int(x) for x in user_answer]
-                    correct_list = [int(x) for x in correct_answers]
-                    is_correct = sorted(user_list) == sorted(correct_list)
-                except:
-                    is_correct = False
-            elif isinstance(user_answer, str) and ',' in user_answer:
-                try:
-                    user_list = [int(x.strip()) for x in user_answer.split(',')]
-                    correct_list = [int(x) for x in correct_answers]
-                    is_correct = sorted(user_list) == sorted(correct_list)
-                except:
-                    is_correct = False
-            else:
-                try:
-                    is_correct = float(user_answer) == float(correct_answers[0])
-                except:
-                    is_correct = False
-            if is_correct:
-                correct += 1
-
-        incorrect = total - correct - missed
+    for subscale_name, positions in IQ_SUBSCALE_POSITIONS.items():
+        subscale_verdicts = [verdicts[i] for i in positions]
+        total = len(positions)
+        missed = subscale_verdicts.count(IQ_MISSED)
+        incorrect = subscale_verdicts.count(IQ_WRONG)
+        correct = total - incorrect - missed
 
         # Добавляем метрики по субшкале
         results.append({
@@ -1366,16 +1262,556 @@ def calculate_iq_scores(answers: List[Dict]) -> List[Dict]:
 
     return results
 
+# === Тест 5: IQ ===
+def calculate_iq_scores(answers: List[Dict]) -> List[Dict]:
+    return iq_results(accumulate_scores(answers, TEST_SCORING_INDEXES["iq"]))
+
+#####################################
+
+# === Декларативная спецификация шкал всех пяти тестов ===
+# Для каждого теста:
+#   aggregate — "sum": складываем все строки ответов (Тест 1);
+#               "last": учитываем последний ответ на каждый вопрос;
+#   value     — как трактовать answer_value:
+#               "raw"    — число как есть;
+#               "number" — число или {"value"/"score": число}, прочее считается 0;
+#               "fields" — словарь полей ответа целиком (Тест 3);
+#               "unwrap" — значение или {"value"/"score": значение} целиком (Тест 5);
+#   scales    — шкала -> вопросы (для "fields" — поля ответа);
+#   questions — вопросы, ответы на которые передаются тесту целиком;
+#   percents / levels — таблица перевода в проценты и функция уровня выраженности;
+#   thresholds / categories — верхние границы уровней (включительно) и их категории.
+SCORING_SPEC = {
+    "paei": {
+        "aggregate": "sum",
+        "value": "raw",
+        "scales": PAEI_SCALE_ITEMS,
+        "percents": P_A_E_I_PERCENTS,
+        "levels": get_expression_level_and_indicator,
+        "thresholds": PAEI_LEVEL_THRESHOLDS,
+        "categories": tuple(record["category"] for record in PAEI_LEVELS),
+    },
+    "ei": {
+        "aggregate": "last",
+        "value": "raw",
+        "scales": EI_COMPETENCY_ITEMS,
+        "percents": EI_PERCENTS,
+        "total_percents": TOTAL_EI_PERCENTS,
+        "levels": get_ei_level_and_indicator,
+        "thresholds": EI_LEVEL_THRESHOLDS,
+        "categories": tuple(record["category"] for record in EI_LEVELS),
+    },
+    "team_roles": {
+        "aggregate": "last",
+        "value": "fields",
+        "questions": TEAM_ROLE_QUESTIONS,
+        "scales": TEAM_ROLE_FIELDS,
+        "percents": TEAM_ROLE_PERCENTS,
+        "levels": get_level_and_indicator,
+        "thresholds": TEAM_ROLE_LEVEL_THRESHOLDS,
+        "categories": tuple(record["category"] for record in TEAM_ROLE_LEVELS),
+    },
+    "motivation": {
+        "aggregate": "last",
+        "value": "number",
+        "scales": {
+            **{f"hygiene_{key}": items for key, items in HYGIENE_FACTOR_ITEMS.items()},
+            **{f"motivation_{key}": items for key, items in MOTIVATION_FACTOR_ITEMS.items()},
+        },
+        "percents": SCORE_TO_PERCENT,
+        "levels": get_motivation_level_and_indicator,
+        "thresholds": MOTIVATION_LEVEL_THRESHOLDS,  # по проценту, а не по баллу
+        "categories": tuple(record["category"] for record in MOTIVATION_LEVELS[True]),
+    },
+    "iq": {
+        "aggregate": "last",
+        "value": "unwrap",
+        "questions": tuple(ANSWER_KEY),
+        "scales": SUBSCALES,
+        "answer_key": ANSWER_KEY,
+        "levels": get_iq_level,
+        "thresholds": IQ_LEVEL_THRESHOLDS,  # по проценту правильных ответов
+    },
+}
+
+# Значения, которые тест получает целиком, а не в виде слагаемых по шкалам
+CAPTURED_VALUE_KINDS = ("fields", "unwrap")
+
+def _question_keys(q_id: Any) -> Tuple:
+    # survey_responses.question_id хранится как TEXT — числовой вопрос принимаем и строкой
+    return (q_id, str(q_id)) if isinstance(q_id, int) else (q_id,)
+
+def qualified_key(test: str, q_id: Any) -> str:
+    # Номера вопросов Тестов 1, 2 и 4 пересекаются (1–48, 1–30, 1–56): "ei:1" — вопрос только Теста 2
+    return f"{test}:{q_id}"
+
+# === Вопросы в формате backend: "m<модуль>_q<номер экрана>" ===
+# Backend сохраняет ответ на экран опроса, а экраны нумеруются сквозь модуль (по ТЗ):
+#   М1: 1–12  — Тест 1, на экране четыре оценки P/A/E/I (список по порядку или словарь P/A/E/I);
+#       13–42 — Тест 2, вопросы q1–q30 (число);
+#       43–49 — Тест 3, разделы B, D, F, H, J, L, N (словарь полей, как вопросы 97–103);
+#       50–77 — Тест 4, пара высказываний (список из двух баллов или словарь B1/B2);
+#   М2: q1–q50 — Тест 5.
+# Экран раскладывается на ключи спецификации: (вид разбора ответа, ключи по порядку частей).
+# Раскладка взята из ТЗ: определений вопросов в backend и frontend нет. Ответ другого вида
+# (например, одно число на экране Теста 1) и экран вне раскладки не угадываются, а считаются
+# в state["unscored"] и пишутся в лог.
+def _module_screens() -> Dict[str, Tuple[str, Tuple]]:
+    screens = {}
+    m1 = []
+    for i in range(len(PAEI_SCALE_ITEMS["P"])):
+        m1.append(("scales", tuple(qualified_key("paei", items[i]) for items in PAEI_SCALE_ITEMS.values())))
+    for q_id in sorted({q for items in EI_COMPETENCY_ITEMS.values() for q in items}):
+        m1.append(("number", (qualified_key("ei", q_id),)))
+    sections = sorted({field[0] for field in TEAM_ROLE_BY_FIELD})
+    for q_id in TEAM_ROLE_QUESTIONS[:len(sections)]:
+        m1.append(("single", (q_id,)))
+    motivation = sorted({q for items in (*HYGIENE_FACTOR_ITEMS.values(), *MOTIVATION_FACTOR_ITEMS.values()) for q in items})
+    for i in range(0, len(motivation), 2):
+        m1.append(("pair", tuple(qualified_key("motivation", q_id) for q_id in motivation[i:i + 2])))
+    for number, screen in enumerate(m1, 1):
+        screens[f"m1_q{number}"] = screen
+    for q_id in IQ_QUESTIONS:
+        screens[f"m2_{q_id}"] = ("single", (q_id,))
+    return screens
+
+MODULE_SCREENS = _module_screens()
+SCREEN_ID = re.compile(r"m\d+_q\d+")
+
+def _natural_key(code: Any) -> Tuple:
+    # "B10" после "B9": поля пары сравниваются по числу в коде
+    digits = "".join(ch for ch in str(code) if ch.isdigit())
+    return (int(digits) if digits else 0, str(code))
+
+def screen_answer_parts(screen: Tuple[str, Tuple], val: Any) -> List[Tuple[Any, Any]]:
+    """Ответ экрана -> пары (ключ спецификации, значение); нечисловые части пропускаются."""
+    kind, keys = screen
+    if kind == "single":
+        return [(keys[0], val)]
+    if kind == "number":
+        val = [val]
+    if isinstance(val, dict):
+        if kind == "scales":
+            by_scale = {str(code)[:1].upper(): part for code, part in val.items()}
+            parts = [by_scale.get(scale) for scale in PAEI_SCALE_ITEMS]
+        else:
+            parts = [part for _, part in sorted(val.items(), key=lambda item: _natural_key(item[0]))]
+    elif isinstance(val, (list, tuple)):
+        parts = list(val)
+    else:
+        return []
+    return [
+        (key, part) for key, part in zip(keys, parts)
+        if isinstance(part, (int, float)) and not isinstance(part, bool)
+    ]
+
+def _unwrap_answer(val: Any) -> Any:
+    # {"value": x} / {"score": x} -> x; словарь без этих ключей считается пропуском
+    if isinstance(val, dict):
+        if 'value' in val:
+            return val['value']
+        if 'score' in val:
+            return val['score']
+        return None
+    return val
+
+def _empty_wrapper(val: Any) -> bool:
+    return isinstance(val, dict) and 'value' not in val and 'score' not in val
+
+def _answer_number(val: Any) -> Any:
+    if isinstance(val, dict):
+        return _unwrap_answer(val)
+    if isinstance(val, (int, float)):
+        return val
+    return 0
+
+def compile_scoring_spec(spec: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Собирает по спецификации единый индекс: question_id -> накопители всех шкал."""
+    slots = []        # (тест, шкала) по номеру накопителя
+    test_slots = {}   # тест -> номера его накопителей в порядке шкал спецификации
+    sum_routes = {}   # question_id -> накопители, куда прибавляется каждая строка ответа
+    last_routes = {}  # question_id -> (накопитель, тип значения) для последнего ответа
+    captures = {}     # question_id -> (тест, тип значения) для ответов, передаваемых целиком
+    for test, entry in spec.items():
+        kind = entry["value"]
+        if kind in CAPTURED_VALUE_KINDS:
+            test_slots[test] = ()
+            for q_id in entry["questions"]:
+                for key in _question_keys(q_id):
+                    sum_routes.setdefault(key, [])
+                    captures.setdefault(key, []).append((test, kind))
+            continue
+        own = []
+        for scale, items in entry["scales"].items():
+            slot = len(slots)
+            slots.append((test, scale))
+            own.append(slot)
+            for q_id in items:
+                for key in _question_keys(q_id) + (qualified_key(test, q_id),):
+                    if entry["aggregate"] == "sum":
+                        sum_routes.setdefault(key, []).append(slot)
+                    else:
+                        sum_routes.setdefault(key, [])
+                        last_routes.setdefault(key, []).append((slot, kind))
+        test_slots[test] = tuple(own)
+    # Вопросы, все тесты которых берут из ответа-словаря только value/score: словарь
+    # без этих ключей — пропуск и не затирает прежний ответ на вопрос
+    unwrapped = {
+        key for key in set(last_routes) | set(captures)
+        if not sum_routes.get(key)
+        and all(kind == "number" for _, kind in last_routes.get(key, ()))
+        and all(kind == "unwrap" for _, kind in captures.get(key, ()))
+    }
+    return {
+        "slots": tuple(slots),
+        "test_slots": test_slots,
+        "sum_routes": {key: tuple(v) for key, v in sum_routes.items()},
+        "last_routes": {key: tuple(v) for key, v in last_routes.items()},
+        "captures": {key: tuple(v) for key, v in captures.items()},
+        "unwrapped": frozenset(unwrapped),
+    }
+
+def new_scoring_state(index: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Пустое инкрементальное состояние: накопители шкал и последний ответ по каждому вопросу."""
+    if index is None:
+        index = SCORING_INDEX
+    return {"index": index, "sums": [0] * len(index["slots"]), "latest": {}, "count": 0, "unscored": 0}
+
+def update_scoring_state_pairs(state: Dict[str, Any], pairs: Sequence[Tuple[Any, Any]]) -> Dict[str, Any]:
+    """Добавляет в состояние новые строки ответов парами (question_id, answer_value) — O(числа строк).
+    Изменённый ответ приходит новой строкой и учитывается так же, как при полном пересчёте."""
+    sum_routes = state["index"]["sum_routes"]
+    unwrapped = state["index"]["unwrapped"]
+    sums = state["sums"]
+    latest = state["latest"]  # question_id -> последний ответ (единственный q_mapping на весь анализ)
+    unscored = []  # ответы, вид которых не подходит вопросу, и экраны вне раскладки
+    for q_id, val in pairs:
+        routes = sum_routes.get(q_id)
+        if routes is None:
+            screen = MODULE_SCREENS.get(q_id)
+            if screen is not None:
+                if not _update_screen(sum_routes, unwrapped, sums, latest, screen, val):
+                    unscored.append(q_id)
+            elif isinstance(q_id, str) and SCREEN_ID.fullmatch(q_id):
+                unscored.append(q_id)
+            continue
+        if q_id in unwrapped and _empty_wrapper(val):
+            unscored.append(q_id)
+            continue
+        for slot in routes:
+            sums[slot] += val
+        latest[q_id] = val
+    state["count"] += len(pairs)
+    if unscored:
+        state["unscored"] += len(unscored)
+        logger.warning("Ответы не учтены в расчёте (неизвестный экран или вид ответа): %d, например %s",
+                       len(unscored), unscored[:10])
+    return state
+
+def _update_screen(sum_routes: Dict, unwrapped: frozenset, sums: List, latest: Dict,
+                   screen: Tuple[str, Tuple], val: Any) -> bool:
+    # Ответ экрана "m1_q5" — те же сложения, что у отдельных ответов на вопросы его частей.
+    # False — ответ не разложился на все части экрана
+    parts = screen_answer_parts(screen, val)
+    complete = len(parts) == len(screen[1])
+    for key, part in parts:
+        if key in unwrapped and _empty_wrapper(part):
+            complete = False
+            continue
+        routes = sum_routes.get(key)
+        if routes is None:
+            continue
+        for slot in routes:
+            sums[slot] += part
+        latest[key] = part
+    return complete
+
+def update_scoring_state(state: Dict[str, Any], answers: List[Dict]) -> Dict[str, Any]:
+    return update_scoring_state_pairs(state, [(ans['question_id'], ans['answer_value']) for ans in answers])
+
+def finalize_scoring_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Баллы шкал по текущему состоянию; само состояние не меняется и может пополняться дальше."""
+    index = state["index"]
+    sums = list(state["sums"])
+    last_routes = index["last_routes"]
+    captures = index["captures"]
+    captured = {}
+    for q_id, val in state["latest"].items():
+        for slot, kind in last_routes.get(q_id, ()):
+            num = val if kind == "raw" else _answer_number(val)
+            if num is not None:
+                sums[slot] += num
+        for test, kind in captures.get(q_id, ()):
+            if kind == "unwrap":
+                val = _unwrap_answer(val)
+                if val is None:
+                    continue
+            captured.setdefault(test, {})[q_id] = val
+    return {"index": index, "sums": sums, "answers": captured}
+
+def accumulate_scores(answers: List[Dict], index: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Один проход по ответам заполняет накопители всех шкал индекса."""
+    return finalize_scoring_state(update_scoring_state(new_scoring_state(index), answers))
+
+def accumulate_pairs(pairs: Sequence[Tuple[Any, Any]], index: Dict[str, Any] = None) -> Dict[str, Any]:
+    return finalize_scoring_state(update_scoring_state_pairs(new_scoring_state(index), pairs))
+
+def scale_scores(state: Dict[str, Any], test: str) -> List:
+    sums = state["sums"]
+    return [sums[slot] for slot in state["index"]["test_slots"][test]]
+
+def captured_answers(state: Dict[str, Any], test: str) -> Dict[Any, Any]:
+    return state["answers"].get(test, {})
+
+# Индексы строятся один раз при импорте: общий — для analyze, по одному — для расчёта отдельного теста
+SCORING_INDEX = compile_scoring_spec(SCORING_SPEC)
+TEST_SCORING_INDEXES = {test: compile_scoring_spec({test: entry}) for test, entry in SCORING_SPEC.items()}
+
+# === Сохранение инкрементального состояния ===
+# Версия меняется вместе с маршрутами индекса: сохранённое под другой спецификацией
+# состояние не загружается, и назначение пересчитывается с нуля.
+def _scoring_index_version(index: Dict[str, Any]) -> str:
+    routing = (index["slots"], index["sum_routes"], index["last_routes"], index["captures"])
+    return hashlib.sha256(repr(routing).encode("utf-8")).hexdigest()[:16]
+
+SCORING_STATE_VERSION = _scoring_index_version(SCORING_INDEX)
+
+def dump_scoring_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    # latest — списком пар: в JSON ключи словаря стали бы строками, а question_id бывает и числом
+    return {
+        "version": _scoring_index_version(state["index"]),
+        "sums": state["sums"],
+        "latest": [[q_id, val] for q_id, val in state["latest"].items()],
+        "count": state["count"],
+        "unscored": state["unscored"],
+    }
+
+def load_scoring_state(data: Dict[str, Any], index: Dict[str, Any] = None) -> Any:
+    """Восстанавливает состояние из dump_scoring_state; None, если оно от другой спецификации."""
+    state = new_scoring_state(index)
+    if not data or data.get("version") != _scoring_index_version(state["index"]):
+        return None
+    state["sums"] = list(data["sums"])
+    state["latest"] = {q_id: val for q_id, val in data["latest"]}
+    state["count"] = data.get("count", 0)
+    state["unscored"] = data.get("unscored", 0)
+    return state
+
+# === Каталог текстов интерпретаций ===
+# Все тексты, на которые ссылаются interpretation_key; версия меняется вместе с текстами
+# и служит ETag для кэширования каталога на стороне backend и frontend.
+def _build_interpretation_catalogue() -> Dict[str, str]:
+    catalogue = {}
+    for keys, texts in (
+        (PAEI_TEXT_KEYS, PAEI_INTERPRETATIONS),
+        (EI_TEXT_KEYS, EI_INTERPRETATIONS),
+        (TEAM_ROLE_TEXT_KEYS, TEAM_ROLE_INTERPRETATIONS),
+    ):
+        for scale, by_category in keys.items():
+            for category, key in by_category.items():
+                catalogue[key] = texts[scale][category]
+    for factor, key in FACTOR_TEXT_KEYS.items():
+        catalogue[key] = FACTOR_TEXTS[factor]
+    return catalogue
+
+INTERPRETATION_CATALOGUE = _build_interpretation_catalogue()
+INTERPRETATION_CATALOGUE_VERSION = hashlib.sha256(
+    json.dumps(INTERPRETATION_CATALOGUE, ensure_ascii=False, sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
+def strip_interpretation_texts(results: List[Dict]) -> List[Dict]:
+    """Оставляет в строках с interpretation_key только ключ, без текста."""
+    return [
+        {k: v for k, v in row.items() if k != "interpretation_text"} if row.get("interpretation_key") else row
+        for row in results
+    ]
+
 # === Основная функция анализа ===
-def analyze(assignment_id: int, answers: List[Dict]) -> List[Dict]:
-    # Сначала Тест 1 (P, A, E, I)
-    results = calculate_paei_scores(answers)
-    # Затем Тест 2 (Эмоциональный интеллект)
-    results.extend(calculate_emotional_intelligence_scores(answers))
-    # Теперь Тест 3 (Командные роли)
-    results.extend(calculate_team_roles_scores(answers))
-    # И наконец — Тест 4 (Мотивация)
-    results.extend(calculate_motivation_scores(answers))
-    # Добавляем Тест 5 (IQ)
-    results.extend(calculate_iq_scores(answers))
-    return results
\ No newline at end of file
+# observe(этап, секунды) — необязательный замер времени этапов (см. metrics.py):
+# "accumulate" для общего прохода по ответам и имя теста для каждого построителя результатов
+RESULT_BUILDERS = (
+    ("paei", paei_results),
+    ("ei", ei_results),
+    ("team_roles", team_roles_results),
+    ("motivation", motivation_results),
+    ("iq", iq_results),
+)
+
+def analyze(assignment_id: int, answers: List[Dict], observe: Callable[[str, float], None] = None) -> List[Dict]:
+    # Один проход по ответам для всех пяти тестов
+    if observe is None:
+        return analyze_state(accumulate_scores(answers))
+    started = perf_counter()
+    state = accumulate_scores(answers)
+    observe("accumulate", perf_counter() - started)
+    return analyze_state(state, observe)
+
+def analyze_pairs(assignment_id: int, pairs: Sequence[Tuple[Any, Any]],
+                  observe: Callable[[str, float], None] = None) -> List[Dict]:
+    # Те же результаты, что analyze, но по строкам (question_id, answer_value) прямо из курсора
+    if observe is None:
+        return analyze_state(accumulate_pairs(pairs))
+    started = perf_counter()
+    state = accumulate_pairs(pairs)
+    observe("accumulate", perf_counter() - started)
+    return analyze_state(state, observe)
+
+def analyze_scoring_state(state: Dict[str, Any], observe: Callable[[str, float], None] = None) -> List[Dict]:
+    # Результаты по инкрементальному состоянию — в том числе частичные, например после М1
+    return analyze_state(finalize_scoring_state(state), observe)
+
+def analyze_state(state: Dict[str, Any], observe: Callable[[str, float], None] = None) -> List[Dict]:
+    results = []
+    if observe is None:
+        for _, build in RESULT_BUILDERS:
+            results.extend(build(state))
+        return results
+    for test, build in RESULT_BUILDERS:
+        started = perf_counter()
+        results.extend(build(state))
+        observe(test, perf_counter() - started)
+    return results
+
+#####################################
+
+# === Пакетный векторный расчёт (NumPy) ===
+# Для массового перерасчёта исторических назначений: ответы N назначений передаются
+# плотными матрицами, сырые баллы PAEI, EI, мотивации и командных ролей считаются
+# умножением на 0/1 матрицы принадлежности шкал, проценты — индексированием таблиц,
+# уровни — np.searchsorted по границам из SCORING_SPEC.
+# Ячейка матрицы — балл вопроса по правилам его теста, как в analyze: для Теста 1 —
+# сумма всех строк ответа, для Тестов 2 и 4 — последний ответ (пропуск = 0).
+# Поля Теста 3 складываются по последним ответам на вопросы 97–104.
+
+BULK_TESTS = ("paei", "ei", "motivation")
+
+def _bulk_scoring_index() -> Dict[str, Any]:
+    # Индекс той же спецификации, но каждый вопрос — отдельный накопитель: накопители
+    # заполняются тем же update_scoring_state_pairs, что и в analyze (дубли, экраны "m1_qN")
+    spec = {}
+    for test in BULK_TESTS:
+        entry = SCORING_SPEC[test]
+        questions = sorted({q_id for items in entry["scales"].values() for q_id in items})
+        spec[test] = {**entry, "scales": {q_id: (q_id,) for q_id in questions}}
+    spec["team_roles"] = SCORING_SPEC["team_roles"]
+    return compile_scoring_spec(spec)
+
+BULK_SCORING_INDEX = _bulk_scoring_index()
+# Столбцы матрицы ответов: (тест, вопрос) — блоки Тестов 1, 2 и 4 подряд
+BULK_QUESTION_COLUMNS = BULK_SCORING_INDEX["slots"]
+# Столбцы матрицы полей Теста 3: поля ответов на вопросы 97–104 (B1…N8)
+BULK_FIELD_COLUMNS = tuple(sorted(field for fields in TEAM_ROLE_FIELDS.values() for field in fields))
+
+_bulk_tables = None
+
+def _membership_matrix(columns: Tuple, scales: Dict[str, Tuple], test: str = None):
+    position = {col: i for i, col in enumerate(columns)}
+    matrix = np.zeros((len(columns), len(scales)), dtype=np.int64)
+    for j, items in enumerate(scales.values()):
+        for item in items:
+            matrix[position[(test, item) if test else item], j] = 1
+    return matrix
+
+def _bulk_tables_compiled() -> Dict[str, Any]:
+    # Матрицы принадлежности и таблицы строятся один раз при первом пакетном вызове
+    global _bulk_tables
+    if _bulk_tables is None:
+        if np is None:
+            raise RuntimeError("Пакетный режим требует установленного numpy")
+        tables = {}
+        for test in BULK_TESTS:
+            entry = SCORING_SPEC[test]
+            tables[test] = {
+                "membership": _membership_matrix(BULK_QUESTION_COLUMNS, entry["scales"], test),
+                "percents": percent_array(entry["percents"]),
+            }
+        tables["ei"]["total_percents"] = percent_array(SCORING_SPEC["ei"]["total_percents"])
+        team = SCORING_SPEC["team_roles"]
+        tables["team_roles"] = {
+            "membership": _membership_matrix(BULK_FIELD_COLUMNS, team["scales"]),
+            "percents": [percent_array(team["percents"][role]) for role in team["scales"]],
+        }
+        _bulk_tables = tables
+    return _bulk_tables
+
+def answers_to_matrices(answer_sets: List[List[Dict]]):
+    """Переводит списки ответов N назначений в плотные матрицы (вопросы, поля Теста 3)."""
+    if np is None:
+        raise RuntimeError("Пакетный режим требует установленного numpy")
+    f_position = {field: i for i, field in enumerate(BULK_FIELD_COLUMNS)}
+
+    questions = np.zeros((len(answer_sets), len(BULK_QUESTION_COLUMNS)))
+    fields = np.zeros((len(answer_sets), len(BULK_FIELD_COLUMNS)))
+    for row, answers in enumerate(answer_sets):
+        state = accumulate_scores(answers, BULK_SCORING_INDEX)
+        questions[row] = state["sums"]
+        # Поле может прийти в ответах на разные вопросы — складывается, как в team_role_totals
+        for q_answers in captured_answers(state, "team_roles").values():
+            if not isinstance(q_answers, dict):
+                continue
+            for field, value in q_answers.items():
+                f_col = f_position.get(field)
+                if f_col is not None:
+                    fields[row, f_col] += value
+    return questions, fields
+
+def _bulk_block(scales, raw, percents, levels, categories):
+    return {
+        "scales": tuple(scales),
+        "raw": raw,
+        "standardized": percents,
+        "level": levels,
+        "categories": categories,
+    }
+
+def bulk_score(question_matrix, field_matrix=None) -> Dict[str, Dict[str, Any]]:
+    """Сырые баллы, проценты и уровни для N назначений сразу.
+
+    question_matrix — (N, 134): столбец j — балл вопроса BULK_QUESTION_COLUMNS[j] = (тест, вопрос);
+    field_matrix    — (N, 56): столбец j — поле BULK_FIELD_COLUMNS[j] Теста 3.
+    Для каждого теста возвращаются массивы raw/standardized/level формы (N, шкалы);
+    level — номер категории из "categories".
+    """
+    tables = _bulk_tables_compiled()
+    questions = np.asarray(question_matrix)
+    out = {}
+
+    for test in BULK_TESTS:
+        entry = SCORING_SPEC[test]
+        raw = questions @ tables[test]["membership"]
+        percents = percent_lookup_array(tables[test]["percents"], raw)
+        # Уровни мотивации определяются по проценту, остальных тестов — по сырому баллу
+        graded = percents if test == "motivation" else raw
+        levels = np.searchsorted(np.asarray(entry["thresholds"]), graded, side="left")
+        out[test] = _bulk_block(entry["scales"], raw, percents, levels, entry["categories"])
+
+    # Общий уровень EI — сумма компетенций по своей шкале процентов
+    ei = out["ei"]
+    ei_total = ei["raw"].sum(axis=1)
+    ei["total_raw"] = ei_total
+    ei["total_standardized"] = percent_lookup_array(tables["ei"]["total_percents"], ei_total)
+    ei["total_level"] = np.searchsorted(np.asarray(SCORING_SPEC["ei"]["thresholds"]), ei_total, side="left")
+
+    # Суммарные гигиенические и мотивационные факторы (по 4 фактора, максимум 140 баллов)
+    motivation = out["motivation"]
+    hygiene_total = motivation["raw"][:, :4].sum(axis=1)
+    motivation_total = motivation["raw"][:, 4:].sum(axis=1)
+    motivation["total_hygiene_raw"] = hygiene_total
+    motivation["total_motivation_raw"] = motivation_total
+    motivation["total_hygiene_standardized"] = np.minimum(np.round(hygiene_total / 140.0 * 100, 2), 100.0)
+    motivation["total_motivation_standardized"] = np.minimum(np.round(motivation_total / 140.0 * 100, 2), 100.0)
+    # Ведущие факторы (номера в HYGIENE_FACTORS / MOTIVATION_FACTORS) — те же, что в report_field_1…8
+    motivation["top_hygiene"] = top_k_rows(motivation["raw"][:, :4], MOTIVATION_REPORT_TOP)
+    motivation["top_motivation"] = top_k_rows(motivation["raw"][:, 4:], MOTIVATION_REPORT_TOP)
+
+    if field_matrix is not None:
+        team = SCORING_SPEC["team_roles"]
+        raw = np.asarray(field_matrix) @ tables["team_roles"]["membership"]
+        percents = np.empty(raw.shape)
+        levels = np.empty(raw.shape, dtype=np.int64)
+        for j, role in enumerate(team["scales"]):
+            percents[:, j] = percent_lookup_array(tables["team_roles"]["percents"][j], raw[:, j])
+            levels[:, j] = np.searchsorted(np.asarray(team["thresholds"][role]), raw[:, j], side="left")
+        out["team_roles"] = _bulk_block(team["scales"], raw, percents, levels, team["categories"])
+
+    return out
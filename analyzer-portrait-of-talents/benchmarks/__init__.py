@@ -0,0 +1,6 @@
+# analyzer-portrait-of-talents/benchmarks
+# Бенчмарки анализатора. Запуск из каталога analyzer-portrait-of-talents:
+#   python -m benchmarks.bench_scoring            — задержка, аллокации и пропускная способность расчёта
+#   python -m benchmarks.load_test                — нагрузочный тест /analyze (SQLite или работающий сервис)
+#   python -m benchmarks.compare base.json new.json — сравнение двух прогонов
+# Результаты пишутся в JSON (по умолчанию в benchmarks/results/) для сравнения между прогонами.
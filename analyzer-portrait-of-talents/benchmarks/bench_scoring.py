@@ -0,0 +1,115 @@
+# analyzer-portrait-of-talents/benchmarks/bench_scoring.py
+# Микробенчмарки расчёта: задержка и память каждого calculate_* и полного analyze,
+# пропускная способность при разных размерах пакета (по одному, bulk_score на NumPy,
+# пул процессов). Запуск:
+#   python -m benchmarks.bench_scoring [--quick] [--batch-sizes 1,10,100,1000] [--processes 4] [--output файл.json]
+
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+
+import analyzer_main
+from analyzer_main import (
+    analyze,
+    analyze_pairs,
+    calculate_paei_scores,
+    calculate_emotional_intelligence_scores,
+    calculate_team_roles_scores,
+    calculate_motivation_scores,
+    calculate_iq_scores,
+)
+from benchmarks.synthetic import synthetic_answers, synthetic_answer_sets, as_pairs
+from benchmarks.results import time_call, allocations, run_meta, write_results
+
+PER_TEST_FUNCTIONS = (
+    calculate_paei_scores,
+    calculate_emotional_intelligence_scores,
+    calculate_team_roles_scores,
+    calculate_motivation_scores,
+    calculate_iq_scores,
+)
+
+
+def latency_benchmarks(repeat: int, number: int) -> List[Dict[str, Any]]:
+    answers = synthetic_answers(1)
+    pairs = as_pairs(answers)
+    cases: List[tuple] = [(fn.__name__, lambda fn=fn: fn(answers)) for fn in PER_TEST_FUNCTIONS]
+    cases.append(("analyze", lambda: analyze(1, answers)))
+    cases.append(("analyze_pairs", lambda: analyze_pairs(1, pairs)))
+
+    benchmarks = []
+    for name, fn in cases:
+        entry = {"name": name, "group": "latency", "answers": len(answers)}
+        entry.update(time_call(fn, repeat=repeat, number=number))
+        entry.update(allocations(fn))
+        benchmarks.append(entry)
+    return benchmarks
+
+
+def _throughput(name: str, batch_size: int, fn: Callable[[], Any], rounds: int) -> Dict[str, Any]:
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = time.perf_counter() - started
+    return {
+        "name": "%s[%d]" % (name, batch_size),
+        "group": "throughput",
+        "batch_size": batch_size,
+        "rounds": rounds,
+        "mean_ms": round(elapsed * 1000.0 / rounds, 6),
+        "assignments_per_sec": round(batch_size * rounds / elapsed, 2),
+    }
+
+
+def throughput_benchmarks(batch_sizes: List[int], processes: int, target_assignments: int) -> List[Dict[str, Any]]:
+    benchmarks = []
+    executor = None
+    if processes > 0:
+        from executor import ScoringExecutor
+        executor = ScoringExecutor(processes).start()
+    try:
+        for size in batch_sizes:
+            answer_sets = synthetic_answer_sets(size, seed=1000)
+            pair_sets = [(aid, as_pairs(answers)) for aid, answers in enumerate(answer_sets)]
+            rounds = max(1, target_assignments // size)
+
+            benchmarks.append(_throughput("analyze_pairs", size, lambda: [analyze_pairs(aid, pairs) for aid, pairs in pair_sets], rounds))
+            if analyzer_main.np is not None:
+                matrices = analyzer_main.answers_to_matrices(answer_sets)
+                benchmarks.append(_throughput("answers_to_matrices", size, lambda: analyzer_main.answers_to_matrices(answer_sets), rounds))
+                benchmarks.append(_throughput("bulk_score", size, lambda: analyzer_main.bulk_score(*matrices), rounds))
+            if executor is not None:
+                benchmarks.append(_throughput("executor[%dp]" % processes, size, lambda: list(executor.score_many(pair_sets)), rounds))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return benchmarks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарки расчёта анализатора")
+    parser.add_argument("--quick", action="store_true", help="меньше повторов — для проверки, а не для сравнения")
+    parser.add_argument("--batch-sizes", default="1,10,100,1000")
+    parser.add_argument("--processes", type=int, default=0, help="замерить также пул процессов executor.py")
+    parser.add_argument("--output", help="путь к JSON (по умолчанию benchmarks/results/scoring-<время>.json)")
+    args = parser.parse_args()
+
+    repeat, number, target = (5, 5, 200) if args.quick else (30, 20, 5000)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size]
+
+    benchmarks = latency_benchmarks(repeat, number)
+    benchmarks.extend(throughput_benchmarks(batch_sizes, args.processes, target))
+
+    for entry in benchmarks:
+        if entry["group"] == "latency":
+            print("%-45s %9.3f ms  p95 %9.3f ms  peak %8d B" % (entry["name"], entry["mean_ms"], entry["p95_ms"], entry["peak_bytes_per_op"]))
+        else:
+            print("%-45s %12.1f назначений/с" % (entry["name"], entry["assignments_per_sec"]))
+
+    meta = run_meta({"quick": args.quick, "numpy": analyzer_main.np is not None, "processes": args.processes})
+    print("Результаты:", write_results("scoring", meta, benchmarks, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# analyzer-portrait-of-talents/benchmarks/compare.py
+# Сравнение двух прогонов бенчмарков (bench_scoring или load_test) по имени замера.
+#   python -m benchmarks.compare base.json new.json [--threshold 0.10]
+# Код выхода 1, если хотя бы один замер стал хуже порога — можно использовать в CI.
+
+import sys
+import argparse
+from typing import Any, Dict, Optional, Tuple
+
+from benchmarks.results import load_results
+
+# Основная метрика замера и направление: True — больше значит лучше
+PRIMARY_METRICS = (
+    ("assignments_per_sec", True),
+    ("requests_per_sec", True),
+    ("mean_ms", False),
+)
+
+
+def primary_metric(entry: Dict[str, Any]) -> Optional[Tuple[str, bool]]:
+    for metric, higher_is_better in PRIMARY_METRICS:
+        if metric in entry:
+            return metric, higher_is_better
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение двух прогонов бенчмарков")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="допустимое ухудшение, доля (по умолчанию 0.10)")
+    args = parser.parse_args()
+
+    base = {entry["name"]: entry for entry in load_results(args.base)["benchmarks"]}
+    new = {entry["name"]: entry for entry in load_results(args.new)["benchmarks"]}
+
+    regressions = 0
+    for name, entry in new.items():
+        metric = primary_metric(entry)
+        if name not in base or metric is None or not base[name].get(metric[0]):
+            print("%-45s новый замер" % name)
+            continue
+        key, higher_is_better = metric
+        change = (entry[key] - base[name][key]) / base[name][key]
+        worse = -change if higher_is_better else change
+        mark = "РЕГРЕССИЯ" if worse > args.threshold else ""
+        regressions += bool(mark)
+        print("%-45s %-20s %12.3f -> %12.3f  %+7.1f%%  %s" % (name, key, base[name][key], entry[key], change * 100, mark))
+    for name in base.keys() - new.keys():
+        print("%-45s нет в новом прогоне" % name)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# analyzer-portrait-of-talents/benchmarks/load_test.py
+# Нагрузочный тест /analyze от HTTP до ответа.
+# По умолчанию приложение поднимается в этом же процессе, а Postgres заменяется
+# SQLite-файлом с синтетическими ответами (пул соединений подменяется на SQLiteStandInPool).
+# С --url запросы идут в работающий сервис с настоящим Postgres; тогда --assignment-ids
+# должны указывать на существующие назначения.
+#   python -m benchmarks.load_test [--assignments 200] [--concurrency 1,8,32] [--requests 2000]
+#   python -m benchmarks.load_test --url http://localhost:8001 --assignment-ids 1-500
+# Нужен httpx (см. benchmarks/requirements.txt).
+
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.synthetic import synthetic_answers
+from benchmarks.results import latency_summary, run_meta, write_results
+
+_PLACEHOLDER = re.compile(r"(=\s*ANY\(%s\)|%s)")
+
+
+class _SQLiteCursor:
+    """Курсор с интерфейсом psycopg2 поверх sqlite3: %s -> ?, = ANY(%s) -> IN (...)."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._cur = conn.cursor()
+        self.itersize = 2000
+
+    def execute(self, sql: str, params=()) -> None:
+        params = iter(params or ())
+        sql_out, args = [], []
+        # Плейсхолдеры разбираются по порядку; список для ANY разворачивается в IN (?, ?, ...)
+        for token in _PLACEHOLDER.split(sql):
+            if token == "%s":
+                sql_out.append("?")
+                args.append(next(params))
+            elif _PLACEHOLDER.fullmatch(token):
+                values = list(next(params))
+                sql_out.append("IN (%s)" % ", ".join("?" * len(values)))
+                args.extend(values)
+            else:
+                sql_out.append(token)
+        self._cur.execute("".join(sql_out), args)
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def close(self) -> None:
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+
+    def cursor(self, name=None, cursor_factory=None) -> _SQLiteCursor:
+        return _SQLiteCursor(self._conn)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+
+class SQLiteStandInPool:
+    """Замена ConnectionPool для бенчмарка: по одному sqlite3-соединению на поток."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _SQLiteConnection(self.path)
+        yield conn
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sqlite": self.path}
+
+
+sqlite3.register_converter("JSONB", json.loads)
+
+
+def seed_sqlite(path: str, assignments: int, seed: int = 0) -> List[int]:
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+      DROP TABLE IF EXISTS survey_responses;
+      CREATE TABLE survey_responses (
+        id INTEGER PRIMARY KEY,
+        survey_assignment_id INTEGER NOT NULL,
+        question_id TEXT NOT NULL,
+        answer_value JSONB NOT NULL,
+        module TEXT NOT NULL DEFAULT 'm1',
+        responded_at TEXT NOT NULL
+      );
+      CREATE INDEX idx_sresponses_assignment ON survey_responses(survey_assignment_id);
+    """)
+    rows = []
+    for aid in range(1, assignments + 1):
+        for n, ans in enumerate(synthetic_answers(seed + aid)):
+            rows.append((aid, ans["question_id"], json.dumps(ans["answer_value"], ensure_ascii=False), "2026-01-01T00:00:%06d" % n))
+    conn.executemany(
+        "INSERT INTO survey_responses (survey_assignment_id, question_id, answer_value, responded_at) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    return list(range(1, assignments + 1))
+
+
+def parse_ids(spec: str) -> List[int]:
+    ids = []
+    for part in spec.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            ids.append(int(part))
+    return ids
+
+
+async def run_load(client: httpx.AsyncClient, assignment_ids: List[int], concurrency: int,
+                   requests: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    response_bytes = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal response_bytes
+        for i in counter:
+            started = time.perf_counter()
+            response = await client.post("/analyze", json={**body, "assignment_id": assignment_ids[i % len(assignment_ids)]})
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            response_bytes += len(response.content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    entry = {"name": "analyze_e2e[c=%d]" % concurrency, "group": "load", "concurrency": concurrency, "requests": requests}
+    entry.update(latency_summary(latencies))
+    entry["requests_per_sec"] = round(requests / elapsed, 2)
+    entry["statuses"] = statuses
+    entry["errors"] = requests - statuses.get("200", 0)
+    entry["mean_response_bytes"] = int(response_bytes / requests) if requests else 0
+    return entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест /analyze")
+    parser.add_argument("--url", help="адрес работающего анализатора; без него — в процессе с SQLite")
+    parser.add_argument("--assignment-ids", help="назначения для --url, например 1-500 или 3,5,8")
+    parser.add_argument("--assignments", type=int, default=200, help="сколько назначений сгенерировать в SQLite")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=2000, help="запросов на каждый уровень параллельности")
+    parser.add_argument("--text-mode", default="full", choices=("full", "keys"))
+    parser.add_argument("--cache", action="store_true", help="не отключать кэш результатов в режиме SQLite")
+    parser.add_argument("--output", help="путь к JSON (по умолчанию benchmarks/results/load-<время>.json)")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    body = {"text_mode": args.text_mode}
+
+    if args.url:
+        if not args.assignment_ids:
+            parser.error("для --url нужен --assignment-ids")
+        assignment_ids = parse_ids(args.assignment_ids)
+        mode = "remote"
+        make_client = lambda: httpx.AsyncClient(base_url=args.url, timeout=60.0)
+    else:
+        # Настройки читаются при импорте main — задаём их до импорта
+        os.environ.pop("DATABASE_URL", None)
+        os.environ["ANALYZER_ASYNC_DB"] = "0"
+        if not args.cache:
+            os.environ["ANALYZER_CACHE_SIZE"] = "0"
+        import main as analyzer_service
+
+        db_path = os.path.join(tempfile.mkdtemp(prefix="analyzer-bench-"), "responses.sqlite3")
+        assignment_ids = seed_sqlite(db_path, args.assignments)
+        pool = SQLiteStandInPool(db_path)
+        analyzer_service.get_pool = lambda: pool
+        mode = "sqlite"
+        make_client = lambda: httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=analyzer_service.app), base_url="http://analyzer", timeout=60.0,
+        )
+
+    async def run_all() -> List[Dict[str, Any]]:
+        async with make_client() as client:
+            await run_load(client, assignment_ids, 1, min(20, args.requests), body)  # прогрев
+            return [await run_load(client, assignment_ids, level, args.requests, body) for level in levels]
+
+    benchmarks = asyncio.run(run_all())
+    for entry in benchmarks:
+        print("%-24s %8.1f req/s  p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms  ошибок %d" % (
+            entry["name"], entry["requests_per_sec"], entry["p50_ms"], entry["p95_ms"], entry["p99_ms"], entry["errors"]))
+
+    meta = run_meta({"mode": mode, "url": args.url, "assignments": len(assignment_ids), "text_mode": args.text_mode})
+    print("Результаты:", write_results("load", meta, benchmarks, args.output))
+
+
+if __name__ == "__main__":
+    main()
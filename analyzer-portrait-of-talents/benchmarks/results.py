@@ -0,0 +1,116 @@
+# analyzer-portrait-of-talents/benchmarks/results.py
+# Общие функции бенчмарков: замер времени и памяти, метаданные прогона, запись JSON.
+
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from statistics import mean
+from typing import Any, Callable, Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    pos = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[pos]
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    return {
+        "samples": len(samples_ms),
+        "mean_ms": round(mean(samples_ms), 6),
+        "min_ms": round(min(samples_ms), 6),
+        "p50_ms": round(percentile(samples_ms, 0.50), 6),
+        "p95_ms": round(percentile(samples_ms, 0.95), 6),
+        "p99_ms": round(percentile(samples_ms, 0.99), 6),
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 30, number: int = 20, warmup: int = 3) -> Dict[str, float]:
+    """Задержка одного вызова: repeat замеров по number вызовов, сборщик мусора выключен."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - started) * 1000.0 / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    summary = latency_summary(samples)
+    summary["ops_per_sec"] = round(1000.0 / summary["mean_ms"], 2) if summary["mean_ms"] else 0.0
+    return summary
+
+
+def allocations(fn: Callable[[], Any], calls: int = 20) -> Dict[str, float]:
+    """Память на вызов по tracemalloc: пиковый прирост и то, что осталось после вызова."""
+    fn()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks, retained = [], []
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_op": int(mean(peaks)),
+        "retained_bytes_per_op": int(mean(retained)),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_meta(extra: Dict[str, Any] = None) -> Dict[str, Any]:
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    meta.update(extra or {})
+    return meta
+
+
+def write_results(kind: str, meta: Dict[str, Any], benchmarks: List[Dict[str, Any]], output: str = None) -> str:
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, "%s-%s.json" % (kind, stamp))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"kind": kind, "meta": meta, "benchmarks": benchmarks}, f, ensure_ascii=False, indent=2)
+    return output
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,74 @@
+# analyzer-portrait-of-talents/benchmarks/synthetic.py
+# Синтетические наборы ответов на все пять тестов. Вопросы берутся из SCORING_SPEC,
+# так что генератор следует за изменениями спецификации расчёта.
+
+import random
+from typing import Any, Dict, List, Tuple
+
+from analyzer_main import SCORING_SPEC, TEAM_ROLE_FIELDS, TEAM_ROLE_QUESTIONS, ANSWER_KEY
+
+# Вопросы 1..56 общие для PAEI, EI и мотивации — ответ числом
+NUMERIC_QUESTIONS = tuple(sorted({
+    q_id
+    for test in ("paei", "ei", "motivation")
+    for items in SCORING_SPEC[test]["scales"].values()
+    for q_id in items
+}))
+
+# Командные роли: каждому вопросу 97.. соответствует буква, поля ответа — "<буква><номер>"
+TEAM_ROLE_LETTERS = sorted({field[0] for fields in TEAM_ROLE_FIELDS.values() for field in fields})
+TEAM_ROLE_QUESTION_FIELDS = {
+    q_id: sorted(field for fields in TEAM_ROLE_FIELDS.values() for field in fields if field[0] == letter)
+    for q_id, letter in zip(TEAM_ROLE_QUESTIONS, TEAM_ROLE_LETTERS)
+}
+
+WRONG_IQ_ANSWERS = (0, 1, 7, "нет", "abc", [1, 2], "1,2", 3.5)
+
+
+def _team_role_answer(rng: random.Random, fields: List[str]) -> Dict[str, int]:
+    # 10 баллов распределяются по полям вопроса
+    answer: Dict[str, int] = {}
+    for _ in range(10):
+        field = rng.choice(fields)
+        answer[field] = answer.get(field, 0) + 1
+    return answer
+
+
+def _iq_answer(rng: random.Random, key: List[Any]) -> Any:
+    x = rng.random()
+    if x < 0.5:
+        return key[0]
+    if x < 0.6:
+        return {"value": key[0]}
+    if x < 0.7:
+        return str(key[0])
+    return rng.choice(WRONG_IQ_ANSWERS)
+
+
+def synthetic_answers(seed: int, answer_rate: float = 0.95, duplicates: int = 5,
+                      str_ids: bool = True) -> List[Dict[str, Any]]:
+    """Один набор ответов назначения. str_ids=True — question_id строками, как в survey_responses."""
+    rng = random.Random(seed)
+    qid = str if str_ids else (lambda q_id: q_id)
+    answers = []
+    for q_id in NUMERIC_QUESTIONS:
+        if rng.random() < answer_rate:
+            answers.append({"question_id": qid(q_id), "answer_value": rng.randint(0, 5)})
+    for q_id, fields in TEAM_ROLE_QUESTION_FIELDS.items():
+        if rng.random() < answer_rate:
+            answers.append({"question_id": qid(q_id), "answer_value": _team_role_answer(rng, fields)})
+    for q_id, key in ANSWER_KEY.items():
+        if rng.random() < answer_rate:
+            answers.append({"question_id": q_id, "answer_value": _iq_answer(rng, key)})
+    # Исправленные ответы: повторная строка по уже отвеченному вопросу
+    for _ in range(duplicates):
+        answers.append({"question_id": qid(rng.choice(NUMERIC_QUESTIONS)), "answer_value": rng.randint(0, 5)})
+    return answers
+
+
+def synthetic_answer_sets(count: int, seed: int = 0, **kwargs) -> List[List[Dict[str, Any]]]:
+    return [synthetic_answers(seed + i, **kwargs) for i in range(count)]
+
+
+def as_pairs(answers: List[Dict[str, Any]]) -> List[Tuple[Any, Any]]:
+    return [(ans["question_id"], ans["answer_value"]) for ans in answers]
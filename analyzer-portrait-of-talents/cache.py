@@ -0,0 +1,166 @@
+# analyzer-portrait-of-talents/cache.py
+# Кэш результатов анализа перед analyze().
+# Ключ — assignment_id + отпечаток его ответов (количество строк, max(id), max(responded_at)):
+# ответы только добавляются, поэтому любой новый ответ меняет отпечаток и старая запись
+# просто перестаёт использоваться. Два уровня:
+#   - LRU в памяти процесса с TTL;
+#   - необязательный общий бэкенд (Redis) для нескольких воркеров/реплик.
+# Настройки:
+#   ANALYZER_CACHE_SIZE       — записей в LRU (по умолчанию 1024, 0 — кэш выключен)
+#   ANALYZER_CACHE_TTL        — время жизни записи в секундах (по умолчанию 600)
+#   ANALYZER_CACHE_REDIS_URL  — адрес Redis для общего кэша (например redis://redis:6379/1)
+#   ANALYZER_CACHE_NAMESPACE  — префикс ключей (по умолчанию версии расчёта и каталога интерпретаций,
+#                               так что после деплоя с новой логикой старые записи не читаются)
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from analyzer_main import INTERPRETATION_CATALOGUE_VERSION, SCORING_STATE_VERSION
+from serialization import plain
+
+logger = logging.getLogger("analyzer")
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class RedisBackend:
+    """Общий бэкенд кэша. Любой объект с методами get(key) -> bytes|None и
+    set(key, value: bytes, ttl) можно подключить вместо него."""
+
+    def __init__(self, url: str):
+        import redis  # необязательная зависимость — нужна только при ANALYZER_CACHE_REDIS_URL
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._client.set(key, value, ex=max(1, int(ttl)))
+
+
+class ResultCache:
+    def __init__(self, local: LRUCache, shared=None, namespace: str = "1"):
+        self.local = local
+        self.shared = shared
+        self.namespace = namespace
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.local.maxsize > 0 or self.shared is not None
+
+    def key(self, assignment_id: int, fingerprint: Tuple) -> str:
+        return "analyze:%s:%s:%s" % (self.namespace, assignment_id, ":".join(str(part) for part in fingerprint))
+
+    def get_local(self, key: str) -> Optional[Any]:
+        return self.local.get(key)
+
+    def get_shared(self, key: str) -> Optional[Any]:
+        # Ошибки общего бэкенда не должны ронять анализ — считаем их промахом
+        if self.shared is None:
+            return None
+        try:
+            raw = self.shared.get(key)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning("Общий кэш недоступен: %s", e)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self.shared_hits += 1
+        self.local.set(key, value)
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.get_local(key)
+        if value is None:
+            value = self.get_shared(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, json.dumps(value, ensure_ascii=False, default=plain).encode("utf-8"), self.local.ttl)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning("Общий кэш недоступен: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.local.stats()
+        stats["shared"] = type(self.shared).__name__ if self.shared is not None else None
+        stats["shared_hits"] = self.shared_hits
+        stats["shared_errors"] = self.shared_errors
+        return stats
+
+
+def default_namespace() -> str:
+    # Меняется вместе с маршрутами расчёта и текстами интерпретаций — результаты
+    # прежней версии в общем Redis остаются под старым префиксом и истекают по TTL
+    return "%s-%s" % (SCORING_STATE_VERSION, INTERPRETATION_CATALOGUE_VERSION)
+
+
+def result_cache_from_env() -> ResultCache:
+    shared = None
+    redis_url = os.environ.get("ANALYZER_CACHE_REDIS_URL")
+    if redis_url:
+        try:
+            shared = RedisBackend(redis_url)
+        except ImportError:
+            logger.warning("ANALYZER_CACHE_REDIS_URL задан, но пакет redis не установлен")
+    return ResultCache(
+        LRUCache(
+            maxsize=int(os.environ.get("ANALYZER_CACHE_SIZE", "1024")),
+            ttl=float(os.environ.get("ANALYZER_CACHE_TTL", "600")),
+        ),
+        shared=shared,
+        namespace=os.environ.get("ANALYZER_CACHE_NAMESPACE") or default_namespace(),
+    )
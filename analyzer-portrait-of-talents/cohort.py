@@ -0,0 +1,187 @@
+# analyzer-portrait-of-talents/cohort.py
+# Агрегаты по когортам (компания, подразделения) поверх результатов analyze.
+# Результаты назначений идут потоком — сохранённые из survey_results или посчитанные
+# заново — и за один проход складываются в накопители: среднее и разброс, минимум и
+# максимум, точные перцентили по счётчику значений (баллы дискретны, поэтому счётчик
+# занимает столько памяти, сколько различных значений, а не назначений), распределения
+# expression_level и indicator по каждому параметру.
+# Подразделения в employees зашифрованы ключом компании, поэтому состав групп
+# передаёт вызывающий (backend), а анализатор знает только назначения компании.
+
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from analyzer_main import FACTOR_NAMES, HYGIENE_FACTORS, MOTIVATION_FACTORS, MOTIVATION_REPORT_TOP, top_k
+
+DEFAULT_PERCENTILES = (10.0, 25.0, 50.0, 75.0, 90.0)
+
+# Строки report_field_* — текстовые поля отчёта без баллов; ведущие факторы когорты
+# считаются отдельно по средним баллам факторов (top_factors)
+SKIPPED_LEVELS = ("report_field",)
+
+COMPANY_ASSIGNMENTS_SQL = """
+  SELECT sa.id
+  FROM survey_assignments sa
+  JOIN employees e ON e.id = sa.employee_id
+  WHERE e.company_id = %s AND sa.status = 'completed'
+  ORDER BY sa.id
+"""
+
+
+def company_assignment_ids(conn, company_id: int) -> List[int]:
+    with conn.cursor() as cur:
+        cur.execute(COMPANY_ASSIGNMENTS_SQL, (company_id,))
+        return [row[0] for row in cur.fetchall()]
+
+
+class ScoreDistribution:
+    """Один проход: среднее и дисперсия по Уэлфорду, минимум/максимум, счётчик значений."""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max", "values")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.values: Counter = Counter()
+
+    def add(self, value: Any) -> None:
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+        self.values[value] += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        # Линейная интерполяция между соседними значениями, как numpy.percentile по умолчанию
+        if not self.count:
+            return None
+        position = p / 100.0 * (self.count - 1)
+        lower_rank = int(math.floor(position))
+        upper_rank = min(lower_rank + 1, self.count - 1)
+        fraction = position - lower_rank
+        lower = upper = None
+        seen = 0
+        for value, n in sorted(self.values.items()):
+            seen += n
+            if lower is None and seen > lower_rank:
+                lower = value
+            if seen > upper_rank:
+                upper = value
+                break
+        return round(lower + (upper - lower) * fraction, 4)
+
+    def summary(self, percentiles: Sequence[float]) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 4),
+            "std": round(math.sqrt(self._m2 / self.count), 4),
+            "min": self.min,
+            "max": self.max,
+            "percentiles": {_percentile_key(p): self.percentile(p) for p in percentiles},
+        }
+
+
+def _percentile_key(p: float) -> str:
+    return "p%s" % (int(p) if float(p).is_integer() else p)
+
+
+class ParameterAggregate:
+    __slots__ = ("raw", "standardized", "levels", "indicators")
+
+    def __init__(self):
+        self.raw = ScoreDistribution()
+        self.standardized = ScoreDistribution()
+        self.levels: Counter = Counter()
+        self.indicators: Counter = Counter()
+
+    def add(self, row: Mapping[str, Any]) -> None:
+        self.raw.add(row.get("raw_score"))
+        self.standardized.add(row.get("standardized_score"))
+        self.levels[row.get("expression_level")] += 1
+        self.indicators[row.get("indicator")] += 1
+
+    def summary(self, percentiles: Sequence[float]) -> Dict[str, Any]:
+        return {
+            "raw": self.raw.summary(percentiles),
+            "standardized": self.standardized.summary(percentiles),
+            "expression_levels": dict(self.levels.most_common()),
+            "indicators": dict(self.indicators.most_common()),
+        }
+
+
+class CohortAggregate:
+    def __init__(self):
+        self.assignments = 0
+        self.empty = 0
+        # Параметры в порядке первого появления — тот же порядок, что в ответе analyze
+        self.parameters: Dict[str, ParameterAggregate] = {}
+
+    def add(self, results: Iterable[Mapping[str, Any]]) -> None:
+        self.assignments += 1
+        added = False
+        for row in results:
+            if row.get("expression_level") in SKIPPED_LEVELS:
+                continue
+            aggregate = self.parameters.get(row["parameter_name"])
+            if aggregate is None:
+                aggregate = self.parameters[row["parameter_name"]] = ParameterAggregate()
+            aggregate.add(row)
+            added = True
+        if not added:
+            self.empty += 1
+
+    def top_factors(self) -> Dict[str, List[Dict[str, Any]]]:
+        # Ведущие факторы мотивации когорты — тем же top_k, что поля отчёта одного назначения
+        top = {}
+        for group, factors in (("hygiene", HYGIENE_FACTORS), ("motivation", MOTIVATION_FACTORS)):
+            aggregates = [self.parameters.get(f"{group}_{factor}") for factor in factors]
+            if any(a is None or not a.raw.count for a in aggregates):
+                continue
+            means = [a.raw.mean for a in aggregates]
+            top[group] = [
+                {"factor": factors[i], "name": FACTOR_NAMES[factors[i]], "mean_raw_score": round(means[i], 4)}
+                for i in top_k(means, MOTIVATION_REPORT_TOP)
+            ]
+        return top
+
+    def summary(self, percentiles: Sequence[float]) -> Dict[str, Any]:
+        return {
+            "assignments": self.assignments,
+            "without_results": self.empty,
+            "parameters": {name: aggregate.summary(percentiles) for name, aggregate in self.parameters.items()},
+            "top_factors": self.top_factors(),
+        }
+
+
+def aggregate_cohorts(scored: Iterable[Tuple[int, List[Dict[str, Any]]]],
+                      groups: Optional[Mapping[str, Sequence[int]]] = None,
+                      percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """(assignment_id, результаты) потоком -> агрегаты всей когорты и каждой группы.
+    Назначение может входить в несколько групп; в памяти только накопители."""
+    groups = groups or {}
+    membership: Dict[int, List[str]] = {}
+    for name, assignment_ids in groups.items():
+        for aid in set(assignment_ids):
+            membership.setdefault(aid, []).append(name)
+
+    cohort = CohortAggregate()
+    by_group = {name: CohortAggregate() for name in groups}
+    for aid, results in scored:
+        cohort.add(results)
+        for name in membership.get(aid, ()):
+            by_group[name].add(results)
+
+    return {
+        "cohort": cohort.summary(percentiles),
+        "groups": {name: aggregate.summary(percentiles) for name, aggregate in by_group.items()},
+    }
@@ -0,0 +1,255 @@
+# analyzer-portrait-of-talents/db.py
+# Пул соединений с Postgres для анализатора.
+# Соединения открываются при старте FastAPI, переиспользуются между запросами
+# и закрываются при остановке. Размер пула задаётся переменными окружения:
+#   ANALYZER_DB_POOL_MIN      — сколько соединений открыть заранее (по умолчанию 1)
+#   ANALYZER_DB_POOL_MAX      — верхняя граница открытых соединений (по умолчанию 10)
+#   ANALYZER_DB_POOL_TIMEOUT  — сколько секунд ждать свободное соединение (по умолчанию 10)
+#   ANALYZER_DB_POOL_VALIDATE — соединение проверяется SELECT 1 при каждой выдаче из пула (по умолчанию 0);
+#                               N > 0 — проверять только после N секунд простоя, без лишнего запроса
+#                               на горячем пути, но разорванное сервером соединение может быть выдано
+#   ANALYZER_JSON_DECODER     — чем декодировать JSONB: orjson (по умолчанию, если установлен) или json
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+
+def resolve_json_loads(name: str) -> Callable[[Any], Any]:
+    # Декодер JSONB подключаемый: orjson заметно быстрее стандартного json на answer_value
+    if name == "orjson":
+        try:
+            import orjson
+            return orjson.loads
+        except ImportError:
+            pass
+    return json.loads
+
+
+jsonb_loads = resolve_json_loads(os.environ.get("ANALYZER_JSON_DECODER", "orjson"))
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за отведённое время."""
+
+
+class ConnectionPool:
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 10.0, validate_after: float = 0.0,
+                 json_loads: Optional[Callable[[Any], Any]] = None):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Некорректные размеры пула: min=%s, max=%s" % (min_size, max_size))
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self.json_loads = json_loads or jsonb_loads
+
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()  # (соединение, момент возврата в пул)
+        self._size = 0       # всего открытых соединений (в работе + свободные)
+        self._in_use = 0
+        self._closed = False
+
+        # Статистика для /health
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        psycopg2.extras.register_default_jsonb(conn, loads=self.json_loads)
+        return conn
+
+    def open(self) -> None:
+        # Прогреваем пул до min_size. Если БД ещё недоступна, исключение уходит вызывающему,
+        # а недостающие соединения будут открыты при первых запросах.
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        # validate_after = 0 — проверка при каждой выдаче
+        if self.validate_after > 0 and time.monotonic() - idle_since < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул соединений закрыт")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, idle_since = None, 0.0
+                    break
+                waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._waits += 1
+                    self._wait_time += time.monotonic() - started
+                    raise PoolTimeout("Нет свободных соединений с БД за %.1f с" % self.timeout)
+                self._cond.wait(remaining)
+            self._in_use += 1
+            if waited:
+                self._waits += 1
+                self._wait_time += time.monotonic() - started
+
+        # Проверка и подключение — вне блокировки, чтобы не задерживать другие потоки
+        try:
+            if conn is not None and not self._is_alive(conn, idle_since):
+                with self._cond:
+                    self._discarded += 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self._discarded += 1
+                keep = False
+            else:
+                self._idle.append((conn, time.monotonic()))
+                keep = True
+            self._cond.notify()
+        if not keep and not conn.closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            # putconn сам откатит незавершённую транзакцию или выбросит сломанное соединение
+            self.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waits": self._waits,
+                "wait_time_seconds": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_dsn() -> str:
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL env var is not set")
+    return dsn
+
+
+def init_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                get_dsn(),
+                min_size=int(os.environ.get("ANALYZER_DB_POOL_MIN", "1")),
+                max_size=int(os.environ.get("ANALYZER_DB_POOL_MAX", "10")),
+                timeout=float(os.environ.get("ANALYZER_DB_POOL_TIMEOUT", "10")),
+                validate_after=float(os.environ.get("ANALYZER_DB_POOL_VALIDATE", "0")),
+            )
+        return _pool
+
+
+def get_pool() -> ConnectionPool:
+    return _pool if _pool is not None else init_pool()
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats() if _pool is not None else None
@@ -0,0 +1,120 @@
+# analyzer-portrait-of-talents/db_async.py
+# Асинхронный доступ к Postgres через asyncpg со своим пулом соединений.
+# Позволяет обслуживать /analyze без занятия потока из threadpool Starlette
+# на время запроса к БД. Настройки:
+#   ANALYZER_ASYNC_DB        — "0" отключает асинхронный путь (по умолчанию включён, если установлен asyncpg)
+#   ANALYZER_ASYNC_POOL_MIN  — минимальный размер пула (по умолчанию 2)
+#   ANALYZER_ASYNC_POOL_MAX  — максимальный размер пула (по умолчанию 20)
+#   ANALYZER_ASYNC_POOL_TIMEOUT — сколько секунд ждать свободное соединение (по умолчанию 10)
+
+import os
+import json
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg не установлен — работает только синхронный путь через psycopg2
+    asyncpg = None
+
+from db import PoolTimeout, get_dsn, jsonb_loads
+from metrics import DB_FETCH_SECONDS, timed
+
+_pool = None
+ACQUIRE_TIMEOUT = float(os.environ.get("ANALYZER_ASYNC_POOL_TIMEOUT", "10"))
+
+FETCH_ANSWERS_SQL = """
+  SELECT question_id, answer_value
+  FROM survey_responses
+  WHERE survey_assignment_id = $1
+  ORDER BY responded_at ASC
+"""
+
+FINGERPRINT_SQL = """
+  SELECT count(*), max(id), max(responded_at)
+  FROM survey_responses
+  WHERE survey_assignment_id = $1
+"""
+
+
+def async_db_enabled() -> bool:
+    return asyncpg is not None and os.environ.get("ANALYZER_ASYNC_DB", "1") != "0"
+
+
+async def _init_connection(conn) -> None:
+    # asyncpg по умолчанию отдаёт JSONB строкой — декодируем тем же декодером, что и psycopg2
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=jsonb_loads, schema="pg_catalog")
+
+
+async def init_async_pool():
+    global _pool
+    if _pool is None and async_db_enabled():
+        _pool = await asyncpg.create_pool(
+            get_dsn(),
+            min_size=int(os.environ.get("ANALYZER_ASYNC_POOL_MIN", "2")),
+            max_size=int(os.environ.get("ANALYZER_ASYNC_POOL_MAX", "20")),
+            init=_init_connection,
+        )
+    return _pool
+
+
+def get_async_pool():
+    return _pool
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+def async_pool_stats() -> Optional[Dict[str, Any]]:
+    if _pool is None:
+        return None
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+    }
+
+
+async def _acquire():
+    try:
+        return await _pool.acquire(timeout=ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PoolTimeout("Нет свободных соединений с БД за %.1f с" % ACQUIRE_TIMEOUT)
+
+
+@timed(DB_FETCH_SECONDS.labels("answers"))
+async def fetch_answers(assignment_id: int) -> List[Dict[str, Any]]:
+    conn = await _acquire()
+    try:
+        rows = await conn.fetch(FETCH_ANSWERS_SQL, assignment_id)
+    finally:
+        await _pool.release(conn)
+    return [{"question_id": r["question_id"], "answer_value": r["answer_value"]} for r in rows]
+
+
+@timed(DB_FETCH_SECONDS.labels("answers"))
+async def fetch_answer_pairs(assignment_id: int) -> List[Tuple[Any, Any]]:
+    # Record уже ведёт себя как кортеж (question_id, answer_value) — без промежуточных словарей
+    conn = await _acquire()
+    try:
+        return await conn.fetch(FETCH_ANSWERS_SQL, assignment_id)
+    finally:
+        await _pool.release(conn)
+
+
+@timed(DB_FETCH_SECONDS.labels("fingerprint"))
+async def fetch_fingerprint(assignment_id: int) -> tuple:
+    conn = await _acquire()
+    try:
+        row = await conn.fetchrow(FINGERPRINT_SQL, assignment_id)
+    finally:
+        await _pool.release(conn)
+    return tuple(row)
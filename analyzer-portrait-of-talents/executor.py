@@ -0,0 +1,177 @@
+# analyzer-portrait-of-talents/executor.py
+# Пул процессов для расчёта пакетов назначений (ночной перерасчёт, /analyze/batch, /analyze/stream).
+# Расчёт в analyzer_main — чистый Python и держит GIL, поэтому один воркер uvicorn
+# раздаёт назначения порциями в отдельные процессы. Каждый процесс один раз при старте
+# импортирует analyzer_main (таблицы и индексы расчёта) и дальше только считает.
+# Порция передаётся колонками: кортеж assignment_id, число ответов каждого,
+# плоские кортежи question_id и answer_value — без словаря на каждый ответ.
+# Настройки:
+#   ANALYZER_SCORING_PROCESSES — число процессов; 0 — считать в текущем процессе (по умолчанию),
+#                                auto — по числу ядер
+#   ANALYZER_SCORING_CHUNK     — назначений в одной порции (по умолчанию 64)
+
+import os
+import sys
+import copyreg
+import threading
+from collections import deque
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import ANSWERS_PROCESSED, ASSIGNMENTS_SCORED
+
+Chunk = Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[Any, ...], Tuple[Any, ...]]
+
+_analyze_pairs = None
+
+# Строки отчёта в результатах — общие MappingProxyType (см. analyzer_main.motivation_report_fields);
+# из процесса расчёта они возвращаются обычными словарями
+copyreg.pickle(MappingProxyType, lambda value: (dict, (dict(value),)))
+
+
+def _init_worker() -> None:
+    # Таблицы и индексы расчёта строятся один раз на процесс
+    global _analyze_pairs
+    from analyzer_main import analyze_pairs
+    _analyze_pairs = analyze_pairs
+
+
+def _score_chunk(chunk: Chunk) -> List[List[Dict[str, Any]]]:
+    aids, counts, question_ids, values = chunk
+    results = []
+    start = 0
+    for aid, count in zip(aids, counts):
+        end = start + count
+        results.append(_analyze_pairs(aid, tuple(zip(question_ids[start:end], values[start:end]))))
+        start = end
+    return results
+
+
+def pack_chunk(items: List[Tuple[int, List[Tuple[Any, Any]]]]) -> Chunk:
+    aids, counts, question_ids, values = [], [], [], []
+    for aid, pairs in items:
+        aids.append(aid)
+        counts.append(len(pairs))
+        for question_id, value in pairs:
+            # Одинаковые question_id становятся одним объектом — pickle передаст строку один раз
+            question_ids.append(sys.intern(question_id) if isinstance(question_id, str) else question_id)
+            values.append(value)
+    return tuple(aids), tuple(counts), tuple(question_ids), tuple(values)
+
+
+class ScoringExecutor:
+    def __init__(self, processes: int, chunk_size: int = 64):
+        if processes < 1 or chunk_size < 1:
+            raise ValueError("Некорректные параметры пула расчёта: processes=%s, chunk=%s" % (processes, chunk_size))
+        self.processes = processes
+        self.chunk_size = chunk_size
+        # Не больше двух порций на процесс в очереди — память не растёт с размером пакета
+        self.max_in_flight = processes * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._chunks = 0
+        self._assignments = 0
+
+    def start(self) -> "ScoringExecutor":
+        with self._lock:
+            if self._pool is None:
+                # spawn: не наследуем потоки и соединения с БД родительского процесса
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=get_context("spawn"),
+                    initializer=_init_worker,
+                )
+        return self
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _chunks_of(self, grouped: Iterable[Tuple[int, List[Tuple[Any, Any]]]]) -> Iterator[List[Tuple[int, List[Tuple[Any, Any]]]]]:
+        chunk = []
+        for item in grouped:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def score_many(self, grouped: Iterable[Tuple[int, List[Tuple[Any, Any]]]]) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """(assignment_id, пары ответов) -> (assignment_id, результаты) в исходном порядке."""
+        pool = self.start()._pool
+        in_flight = deque()
+        try:
+            for chunk in self._chunks_of(grouped):
+                packed = pack_chunk(chunk)
+                in_flight.append((packed[0], len(packed[2]), pool.submit(_score_chunk, packed)))
+                if len(in_flight) >= self.max_in_flight:
+                    yield from self._drain_one(in_flight)
+            while in_flight:
+                yield from self._drain_one(in_flight)
+        finally:
+            for _, _, future in in_flight:
+                future.cancel()
+
+    def _drain_one(self, in_flight) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        aids, answers, future = in_flight.popleft()
+        results = future.result()
+        with self._lock:
+            self._chunks += 1
+            self._assignments += len(aids)
+        # Время расчёта по тестам в процессах-воркерах не видно — считаем только объёмы
+        ANSWERS_PROCESSED.inc(answers)
+        ASSIGNMENTS_SCORED.labels("computed").inc(len(aids))
+        yield from zip(aids, results)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "chunk_size": self.chunk_size,
+                "running": self._pool is not None,
+                "chunks": self._chunks,
+                "assignments": self._assignments,
+            }
+
+
+_executor: Optional[ScoringExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def configured_processes() -> int:
+    value = os.environ.get("ANALYZER_SCORING_PROCESSES", "0")
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value)
+
+
+def init_executor() -> Optional[ScoringExecutor]:
+    global _executor
+    with _executor_lock:
+        if _executor is None and configured_processes() > 0:
+            _executor = ScoringExecutor(
+                configured_processes(),
+                chunk_size=int(os.environ.get("ANALYZER_SCORING_CHUNK", "64")),
+            ).start()
+        return _executor
+
+
+def get_executor() -> Optional[ScoringExecutor]:
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def executor_stats() -> Optional[Dict[str, Any]]:
+    return _executor.stats() if _executor is not None else None
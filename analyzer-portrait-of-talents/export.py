@@ -0,0 +1,205 @@
+# analyzer-portrait-of-talents/export.py
+# Колоночная выгрузка результатов в Parquet или Arrow IPC (задание очереди, POST /exports).
+# Строка — назначение, по два типизированных столбца на каждый parameter_name из analyze:
+# <параметр>__raw и <параметр>__standardized (float64, пропуск — null), плюс
+# assignment_id, employee_id, company_id и completed_at.
+# Результаты читаются потоком (сохранённые из survey_results или посчитанные заново)
+# и пишутся порциями по ANALYZER_EXPORT_BATCH назначений — каждая порция становится
+# группой строк Parquet / батчем Arrow, вся таблица в памяти не собирается.
+# Файл пишется во временный и переименовывается по завершении.
+# Файлы хранятся ANALYZER_EXPORT_TTL секунд: более старые (и недописанные .part после сбоя)
+# удаляются при старте сервиса и перед каждой новой выгрузкой, после чего GET /exports/{id}
+# отвечает 410. Срок не зависит от того, сколько заданий хранит очередь (ANALYZER_JOBS_KEEP).
+# Настройки:
+#   ANALYZER_EXPORT_DIR    — каталог файлов выгрузки (по умолчанию <tmp>/analyzer-exports)
+#   ANALYZER_EXPORT_TTL    — сколько секунд хранить файлы выгрузки (по умолчанию 86400, 0 — не удалять)
+#   ANALYZER_EXPORT_BATCH  — назначений в одной порции (по умолчанию 1000)
+
+import os
+import time
+import logging
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # выгрузка недоступна, остальной сервис работает без pyarrow
+    pa = None
+    pq = None
+
+from analyzer_main import analyze
+
+logger = logging.getLogger("analyzer")
+
+EXPORT_DIR = os.environ.get("ANALYZER_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "analyzer-exports")
+EXPORT_TTL = float(os.environ.get("ANALYZER_EXPORT_TTL", "86400"))
+EXPORT_BATCH = int(os.environ.get("ANALYZER_EXPORT_BATCH", "1000"))
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Набор параметров не зависит от ответов: берём его из расчёта по пустому списку.
+# Поля отчёта report_field_* — тексты без баллов, в выгрузку не входят.
+EXPORT_PARAMETERS = tuple(
+    row["parameter_name"] for row in analyze(0, []) if row["expression_level"] != "report_field"
+)
+
+EXPORT_ASSIGNMENTS_SQL = """
+  SELECT sa.id, sa.employee_id, e.company_id, sa.completed_at
+  FROM survey_assignments sa
+  JOIN employees e ON e.id = sa.employee_id
+  WHERE sa.status = 'completed'
+    AND (%(company_id)s::int IS NULL OR e.company_id = %(company_id)s)
+    AND (%(date_from)s::timestamp IS NULL OR sa.completed_at >= %(date_from)s)
+    AND (%(date_to)s::timestamp IS NULL OR sa.completed_at < %(date_to)s)
+  ORDER BY sa.id
+"""
+
+
+def export_available() -> bool:
+    return pa is not None
+
+
+def export_path(job_id: str, fmt: str) -> str:
+    return os.path.join(EXPORT_DIR, job_id + EXPORT_FORMATS[fmt])
+
+
+def sweep_exports(ttl: float = None, now: float = None) -> int:
+    """Удаляет файлы выгрузки старше ttl секунд; возвращает число удалённых файлов."""
+    ttl = EXPORT_TTL if ttl is None else ttl
+    if ttl <= 0 or not os.path.isdir(EXPORT_DIR):
+        return 0
+    deadline = (time.time() if now is None else now) - ttl
+    suffixes = tuple(EXPORT_FORMATS.values()) + tuple(suffix + ".part" for suffix in EXPORT_FORMATS.values())
+    removed = 0
+    with os.scandir(EXPORT_DIR) as entries:
+        for entry in entries:
+            if not entry.name.endswith(suffixes) or not entry.is_file():
+                continue
+            try:
+                if entry.stat().st_mtime < deadline:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:  # файл уже удалил параллельный проход
+                pass
+    if removed:
+        logger.info("Удалено устаревших файлов выгрузки: %d", removed)
+    return removed
+
+
+def export_assignments(conn, company_id: Optional[int] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None) -> Dict[int, Tuple]:
+    """assignment_id -> (employee_id, company_id, completed_at) завершённых назначений выборки."""
+    with conn.cursor() as cur:
+        cur.execute(EXPORT_ASSIGNMENTS_SQL, {"company_id": company_id, "date_from": date_from, "date_to": date_to})
+        return {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+
+
+def export_schema():
+    fields = [
+        pa.field("assignment_id", pa.int64(), nullable=False),
+        pa.field("employee_id", pa.int64()),
+        pa.field("company_id", pa.int64()),
+        pa.field("completed_at", pa.timestamp("us")),
+    ]
+    for name in EXPORT_PARAMETERS:
+        fields.append(pa.field(name + "__raw", pa.float64()))
+        fields.append(pa.field(name + "__standardized", pa.float64()))
+    return pa.schema(fields)
+
+
+def _score(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+class _ColumnBuffer:
+    """Столбцы одной порции: списки значений по именам полей схемы."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        # Параметр -> номера его столбцов __raw и __standardized (после четырёх столбцов назначения)
+        self.positions = {name: (4 + 2 * i, 5 + 2 * i) for i, name in enumerate(EXPORT_PARAMETERS)}
+        self.clear()
+
+    def clear(self) -> None:
+        self.columns: List[List[Any]] = [[] for _ in self.schema]
+        self.rows = 0
+
+    def append(self, assignment_id: int, meta: Tuple, results: Iterable[Dict[str, Any]]) -> None:
+        employee_id, company_id, completed_at = meta
+        row: List[Any] = [assignment_id, employee_id, company_id, completed_at] + [None] * (2 * len(EXPORT_PARAMETERS))
+        for result in results:
+            position = self.positions.get(result.get("parameter_name"))
+            if position is not None:
+                row[position[0]] = _score(result.get("raw_score"))
+                row[position[1]] = _score(result.get("standardized_score"))
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        self.rows += 1
+
+    def batch(self):
+        return pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)],
+            schema=self.schema,
+        )
+
+
+class _Writer:
+    def __init__(self, path: str, fmt: str, schema):
+        self._sink = None
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, batch) -> None:
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+def write_export(scored: Iterable[Tuple[int, List[Dict[str, Any]]]], meta: Dict[int, Tuple], path: str,
+                 fmt: str = "parquet", batch_size: int = None) -> Dict[str, Any]:
+    """Пишет (assignment_id, результаты) порциями в файл path; возвращает сводку выгрузки."""
+    if pa is None:
+        raise RuntimeError("Выгрузка требует установленного pyarrow")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("Неизвестный формат выгрузки: %s" % fmt)
+    batch_size = batch_size or EXPORT_BATCH
+    schema = export_schema()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".part"
+
+    buffer = _ColumnBuffer(schema)
+    writer = _Writer(partial, fmt, schema)
+    rows = batches = 0
+    try:
+        for aid, results in scored:
+            buffer.append(aid, meta.get(aid, (None, None, None)), results)
+            if buffer.rows >= batch_size:
+                writer.write(buffer.batch())
+                rows, batches = rows + buffer.rows, batches + 1
+                buffer.clear()
+        if buffer.rows or not batches:
+            # Пустая выборка — файл с одной схемой, чтобы его можно было открыть
+            writer.write(buffer.batch())
+            rows, batches = rows + buffer.rows, batches + 1
+    except BaseException:
+        writer.close()
+        os.unlink(partial)
+        raise
+    writer.close()
+    os.replace(partial, path)
+    return {
+        "path": path,
+        "format": fmt,
+        "rows": rows,
+        "batches": batches,
+        "columns": len(schema),
+        "bytes": os.path.getsize(path),
+    }
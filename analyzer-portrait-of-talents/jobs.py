@@ -0,0 +1,276 @@
+# analyzer-portrait-of-talents/jobs.py
+# Фоновая очередь заданий анализа: POST /jobs/analyze возвращает id задания,
+# GET /jobs/{id} — его статус и результат.
+# Два потока очереди: interactive (завершение исследования) всегда выбирается первым,
+# batch (пересчёты) одновременно занимает не больше ANALYZER_JOB_BATCH_WORKERS воркеров,
+# и хотя бы один воркер всегда остаётся за interactive — поэтому воркеров нужно не меньше двух,
+# а длинные пересчёты не вытесняют интерактивные запросы.
+# При остановке воркеры доделывают текущие задания и новых не берут; stop() ждёт их без
+# таймаута, незапущенные задания остаются в SQLite в статусе queued.
+# Очередь ограничена: при переполнении submit выбрасывает QueueFull (API отвечает 429).
+# Если задан ANALYZER_JOBS_DB, задания пишутся в локальный SQLite и после перезапуска
+# незавершённые задания возвращаются в очередь.
+# Настройки:
+#   ANALYZER_JOB_WORKERS        — число воркеров, не меньше 2 (по умолчанию 4)
+#   ANALYZER_JOB_BATCH_WORKERS  — сколько из них могут одновременно считать batch, от 1 до workers - 1
+#                                 (по умолчанию workers - 1)
+#   ANALYZER_JOB_QUEUE_MAX      — максимум заданий в очереди (по умолчанию 1000)
+#   ANALYZER_JOBS_KEEP          — сколько последних завершённых заданий хранить в памяти и в SQLite
+#                                 (по умолчанию 1000); более старые удаляются вместе с результатами
+#   ANALYZER_JOBS_DB            — путь к SQLite-файлу для сохранения очереди (по умолчанию не используется)
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from serialization import plain
+
+logger = logging.getLogger("analyzer")
+
+PRIORITIES = ("interactive", "batch")
+FINISHED = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Очередь заданий заполнена — клиенту стоит повторить позже."""
+
+
+class SQLiteJobStore:
+    """Локальное хранилище заданий: переживает перезапуск сервиса."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+          CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+          )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["status"], job["priority"], json.dumps(job["payload"]),
+                 json.dumps(job["result"], ensure_ascii=False, default=plain) if job["result"] is not None else None,
+                 job["error"], job["created_at"], job["started_at"], job["finished_at"]),
+            )
+
+    def _job(self, row) -> Dict[str, Any]:
+        return {
+            "id": row[0], "status": row[1], "priority": row[2], "payload": json.loads(row[3]),
+            "result": json.loads(row[4]) if row[4] is not None else None, "error": row[5],
+            "created_at": row[6], "started_at": row[7], "finished_at": row[8],
+        }
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        # Задания, прерванные перезапуском в статусе running, выполняются заново
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    def trim(self, keep: int) -> List[Dict[str, Any]]:
+        """Удаляет завершённые задания, кроме keep последних; возвращает удалённые."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('done', 'failed') ORDER BY finished_at DESC LIMIT -1 OFFSET ?",
+                (keep,),
+            ).fetchall()
+            if rows:
+                self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(row[0],) for row in rows])
+        return [self._job(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any], workers: int = 4,
+                 batch_workers: Optional[int] = None, max_queued: int = 1000,
+                 keep: int = 1000, store: Optional[SQLiteJobStore] = None):
+        # Один воркер зарезервирован за interactive, ещё хотя бы один нужен для batch
+        if workers < 2 or max_queued < 1:
+            raise ValueError("Некорректные параметры очереди: workers=%s (нужно >= 2), max_queued=%s" % (workers, max_queued))
+        self.handler = handler
+        self.workers = workers
+        self.batch_workers = min(workers - 1, max(1, workers - 1 if batch_workers is None else batch_workers))
+        self.max_queued = max_queued
+        self.keep = keep
+        self.store = store
+
+        self._cond = threading.Condition()
+        self._lanes = {priority: deque() for priority in PRIORITIES}
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._running = {priority: 0 for priority in PRIORITIES}
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._store_closed = False
+
+        # Статистика для /health
+        self._submitted = 0
+        self._rejected = 0
+        self._failed = 0
+
+    def start(self) -> "JobQueue":
+        if self.store is not None:
+            for job in self.store.pending():
+                job.update(status="queued", started_at=None)
+                self._jobs[job["id"]] = job
+                self._lanes[job["priority"]].append(job["id"])
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name="analyzer-job-%d" % i, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        """Новые задания больше не берутся; возвращается, когда воркеры доделали взятые.
+        Ожидание без таймаута: после stop() закрываются пулы соединений, которыми пользуются задания."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._cond:
+            self._close_store()
+
+    def _close_store(self) -> None:
+        # Вызывается под self._cond, когда ни один воркер больше не пишет в хранилище
+        if self.store is not None and not self._store_closed:
+            self._store_closed = True
+            self.store.close()
+
+    def submit(self, payload: Dict[str, Any], priority: str = "interactive") -> Dict[str, Any]:
+        if priority not in PRIORITIES:
+            raise ValueError("Неизвестный приоритет задания: %s" % priority)
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex, "status": "queued", "priority": priority, "payload": payload,
+            "result": None, "error": None, "created_at": now, "started_at": None, "finished_at": None,
+        }
+        with self._cond:
+            if self._stopping:
+                # Хранилище может быть уже закрыто — задание примет следующий экземпляр сервиса
+                raise QueueFull("Очередь заданий останавливается")
+            if sum(len(lane) for lane in self._lanes.values()) >= self.max_queued:
+                self._rejected += 1
+                raise QueueFull("Очередь заданий заполнена (%d)" % self.max_queued)
+            if self.store is not None:
+                self.store.save(job)
+            self._jobs[job["id"]] = job
+            self._lanes[priority].append(job["id"])
+            self._submitted += 1
+            self._cond.notify()
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+            # Вытесненные из памяти задания остаются в SQLite
+            if self.store is None or self._store_closed:
+                return None
+            return self.store.load(job_id)
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        # Вызывается под self._cond: interactive всегда первым, batch — в пределах своей квоты.
+        # После stop() новые задания не берутся — они дождутся перезапуска в хранилище
+        if self._stopping:
+            return None
+        if self._lanes["interactive"]:
+            return self._jobs[self._lanes["interactive"].popleft()]
+        if self._lanes["batch"] and self._running["batch"] < self.batch_workers:
+            return self._jobs[self._lanes["batch"].popleft()]
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running[job["priority"]] += 1
+                job.update(status="running", started_at=time.time())
+            if self.store is not None:
+                self.store.save(job)
+
+            try:
+                result, error, status = self.handler(job["payload"]), None, "done"
+            except Exception as e:
+                logger.warning("Задание %s завершилось ошибкой: %s", job["id"], e)
+                result, error, status = None, str(e), "failed"
+
+            with self._cond:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+                self._running[job["priority"]] -= 1
+                if status == "failed":
+                    self._failed += 1
+                self._evict_finished()
+                # Освободилась квота batch — разбудить воркер, ждущий batch-задание
+                self._cond.notify_all()
+            if self.store is not None:
+                self.store.save(job)
+                # Та же граница хранения, что и в памяти: результаты не копятся в SQLite бесконечно
+                self.store.trim(self.keep)
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "batch_workers": self.batch_workers,
+                "max_queued": self.max_queued,
+                "queued": {priority: len(lane) for priority, lane in self._lanes.items()},
+                "running": dict(self._running),
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "failed": self._failed,
+                "durable": self.store is not None,
+            }
+
+
+def job_queue_from_env(handler: Callable[[Dict[str, Any]], Any]) -> JobQueue:
+    workers = int(os.environ.get("ANALYZER_JOB_WORKERS", "4"))
+    batch_workers = os.environ.get("ANALYZER_JOB_BATCH_WORKERS")
+    store_path = os.environ.get("ANALYZER_JOBS_DB")
+    return JobQueue(
+        handler,
+        workers=workers,
+        batch_workers=int(batch_workers) if batch_workers else None,
+        max_queued=int(os.environ.get("ANALYZER_JOB_QUEUE_MAX", "1000")),
+        keep=int(os.environ.get("ANALYZER_JOBS_KEEP", "1000")),
+        store=SQLiteJobStore(store_path) if store_path else None,
+    )
@@ -1,50 +1,600 @@
 # analyzer-portrait-of-talents/main.py
 # FastAPI сервер анализа «Портрет Талантов».
-# Считывает ответы из БД и использует analyzer.py для расчёта метрик.
+# Считывает ответы из БД и использует analyzer_main.py (пять тестов) для расчёта метрик.
+# Ответ /analyze — строки всех пяти тестов (PAEI, EI, командные роли, мотивация, IQ) с
+# interpretation_key и полями отчёта; демонстрационный analyzer.py (Creativity / Leadership /
+# OverallTalentIndex) сервисом не используется и оставлен как пример формата.
 
 import os
-from fastapi import FastAPI, HTTPException
+import uuid
+import logging
+from datetime import datetime
+from time import perf_counter
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 import psycopg2
 import psycopg2.extras
-from analyzer import analyze  # ваша логика анализа в analyzer.py
+from analyzer_main import (
+    analyze,
+    analyze_pairs,
+    analyze_scoring_state,
+    strip_interpretation_texts,
+    INTERPRETATION_CATALOGUE,
+    INTERPRETATION_CATALOGUE_VERSION,
+)
+from db import PoolTimeout, init_pool, get_pool, close_pool, pool_stats
+import db_async
+from cache import result_cache_from_env
+from results_store import save_results_many, load_results, iter_stored_results
+from state_store import advance_state
+from streaming import STREAM_ITERSIZE, stream_scores
+from cohort import DEFAULT_PERCENTILES, aggregate_cohorts, company_assignment_ids
+from export import export_assignments, export_available, export_path, sweep_exports, write_export
+from executor import init_executor, get_executor, shutdown_executor, executor_stats
+from jobs import JobQueue, QueueFull, job_queue_from_env
+from metrics import (
+    DB_FETCH_SECONDS, SERIALIZATION_SECONDS, RESPONSE_BYTES, ANSWERS_PROCESSED, ASSIGNMENTS_SCORED, ERRORS,
+    RequestMetricsMiddleware, observe_scoring, stats_gauge, timed, render as render_metrics,
+)
+from profiling import PROFILE_HEADER, profiler_from_env
+from serialization import encode, json_dumps
 
-app = FastAPI(title="Gert Platform — Анализатор: Портрет Талантов")
+# Небольшие наборы ответов считаем прямо в event loop, крупные — уводим в threadpool
+INLINE_SCORING_MAX_ANSWERS = int(os.environ.get("ANALYZER_INLINE_SCORING_MAX_ANSWERS", "1000"))
+
+logger = logging.getLogger("analyzer")
+
+# Кэш результатов по assignment_id + отпечатку ответов (см. cache.py)
+result_cache = result_cache_from_env()
+
+# Write-through: сохранять посчитанные результаты в survey_results (по умолчанию выключено;
+# запрос может переопределить полем persist)
+PERSIST_RESULTS = os.environ.get("ANALYZER_PERSIST_RESULTS", "0") == "1"
+
+# Инкрементальный расчёт: /analyze и задания на одно назначение догоняют сохранённое
+# в scoring_states состояние только по новым ответам вместо пересчёта всего набора
+INCREMENTAL_SCORING = os.environ.get("ANALYZER_INCREMENTAL", "0") == "1"
+
+# Быстрое чтение ответов: строки-кортежи (question_id, answer_value) сразу в расчёт,
+# без DictCursor и промежуточных словарей ("0" — прежний путь через fetch_answers)
+FAST_FETCH = os.environ.get("ANALYZER_FAST_FETCH", "1") == "1"
+
+# Очередь фоновых заданий /jobs/analyze (см. jobs.py); создаётся при старте сервиса
+job_queue: Optional[JobQueue] = None
+
+# Профилирование отдельных запросов по токену (см. profiling.py)
+profiler = profiler_from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Пул соединений создаётся при старте и закрывается при остановке сервиса
+    if os.environ.get("DATABASE_URL"):
+        try:
+            init_pool().open()
+        except Exception as e:
+            logger.warning("Не удалось прогреть пул соединений с БД: %s", e)
+        try:
+            await db_async.init_async_pool()
+        except Exception as e:
+            logger.warning("Не удалось создать асинхронный пул соединений с БД: %s", e)
+    # Пул процессов для пакетного расчёта (ANALYZER_SCORING_PROCESSES > 0)
+    init_executor()
+    sweep_exports()
+    global job_queue
+    job_queue = job_queue_from_env(run_job).start()
+    yield
+    # Пулы закрываются только после того, как воркеры очереди доделают взятые задания
+    await run_in_threadpool(job_queue.stop)
+    job_queue = None
+    shutdown_executor()
+    await db_async.close_async_pool()
+    close_pool()
+
+app = FastAPI(title="Gert Platform — Анализатор: Портрет Талантов", lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware)
+
+# text_mode="keys": вместо текста интерпретации в строке результата только interpretation_key,
+# сами тексты — в каталоге GET /interpretations (кэшируется по ETag)
+TextMode = Literal["full", "keys"]
 
 class AnalyzeRequest(BaseModel):
     assignment_id: int
+    text_mode: TextMode = "full"
+    persist: Optional[bool] = None
+
+class BatchAnalyzeRequest(BaseModel):
+    assignment_ids: List[int]
+    text_mode: TextMode = "full"
+    persist: Optional[bool] = None
+
+class CohortRequest(BaseModel):
+    # Когорта — назначения компании (завершённые) и/или явный список; groups — подразделения:
+    # название -> назначения (отделы зашифрованы в employees, состав групп знает backend)
+    company_id: Optional[int] = None
+    assignment_ids: List[int] = []
+    groups: Dict[str, List[int]] = {}
+    source: Literal["stored", "computed"] = "stored"
+    percentiles: List[float] = list(DEFAULT_PERCENTILES)
+
+class ExportRequest(BaseModel):
+    # Выборка завершённых назначений: компания и/или диапазон completed_at [date_from, date_to)
+    company_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    source: Literal["stored", "computed"] = "stored"
+    format: Literal["parquet", "arrow"] = "parquet"
+
+# interactive — завершение исследования пользователем, batch — пересчёты;
+# по умолчанию одно назначение считается interactive, несколько — batch
+class AnalyzeJobRequest(BaseModel):
+    assignment_id: Optional[int] = None
+    assignment_ids: List[int] = []
+    text_mode: TextMode = "full"
+    persist: Optional[bool] = None
+    priority: Optional[Literal["interactive", "batch"]] = None
+
+INTERPRETATIONS_ETAG = f'"{INTERPRETATION_CATALOGUE_VERSION}"'
+
+def apply_text_mode(results: List[Dict[str, Any]], text_mode: str) -> List[Dict[str, Any]]:
+    return strip_interpretation_texts(results) if text_mode == "keys" else results
+
+def should_persist(persist: Optional[bool]) -> bool:
+    return PERSIST_RESULTS if persist is None else persist
 
-def get_conn():
-    dsn = os.environ.get("DATABASE_URL")
-    if not dsn:
-        raise RuntimeError("DATABASE_URL env var is not set")
-    return psycopg2.connect(dsn)
+def persist_results(scored: Dict[int, List[Dict[str, Any]]]) -> int:
+    # Одна транзакция на все назначения: устаревшие строки удаляются, остальные — upsert
+    with get_pool().connection() as conn:
+        return save_results_many(conn, scored)
+
+def json_response(endpoint: str, payload: Any, request: Optional[Request] = None) -> Response:
+    # Сериализуем сами, мимо jsonable_encoder (см. serialization.py), и замеряем время и размер ответа.
+    # С Accept: application/msgpack (backend) тело ответа — MessagePack.
+    started = perf_counter()
+    body, media_type = encode(payload, request.headers.get("accept") if request is not None else None)
+    SERIALIZATION_SECONDS.labels(endpoint).observe(perf_counter() - started)
+    RESPONSE_BYTES.labels(endpoint).observe(len(body))
+    return Response(body, media_type=media_type)
+
+# Состояние пулов и кэша в /metrics снимается при каждом запросе метрик
+stats_gauge("analyzer_db_pool", "Пул соединений psycopg2 (поле в метке stat)", "stat", pool_stats)
+stats_gauge("analyzer_async_db_pool", "Пул соединений asyncpg (поле в метке stat)", "stat", db_async.async_pool_stats)
+stats_gauge("analyzer_result_cache", "Кэш результатов (поле в метке stat)", "stat", lambda: result_cache.stats())
+stats_gauge("analyzer_jobs", "Очередь заданий (поле в метке stat)", "stat", lambda: job_queue.stats() if job_queue is not None else None)
 
 @app.get("/health")
 def health():
-    return {"ok": True, "service": "analyzer"}
+    return {
+        "ok": True,
+        "service": "analyzer",
+        "db_pool": pool_stats(),
+        "async_db_pool": db_async.async_pool_stats(),
+        "result_cache": result_cache.stats(),
+        "scoring_executor": executor_stats(),
+        "jobs": job_queue.stats() if job_queue is not None else None,
+        "profiling": profiler.stats(),
+    }
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+@app.get("/interpretations")
+def interpretations(request: Request):
+    headers = {"ETag": INTERPRETATIONS_ETAG, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == INTERPRETATIONS_ETAG:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(
+        {"version": INTERPRETATION_CATALOGUE_VERSION, "texts": INTERPRETATION_CATALOGUE},
+        headers=headers,
+    )
+
+@timed(DB_FETCH_SECONDS.labels("answers"))
+def fetch_answers(assignment_id: int) -> List[Dict[str, Any]]:
+    with get_pool().connection() as conn:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cur.execute("""
+          SELECT question_id, answer_value
+          FROM survey_responses
+          WHERE survey_assignment_id = %s
+          ORDER BY responded_at ASC
+        """, (assignment_id,))
+        rows = cur.fetchall()
+        answers = [{"question_id": r["question_id"], "answer_value": r["answer_value"]} for r in rows]
+        cur.close()
+    return answers
+
+@timed(DB_FETCH_SECONDS.labels("answers"))
+def fetch_answer_pairs(assignment_id: int) -> List[tuple]:
+    with get_pool().connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+          SELECT question_id, answer_value
+          FROM survey_responses
+          WHERE survey_assignment_id = %s
+          ORDER BY responded_at ASC
+        """, (assignment_id,))
+        pairs = cur.fetchall()
+        cur.close()
+    return pairs
+
+# Отпечаток ответов назначения: ответы только добавляются, поэтому количество строк,
+# max(id) и max(responded_at) меняются при любом новом ответе
+FINGERPRINT_SQL = """
+  SELECT count(*), max(id), max(responded_at)
+  FROM survey_responses
+  WHERE survey_assignment_id = %s
+"""
+
+@timed(DB_FETCH_SECONDS.labels("fingerprint"))
+def fetch_fingerprint(assignment_id: int) -> tuple:
+    with get_pool().connection() as conn:
+        cur = conn.cursor()
+        cur.execute(FINGERPRINT_SQL, (assignment_id,))
+        fingerprint = tuple(cur.fetchone())
+        cur.close()
+    return fingerprint
+
+@timed(DB_FETCH_SECONDS.labels("fingerprints"))
+def fetch_fingerprints(assignment_ids: List[int]) -> Dict[int, tuple]:
+    with get_pool().connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+          SELECT survey_assignment_id, count(*), max(id), max(responded_at)
+          FROM survey_responses
+          WHERE survey_assignment_id = ANY(%s)
+          GROUP BY survey_assignment_id
+        """, (assignment_ids,))
+        found = {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+        cur.close()
+    # У назначения без ответов отпечаток тот же, что вернул бы одиночный запрос
+    return {aid: found.get(aid, (0, None, None)) for aid in assignment_ids}
+
+def score_incrementally(assignment_id: int) -> List[Dict[str, Any]]:
+    with get_pool().connection() as conn:
+        with DB_FETCH_SECONDS.labels("incremental_state").time():
+            state = advance_state(conn, assignment_id)
+    return analyze_scoring_state(state, observe_scoring)
+
+async def score_assignment(assignment_id: int) -> List[Dict[str, Any]]:
+    # Асинхронный пул asyncpg не занимает поток на время запроса к БД;
+    # без него используем синхронный пул psycopg2 через threadpool.
+    use_async_db = db_async.get_async_pool() is not None
+
+    cache_key = None
+    if result_cache.enabled:
+      if use_async_db:
+        fingerprint = await db_async.fetch_fingerprint(assignment_id)
+      else:
+        fingerprint = await run_in_threadpool(fetch_fingerprint, assignment_id)
+      cache_key = result_cache.key(assignment_id, fingerprint)
+      cached = result_cache.get_local(cache_key)
+      if cached is None and result_cache.shared is not None:
+        cached = await run_in_threadpool(result_cache.get_shared, cache_key)
+      if cached is not None:
+        ASSIGNMENTS_SCORED.labels("cache").inc()
+        return cached
+
+    if INCREMENTAL_SCORING:
+      results = await run_in_threadpool(score_incrementally, assignment_id)
+      ASSIGNMENTS_SCORED.labels("incremental").inc()
+    else:
+      if FAST_FETCH:
+        scorer = analyze_pairs
+        if use_async_db:
+          answers = await db_async.fetch_answer_pairs(assignment_id)
+        else:
+          answers = await run_in_threadpool(fetch_answer_pairs, assignment_id)
+      else:
+        scorer = analyze
+        if use_async_db:
+          answers = await db_async.fetch_answers(assignment_id)
+        else:
+          answers = await run_in_threadpool(fetch_answers, assignment_id)
+
+      # Ваша функция analyze должна принять assignment_id и массив ответов
+      if len(answers) <= INLINE_SCORING_MAX_ANSWERS:
+        results = scorer(assignment_id, answers, observe_scoring)
+      else:
+        results = await run_in_threadpool(scorer, assignment_id, answers, observe_scoring)
+      ANSWERS_PROCESSED.inc(len(answers))
+      ASSIGNMENTS_SCORED.labels("computed").inc()
+    # results = [{ "parameter_name": "...", "raw_score": 10, "standardized_score": 50, "interpretation_text": "...", "indicator": "..." }, ...]
+
+    if cache_key is not None:
+      if result_cache.shared is not None:
+        await run_in_threadpool(result_cache.set, cache_key, results)
+      else:
+        result_cache.set(cache_key, results)
+    return results
+
+def score_assignment_profiled(assignment_id: int) -> List[Dict[str, Any]]:
+    # Тот же расчёт целиком в одном потоке и мимо кэша: cProfile видит только свой поток,
+    # а результат из кэша ничего не скажет о том, куда уходит время
+    if INCREMENTAL_SCORING:
+      return score_incrementally(assignment_id)
+    if FAST_FETCH:
+      return analyze_pairs(assignment_id, fetch_answer_pairs(assignment_id), observe_scoring)
+    return analyze(assignment_id, fetch_answers(assignment_id), observe_scoring)
+
+def profile_token(request: Request) -> Optional[str]:
+    # Только из заголовка: строка запроса попадает в access-логи сервера и прокси
+    return request.headers.get(PROFILE_HEADER)
 
 @app.post("/analyze")
-def analyze_results(req: AnalyzeRequest):
+async def analyze_results(req: AnalyzeRequest, request: Request):
     try:
-      conn = get_conn()
-      cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-      cur.execute("""
-        SELECT question_id, answer_value
-        FROM survey_responses
-        WHERE survey_assignment_id = %s
-        ORDER BY responded_at ASC
-      """, (req.assignment_id,))
-      rows = cur.fetchall()
-      answers = [{"question_id": r["question_id"], "answer_value": r["answer_value"]} for r in rows]
-      cur.close()
-      conn.close()
+      profile = None
+      if profiler.should_profile(profile_token(request)):
+        results, profile = await run_in_threadpool(
+          profiler.run, "analyze:%d" % req.assignment_id, score_assignment_profiled, req.assignment_id,
+        )
+      else:
+        results = await score_assignment(req.assignment_id)
+      if should_persist(req.persist):
+        await run_in_threadpool(persist_results, {req.assignment_id: results})
+      if req.text_mode == "keys":
+        response = json_response("/analyze", { "results": apply_text_mode(results, req.text_mode), "interpretations_version": INTERPRETATION_CATALOGUE_VERSION }, request)
+      else:
+        response = json_response("/analyze", { "results": results }, request)
+      if profile is not None:
+        # Профиль забирается отдельно: GET /profiles/{id}?format=pstats|collapsed|text
+        response.headers["X-Analyzer-Profile-Id"] = profile["id"]
+        response.headers["X-Analyzer-Profile-Seconds"] = "%.6f" % profile["seconds"]
+      return response
+    except PoolTimeout as e:
+      ERRORS.labels("/analyze", "pool_timeout").inc()
+      raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+      ERRORS.labels("/analyze", "error").inc()
+      raise HTTPException(status_code=500, detail=str(e))
 
-      # Ваша функция analyze должна принять assignment_id и массив ответов
-      results = analyze(req.assignment_id, answers)
-      # results = [{ "parameter_name": "...", "raw_score": 10, "standardized_score": 50, "interpretation_text": "...", "indicator": "..." }, ...]
+def score_batch(assignment_ids: List[int], persist: Optional[bool]) -> Dict[int, List[Dict[str, Any]]]:
+    # Сначала берём из кэша всё, что уже посчитано для текущих ответов
+    scored: Dict[int, List[Dict[str, Any]]] = {}
+    cache_keys: Dict[int, str] = {}
+    if result_cache.enabled:
+      for aid, fingerprint in fetch_fingerprints(assignment_ids).items():
+        cache_keys[aid] = result_cache.key(aid, fingerprint)
+        cached = result_cache.get(cache_keys[aid])
+        if cached is not None:
+          scored[aid] = cached
+          ASSIGNMENTS_SCORED.labels("cache").inc()
+    missing = [aid for aid in assignment_ids if aid not in scored]
 
-      return { "results": results }
+    if INCREMENTAL_SCORING and len(missing) == 1:
+      # Завершение исследования (interactive-задание на одно назначение): состояние,
+      # сохранённое после М1, догоняется по новым ответам, как в /analyze
+      scored[missing[0]] = score_incrementally(missing[0])
+      ASSIGNMENTS_SCORED.labels("incremental").inc()
+      if missing[0] in cache_keys:
+        result_cache.set(cache_keys[missing[0]], scored[missing[0]])
+    elif missing:
+      # Ответы читаются серверным курсором и считаются по одному назначению за раз
+      with get_pool().connection() as conn:
+        for aid, results in stream_scores(conn, missing, executor=get_executor()):
+          scored[aid] = results
+          if aid in cache_keys:
+            result_cache.set(cache_keys[aid], results)
+
+    if should_persist(persist):
+      persist_results(scored)
+    return scored
+
+def batch_response(assignment_ids: List[int], scored: Dict[int, List[Dict[str, Any]]], text_mode: str) -> Dict[str, Any]:
+    response = {
+      "results": [
+        {"assignment_id": aid, "results": apply_text_mode(scored[aid], text_mode)}
+        for aid in assignment_ids
+      ]
+    }
+    if text_mode == "keys":
+      response["interpretations_version"] = INTERPRETATION_CATALOGUE_VERSION
+    return response
+
+@app.post("/analyze/batch")
+def analyze_batch(req: BatchAnalyzeRequest, request: Request):
+    # Повторный расчёт сразу по многим назначениям: один запрос к БД и одно соединение
+    # вместо отдельного HTTP-вызова /analyze на каждое назначение.
+    assignment_ids = list(dict.fromkeys(req.assignment_ids))
+    if not assignment_ids:
+        return json_response("/analyze/batch", { "results": [] }, request)
+    try:
+      return json_response("/analyze/batch", batch_response(assignment_ids, score_batch(assignment_ids, req.persist), req.text_mode), request)
+    except PoolTimeout as e:
+      ERRORS.labels("/analyze/batch", "pool_timeout").inc()
+      raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+      ERRORS.labels("/analyze/batch", "error").inc()
+      raise HTTPException(status_code=500, detail=str(e))
+
+def run_analyze_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Выполняется в воркере очереди заданий (отдельный поток)
+    assignment_ids = payload["assignment_ids"]
+    return batch_response(assignment_ids, score_batch(assignment_ids, payload["persist"]), payload["text_mode"])
+
+def run_export_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Результаты идут потоком прямо в файл порциями, таблица целиком в памяти не собирается;
+    # перед записью удаляются выгрузки старше ANALYZER_EXPORT_TTL
+    sweep_exports()
+    with get_pool().connection() as conn:
+      meta = export_assignments(conn, payload["company_id"], payload["date_from"], payload["date_to"])
+      assignment_ids = list(meta)
+      if payload["source"] == "stored":
+        scored = iter_stored_results(conn, assignment_ids, STREAM_ITERSIZE)
+      else:
+        scored = stream_scores(conn, assignment_ids, executor=get_executor())
+      return write_export(scored, meta, payload["path"], payload["format"])
+
+# Вид задания в payload; задания без него (сохранённые до выгрузок) — анализ
+JOB_HANDLERS = {"analyze": run_analyze_job, "export": run_export_job}
+
+def run_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return JOB_HANDLERS[payload.get("kind", "analyze")](payload)
+
+@app.post("/jobs/analyze", status_code=202)
+def submit_analyze_job(req: AnalyzeJobRequest):
+    assignment_ids = list(dict.fromkeys(([req.assignment_id] if req.assignment_id is not None else []) + req.assignment_ids))
+    if not assignment_ids:
+      raise HTTPException(status_code=400, detail="Требуется assignment_id или assignment_ids")
+    if job_queue is None:
+      raise HTTPException(status_code=503, detail="Очередь заданий не запущена")
+    priority = req.priority or ("interactive" if len(assignment_ids) == 1 else "batch")
+    payload = {"assignment_ids": assignment_ids, "text_mode": req.text_mode, "persist": req.persist}
+    try:
+      job = job_queue.submit(payload, priority)
+    except QueueFull as e:
+      # Backpressure: клиент повторяет позже, а не копит таймауты
+      raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return { "job_id": job["id"], "status": job["status"], "priority": job["priority"] }
+
+@app.post("/exports", status_code=202)
+def submit_export(req: ExportRequest):
+    # Выгрузка — batch-задание очереди; статус — GET /jobs/{job_id}, файл — GET /exports/{job_id}
+    if not export_available():
+      raise HTTPException(status_code=503, detail="Выгрузка недоступна: не установлен pyarrow")
+    if req.company_id is None and req.date_from is None and req.date_to is None:
+      raise HTTPException(status_code=400, detail="Требуется company_id или диапазон дат")
+    if job_queue is None:
+      raise HTTPException(status_code=503, detail="Очередь заданий не запущена")
+    payload = {
+      "kind": "export",
+      "company_id": req.company_id,
+      "date_from": req.date_from.isoformat() if req.date_from else None,
+      "date_to": req.date_to.isoformat() if req.date_to else None,
+      "source": req.source,
+      "format": req.format,
+      "path": export_path(uuid.uuid4().hex, req.format),
+    }
+    try:
+      job = job_queue.submit(payload, "batch")
+    except QueueFull as e:
+      raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return { "job_id": job["id"], "status": job["status"], "priority": job["priority"] }
+
+@app.get("/exports/{job_id}")
+def download_export(job_id: str):
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None or job["payload"].get("kind") != "export":
+      raise HTTPException(status_code=404, detail="Выгрузка не найдена")
+    if job["status"] != "done":
+      raise HTTPException(status_code=409, detail="Выгрузка ещё не готова: %s" % job["status"])
+    path = job["result"]["path"]
+    if not os.path.exists(path):
+      raise HTTPException(status_code=410, detail="Файл выгрузки удалён")
+    media_type = "application/vnd.apache.parquet" if job["result"]["format"] == "parquet" else "application/vnd.apache.arrow.file"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+@app.get("/jobs/{job_id}")
+def get_analyze_job(job_id: str, request: Request):
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+      raise HTTPException(status_code=404, detail="Задание не найдено")
+    response = {
+      "job_id": job["id"],
+      "status": job["status"],
+      "priority": job["priority"],
+      "created_at": job["created_at"],
+      "started_at": job["started_at"],
+      "finished_at": job["finished_at"],
+    }
+    if job["status"] == "done":
+      response["result"] = job["result"]
+    elif job["status"] == "failed":
+      response["error"] = job["error"]
+    return json_response("/jobs/{job_id}", response, request)
+
+@app.post("/analyze/stream")
+def analyze_stream(req: BatchAnalyzeRequest):
+    # Пакетный пересчёт без накопления ответа в памяти: NDJSON, по строке
+    # {"assignment_id", "results"} на назначение, в порядке возрастания assignment_id.
+    assignment_ids = list(dict.fromkeys(req.assignment_ids))
+
+    def lines():
+      with get_pool().connection() as conn:
+        for aid, results in stream_scores(conn, assignment_ids, executor=get_executor()):
+          row = {"assignment_id": aid, "results": apply_text_mode(results, req.text_mode)}
+          yield json_dumps(row) + b"\n"
+
+    # Соединение берётся при первой строке ответа и держится до конца выгрузки
+    return StreamingResponse(lines() if assignment_ids else iter(()), media_type="application/x-ndjson")
+
+def require_profile_access(request: Request) -> None:
+    if not profiler.enabled:
+      raise HTTPException(status_code=404, detail="Профилирование выключено")
+    if not profiler.authorized(profile_token(request)):
+      raise HTTPException(status_code=403, detail="Нет доступа к профилям")
+
+@app.get("/profiles")
+def list_profiles(request: Request):
+    # Самые медленные и последние профили запросов
+    require_profile_access(request)
+    return profiler.listing()
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, request: Request, format: Literal["pstats", "collapsed", "text"] = "collapsed"):
+    require_profile_access(request)
+    record = profiler.get(profile_id)
+    if record is None:
+      raise HTTPException(status_code=404, detail="Профиль не найден или уже вытеснен")
+    if format == "pstats":
+      return Response(
+        profiler.render(record, format), media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="%s.pstats"' % profile_id},
+      )
+    return Response(profiler.render(record, format), media_type="text/plain; charset=utf-8")
+
+@app.get("/results/{assignment_id}")
+def stored_results(assignment_id: int, request: Request, text_mode: TextMode = "full"):
+    # Готовый отчёт: одно чтение survey_results по индексу, без загрузки ответов и пересчёта
+    try:
+      with get_pool().connection() as conn:
+        with DB_FETCH_SECONDS.labels("stored_results").time():
+          results = load_results(conn, assignment_id)
+    except PoolTimeout as e:
+      ERRORS.labels("/results/{assignment_id}", "pool_timeout").inc()
+      raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+      ERRORS.labels("/results/{assignment_id}", "error").inc()
+      raise HTTPException(status_code=500, detail=str(e))
+    if not results:
+      raise HTTPException(status_code=404, detail="Результаты для назначения не сохранены")
+    response = { "results": apply_text_mode(results, text_mode) }
+    if text_mode == "keys":
+      response["interpretations_version"] = INTERPRETATION_CATALOGUE_VERSION
+    return json_response("/results/{assignment_id}", response, request)
+
+@app.post("/cohorts/aggregate")
+def aggregate_cohort(req: CohortRequest, request: Request):
+    # Распределения всех параметров analyze по компании и подразделениям за один проход:
+    # результаты назначений читаются потоком и сразу складываются в накопители
+    if any(not 0 <= p <= 100 for p in req.percentiles):
+      raise HTTPException(status_code=400, detail="Перцентили должны быть в диапазоне 0–100")
+    try:
+      with get_pool().connection() as conn:
+        assignment_ids = list(req.assignment_ids)
+        if req.company_id is not None:
+          assignment_ids.extend(company_assignment_ids(conn, req.company_id))
+        for group_ids in req.groups.values():
+          assignment_ids.extend(group_ids)
+        assignment_ids = list(dict.fromkeys(assignment_ids))
+        if not assignment_ids:
+          raise HTTPException(status_code=400, detail="Когорта пуста: нужен company_id, assignment_ids или groups")
+        if req.source == "stored":
+          scored = iter_stored_results(conn, assignment_ids, STREAM_ITERSIZE)
+        else:
+          scored = stream_scores(conn, assignment_ids, executor=get_executor())
+        aggregates = aggregate_cohorts(scored, req.groups, req.percentiles)
+      return json_response("/cohorts/aggregate", {"source": req.source, **aggregates}, request)
+    except HTTPException:
+      raise
+    except PoolTimeout as e:
+      ERRORS.labels("/cohorts/aggregate", "pool_timeout").inc()
+      raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
+      ERRORS.labels("/cohorts/aggregate", "error").inc()
       raise HTTPException(status_code=500, detail=str(e))
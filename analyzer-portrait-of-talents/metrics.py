@@ -0,0 +1,146 @@
+# analyzer-portrait-of-talents/metrics.py
+# Метрики анализатора в текстовом формате Prometheus (GET /metrics) на prometheus_client.
+# Замер — perf_counter и поиск корзины, поэтому метрики можно держать включёнными
+# в продакшене. Значения пулов и кэша снимаются в момент запроса /metrics коллекторами.
+# Метрики живут в собственном реестре: в /metrics только метрики анализатора.
+
+import time
+import asyncio
+import functools
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Ряды *_created не нужны: перезапуск сервиса виден и так, а размер ответа /metrics удваивается
+try:
+    from prometheus_client import disable_created_metrics
+    disable_created_metrics()
+except ImportError:  # prometheus_client < 0.17
+    pass
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# Корзины по умолчанию — от 0.1 мс до 10 с
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 32768, 65536, 131072, 262144, 1048576, 4194304)
+
+
+def timed(histogram) -> Callable[[Callable], Callable]:
+    """Декоратор: время каждого вызова функции (обычной или async) в гистограмму с метками.
+    Таймер prometheus_client для async-функции замерил бы только создание корутины."""
+    def decorate(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class StatsCollector(Collector):
+    """Числовые поля словаря статистики (pool_stats, result_cache.stats ...) как gauge с меткой-полем;
+    словарь снимается при каждом /metrics."""
+
+    def __init__(self, name: str, help: str, label: str, fn: Callable[[], Dict[str, Any]]):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.fn = fn
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        family = GaugeMetricFamily(self.name, self.help, labels=(self.label,))
+        try:
+            stats = self.fn() or {}
+        except Exception:
+            stats = {}
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                family.add_metric((str(key),), value)
+        yield family
+
+    def describe(self) -> Iterable[GaugeMetricFamily]:
+        # Без вызова fn при регистрации: пулы и очередь к этому моменту ещё не созданы
+        yield GaugeMetricFamily(self.name, self.help, labels=(self.label,))
+
+
+# === Метрики анализатора ===
+DB_FETCH_SECONDS = Histogram(
+    "analyzer_db_fetch_seconds", "Время запросов к Postgres по видам запросов", ("query",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+SCORING_SECONDS = Histogram(
+    "analyzer_scoring_seconds",
+    "Время расчёта по этапам: accumulate — общий проход по ответам, далее по тестам "
+    "(paei, ei, team_roles, motivation, iq — то, что считают calculate_*)", ("test",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+SERIALIZATION_SECONDS = Histogram(
+    "analyzer_serialization_seconds", "Время сериализации ответа в JSON", ("endpoint",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+RESPONSE_BYTES = Histogram(
+    "analyzer_response_bytes", "Размер тела ответа в байтах", ("endpoint",),
+    buckets=SIZE_BUCKETS, registry=REGISTRY)
+REQUEST_SECONDS = Histogram(
+    "analyzer_request_seconds", "Полное время обработки HTTP-запроса", ("endpoint", "method", "status"),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+ANSWERS_PROCESSED = Counter(
+    "analyzer_answers_processed_total", "Строк ответов, переданных в расчёт", registry=REGISTRY)
+ASSIGNMENTS_SCORED = Counter(
+    "analyzer_assignments_scored_total", "Посчитанных назначений по источнику результата", ("source",),
+    registry=REGISTRY)
+ERRORS = Counter(
+    "analyzer_errors_total", "Ошибок обработки запросов", ("endpoint", "kind"), registry=REGISTRY)
+
+
+def observe_scoring(test: str, seconds: float) -> None:
+    SCORING_SECONDS.labels(test).observe(seconds)
+
+
+def stats_gauge(name: str, help: str, label: str, fn: Callable[[], Dict[str, Any]]) -> StatsCollector:
+    collector = StatsCollector(name, help, label, fn)
+    REGISTRY.register(collector)
+    return collector
+
+
+def render() -> Tuple[bytes, str]:
+    """Тело ответа /metrics и его Content-Type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class RequestMetricsMiddleware:
+    """ASGI-middleware: время каждого HTTP-запроса по шаблону маршрута, методу и статусу."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Шаблон пути (/jobs/{job_id}), а не сам путь — иначе число рядов растёт без границ
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(endpoint, scope["method"], status[0]).observe(time.perf_counter() - started)
@@ -0,0 +1,223 @@
+# analyzer-portrait-of-talents/profiling.py
+# Профилирование отдельных запросов /analyze по требованию.
+# Доверенный клиент передаёт токен в заголовке X-Analyzer-Profile (не в строке запроса — она пишется в логи),
+# и запрос считается под cProfile в одном потоке: чтение ответов, декодирование JSONB и расчёт.
+# Профиль хранится в памяти: N самых медленных и N последних. Его можно скачать
+# в формате pstats (для snakeviz / python -m pstats), в виде свёрнутых стеков
+# (collapsed, для flamegraph.pl / speedscope) или текстом.
+# Без токена в окружении профилирование выключено и флаг запроса игнорируется.
+# Настройки:
+#   ANALYZER_PROFILE_TOKEN   — секрет доверенных клиентов (по умолчанию не задан — выключено)
+#   ANALYZER_PROFILE_SAMPLE  — доля помеченных запросов, которые действительно профилируются (по умолчанию 1.0)
+#   ANALYZER_PROFILE_KEEP    — сколько самых медленных и последних профилей держать (по умолчанию 20)
+#   ANALYZER_PROFILE_DIR     — каталог, куда дополнительно пишутся .pstats и .collapsed (по умолчанию не используется)
+
+import io
+import os
+import hmac
+import time
+import uuid
+import heapq
+import pstats
+import marshal
+import random
+import cProfile
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("analyzer")
+
+PROFILE_HEADER = "X-Analyzer-Profile"
+
+# Ограничение глубины свёрнутых стеков — рекурсия в профиле не раздувает файл
+MAX_STACK_DEPTH = 64
+
+
+class _Snapshot:
+    """Сохранённая статистика cProfile в виде, который принимает pstats.Stats."""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _frame_name(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":  # встроенные функции: ('~', 0, "<built-in method ...>")
+        return name
+    return "%s (%s:%d)" % (name, os.path.basename(filename), line)
+
+
+def collapsed_stacks(stats: Dict) -> str:
+    """Свёрнутые стеки "a;b;c <мкс>" из статистики cProfile.
+    cProfile хранит только рёбра вызывающий -> вызываемый, поэтому стеки восстанавливаются
+    обходом от корней, а время ребра делится пропорционально — как в flameprof."""
+    callees: Dict[Any, Dict[Any, float]] = {}
+    roots = []
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    lines: Dict[str, int] = {}
+
+    def walk(func, budget: float, stack: List[str], seen: set) -> None:
+        _, _, own, cumulative, _ = stats[func]
+        scale = budget / cumulative if cumulative > 0 else 0.0
+        stack.append(_frame_name(func))
+        micros = int(own * scale * 1e6)
+        if micros > 0:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0) + micros
+        if len(stack) < MAX_STACK_DEPTH:
+            seen.add(func)
+            for callee, edge_time in callees.get(func, {}).items():
+                # Ветки короче микросекунды не попадут в вывод — не обходим их
+                if callee not in seen and callee in stats and edge_time * scale >= 1e-6:
+                    walk(callee, edge_time * scale, stack, seen)
+            seen.discard(func)
+        stack.pop()
+
+    for root in roots:
+        walk(root, stats[root][3], [], set())
+    return "".join("%s %d\n" % (stack, micros) for stack, micros in sorted(lines.items()))
+
+
+def stats_text(stats: Dict, limit: int = 60) -> str:
+    stream = io.StringIO()
+    pstats.Stats(_Snapshot(stats), stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+class RequestProfiler:
+    def __init__(self, token: Optional[str], sample_rate: float = 1.0, keep: int = 20,
+                 directory: Optional[str] = None):
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.directory = directory
+        # Одновременно профилируется один запрос: остальные помеченные считаются как обычно
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._slowest: List[Tuple[float, str, Dict[str, Any]]] = []  # min-heap по длительности
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=keep)
+        self._profiled = 0
+        self._skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None and self.keep > 0
+
+    def authorized(self, supplied: Optional[str]) -> bool:
+        return self.enabled and bool(supplied) and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def should_profile(self, supplied: Optional[str]) -> bool:
+        return self.authorized(supplied) and random.random() < self.sample_rate
+
+    def run(self, label: str, fn: Callable, *args) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """fn(*args) под cProfile в текущем потоке -> (результат, профиль или None, если профилировщик занят)."""
+        if not self._busy.acquire(blocking=False):
+            with self._lock:
+                self._skipped += 1
+            return fn(*args), None
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                result = fn(*args)
+            finally:
+                profiler.disable()
+                seconds = time.perf_counter() - started
+        finally:
+            self._busy.release()
+
+        profiler.create_stats()
+        record = {
+            "id": uuid.uuid4().hex,
+            "label": label,
+            "seconds": round(seconds, 6),
+            "created_at": time.time(),
+            "stats": profiler.stats,
+        }
+        self._remember(record)
+        if self.directory:
+            self._write_files(record)
+        return result, record
+
+    def _remember(self, record: Dict[str, Any]) -> None:
+        entry = (record["seconds"], record["id"], record)
+        with self._lock:
+            self._profiled += 1
+            self._recent.append(record)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _write_files(self, record: Dict[str, Any]) -> None:
+        base = os.path.join(self.directory, "%d-%s" % (record["created_at"], record["id"]))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(base + ".pstats", "wb") as f:
+                f.write(self.render(record, "pstats"))
+            with open(base + ".collapsed", "wb") as f:
+                f.write(self.render(record, "collapsed"))
+        except OSError as e:
+            logger.warning("Не удалось сохранить профиль %s: %s", record["id"], e)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for _, _, record in self._slowest:
+                if record["id"] == profile_id:
+                    return record
+            for record in self._recent:
+                if record["id"] == profile_id:
+                    return record
+        return None
+
+    def listing(self) -> Dict[str, List[Dict[str, Any]]]:
+        summary = lambda record: {key: record[key] for key in ("id", "label", "seconds", "created_at")}
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+            recent = list(self._recent)
+        return {
+            "slowest": [summary(record) for _, _, record in slowest],
+            "recent": [summary(record) for record in reversed(recent)],
+        }
+
+    @staticmethod
+    def render(record: Dict[str, Any], fmt: str) -> bytes:
+        if fmt == "pstats":
+            # Тот же формат, что пишет pstats.Stats.dump_stats
+            return marshal.dumps(record["stats"])
+        if fmt == "collapsed":
+            return collapsed_stacks(record["stats"]).encode("utf-8")
+        if fmt == "text":
+            return stats_text(record["stats"]).encode("utf-8")
+        raise ValueError("Неизвестный формат профиля: %s" % fmt)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "keep": self.keep,
+                "profiled": self._profiled,
+                "skipped_busy": self._skipped,
+                "stored": len(self._slowest),
+            }
+
+
+def profiler_from_env() -> RequestProfiler:
+    return RequestProfiler(
+        os.environ.get("ANALYZER_PROFILE_TOKEN"),
+        sample_rate=float(os.environ.get("ANALYZER_PROFILE_SAMPLE", "1.0")),
+        keep=int(os.environ.get("ANALYZER_PROFILE_KEEP", "20")),
+        directory=os.environ.get("ANALYZER_PROFILE_DIR") or None,
+    )
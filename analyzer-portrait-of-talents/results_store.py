@@ -0,0 +1,130 @@
+# analyzer-portrait-of-talents/results_store.py
+# Хранение посчитанных результатов в survey_results.
+# Запись — одна транзакция на все назначения: DELETE строк параметров, которых больше нет
+# в результате, и INSERT ... ON CONFLICT (survey_assignment_id, parameter_name) DO UPDATE
+# через execute_values страницами по UPSERT_PAGE_SIZE строк; уникальный индекс создаёт
+# миграция 08_survey_results_upsert.sql. Чтение — один запрос по индексу назначения,
+# без загрузки ответов и пересчёта; для агрегатов по когортам — серверным курсором.
+
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from psycopg2.extras import execute_values
+
+RESULT_COLUMNS = (
+    "parameter_name",
+    "raw_score",
+    "standardized_score",
+    "interpretation_text",
+    "indicator",
+    "expression_level",
+    "interpretation_key",
+)
+
+UPSERT_SQL = """
+  INSERT INTO survey_results
+    (survey_assignment_id, parameter_name, raw_score, standardized_score,
+     interpretation_text, indicator, expression_level, interpretation_key)
+  VALUES %s
+  ON CONFLICT (survey_assignment_id, parameter_name) DO UPDATE SET
+    raw_score = EXCLUDED.raw_score,
+    standardized_score = EXCLUDED.standardized_score,
+    interpretation_text = EXCLUDED.interpretation_text,
+    indicator = EXCLUDED.indicator,
+    expression_level = EXCLUDED.expression_level,
+    interpretation_key = EXCLUDED.interpretation_key,
+    updated_at = NOW()
+"""
+
+# Строки назначений, параметр которых не вошёл в новый результат (например, после смены
+# спецификации), — иначе GET /results отдавал бы их вместе со свежими
+DELETE_STALE_SQL = """
+  DELETE FROM survey_results r
+  WHERE r.survey_assignment_id = ANY(%s)
+    AND NOT EXISTS (
+      SELECT 1 FROM unnest(%s::int[], %s::text[]) AS kept(assignment_id, parameter_name)
+      WHERE kept.assignment_id = r.survey_assignment_id AND kept.parameter_name = r.parameter_name
+    )
+"""
+
+SELECT_SQL = """
+  SELECT survey_assignment_id, parameter_name, raw_score, standardized_score,
+         interpretation_text, indicator, expression_level, interpretation_key
+  FROM survey_results
+  WHERE survey_assignment_id = ANY(%s)
+  ORDER BY survey_assignment_id, id
+"""
+
+UPSERT_PAGE_SIZE = 1000
+
+
+def _result_rows(assignment_id: int, results: List[Dict[str, Any]]) -> Iterable[Tuple]:
+    for row in results:
+        yield (assignment_id,) + tuple(row.get(column) for column in RESULT_COLUMNS)
+
+
+def save_results_many(conn, scored: Dict[int, List[Dict[str, Any]]]) -> int:
+    """Заменяет результаты нескольких назначений в одной транзакции. Возвращает число строк."""
+    if not scored:
+        return 0
+    rows = [row for aid, results in scored.items() for row in _result_rows(aid, results)]
+    with conn.cursor() as cur:
+        cur.execute(DELETE_STALE_SQL, (list(scored), [row[0] for row in rows], [row[1] for row in rows]))
+        if rows:
+            execute_values(cur, UPSERT_SQL, rows, page_size=UPSERT_PAGE_SIZE)
+    conn.commit()
+    return len(rows)
+
+
+def save_results(conn, assignment_id: int, results: List[Dict[str, Any]]) -> int:
+    return save_results_many(conn, {assignment_id: results})
+
+
+def _number(value):
+    # NUMERIC приходит как Decimal — отдаём так же, как считает analyze()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _stored_row(values) -> Dict[str, Any]:
+    row = dict(zip(RESULT_COLUMNS, values))
+    row["raw_score"] = _number(row["raw_score"])
+    row["standardized_score"] = _number(row["standardized_score"])
+    if row["interpretation_key"] is None:
+        del row["interpretation_key"]
+    return row
+
+
+def load_results_many(conn, assignment_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    stored: Dict[int, List[Dict[str, Any]]] = {aid: [] for aid in assignment_ids}
+    with conn.cursor() as cur:
+        cur.execute(SELECT_SQL, (assignment_ids,))
+        for aid, *values in cur.fetchall():
+            stored[aid].append(_stored_row(values))
+    return stored
+
+
+def iter_stored_results(conn, assignment_ids: List[int], itersize: int = 2000) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """(assignment_id, сохранённые строки) по возрастанию assignment_id через именованный курсор;
+    в памяти — результаты одного назначения. Назначение без результатов выдаётся с пустым списком."""
+    cur = conn.cursor(name="stored_results_stream")
+    cur.itersize = itersize
+    try:
+        cur.execute(SELECT_SQL, (assignment_ids,))
+        groups = groupby(cur, key=itemgetter(0))
+        current = next(groups, None)
+        for aid in sorted(set(assignment_ids)):
+            rows = []
+            if current is not None and current[0] == aid:
+                rows = [_stored_row(values) for _, *values in current[1]]
+                current = next(groups, None)
+            yield aid, rows
+    finally:
+        cur.close()
+
+
+def load_results(conn, assignment_id: int) -> List[Dict[str, Any]]:
+    return load_results_many(conn, [assignment_id])[assignment_id]
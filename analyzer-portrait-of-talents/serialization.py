@@ -0,0 +1,66 @@
+# analyzer-portrait-of-talents/serialization.py
+# Кодирование ответов API напрямую в байты, мимо jsonable_encoder и стандартного json.
+# Ответы анализатора — уже готовые списки словарей из чисел и строк, поэтому обход
+# jsonable_encoder ничего не даёт, а orjson кодирует их в несколько раз быстрее json.dumps.
+# Для вызовов между сервисами (backend на Node) ответ можно получить в MessagePack:
+# заголовок Accept: application/msgpack. Если msgpack не установлен или выключен,
+# ответ остаётся JSON — клиент различает их по Content-Type.
+# Настройки:
+#   ANALYZER_JSON_ENCODER — чем кодировать JSON: orjson (по умолчанию, если установлен) или json
+#   ANALYZER_MSGPACK      — отвечать MessagePack на Accept: application/msgpack (по умолчанию 1)
+
+import os
+import json
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # MessagePack недоступен — все ответы в JSON
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def plain(value: Any) -> Any:
+    # Скаляры и массивы numpy (bulk-расчёт) -> обычные числа и списки;
+    # общие неизменяемые строки результатов (MappingProxyType) -> обычные словари
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError("Не сериализуется: %s" % type(value).__name__)
+
+
+def resolve_json_dumps(name: str) -> Callable[[Any], bytes]:
+    # Тот же выбор, что для декодера JSONB в db.py: orjson, если установлен
+    if name == "orjson":
+        try:
+            import orjson
+            # Нечисловые ключи и numpy — как у json.dumps с plain; NaN orjson пишет как null
+            options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            return lambda payload: orjson.dumps(payload, default=plain, option=options)
+        except ImportError:
+            pass
+    return lambda payload: json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=plain,
+    ).encode("utf-8")
+
+
+json_dumps = resolve_json_dumps(os.environ.get("ANALYZER_JSON_ENCODER", "orjson"))
+MSGPACK_ENABLED = msgpack is not None and os.environ.get("ANALYZER_MSGPACK", "1") == "1"
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    if not MSGPACK_ENABLED or not accept:
+        return False
+    return any(part.split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES for part in accept.split(","))
+
+
+def encode(payload: Any, accept: Optional[str] = None) -> Tuple[bytes, str]:
+    """payload -> (тело ответа, Content-Type) по заголовку Accept клиента."""
+    if wants_msgpack(accept):
+        return msgpack.packb(payload, use_bin_type=True, default=plain), MSGPACK_MEDIA_TYPE
+    return json_dumps(payload), JSON_MEDIA_TYPE
+
@@ -0,0 +1,66 @@
+# analyzer-portrait-of-talents/state_store.py
+# Хранение инкрементального состояния расчёта в scoring_states (миграция 09).
+# Вместе с состоянием хранится id последней учтённой строки survey_responses:
+# при следующем расчёте загружаются только более новые строки, так что стоимость
+# /analyze после М1 или финального ответа — O(новых ответов), а не всего набора.
+
+from typing import Any, Dict, Optional, Tuple
+
+from psycopg2.extras import Json
+
+from analyzer_main import new_scoring_state, update_scoring_state_pairs, dump_scoring_state, load_scoring_state
+
+SELECT_STATE_SQL = """
+  SELECT last_response_id, state
+  FROM scoring_states
+  WHERE survey_assignment_id = %s
+"""
+
+# Более старое состояние не затирает более новое, если два расчёта идут параллельно
+UPSERT_STATE_SQL = """
+  INSERT INTO scoring_states (survey_assignment_id, last_response_id, state)
+  VALUES (%s, %s, %s)
+  ON CONFLICT (survey_assignment_id) DO UPDATE SET
+    last_response_id = EXCLUDED.last_response_id,
+    state = EXCLUDED.state,
+    updated_at = NOW()
+  WHERE scoring_states.last_response_id <= EXCLUDED.last_response_id
+"""
+
+NEW_ANSWERS_SQL = """
+  SELECT id, question_id, answer_value
+  FROM survey_responses
+  WHERE survey_assignment_id = %s AND id > %s
+  ORDER BY responded_at ASC, id ASC
+"""
+
+
+def load_state(conn, assignment_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_STATE_SQL, (assignment_id,))
+        row = cur.fetchone()
+    if row is None:
+        return None, 0
+    state = load_scoring_state(row[1])
+    # Состояние от другой версии спецификации — считаем заново со всех ответов
+    return (state, row[0]) if state is not None else (None, 0)
+
+
+def save_state(conn, assignment_id: int, state: Dict[str, Any], last_response_id: int) -> None:
+    with conn.cursor() as cur:
+        cur.execute(UPSERT_STATE_SQL, (assignment_id, last_response_id, Json(dump_scoring_state(state))))
+    conn.commit()
+
+
+def advance_state(conn, assignment_id: int) -> Dict[str, Any]:
+    """Догоняет сохранённое состояние назначения по новым ответам и сохраняет его."""
+    state, last_response_id = load_state(conn, assignment_id)
+    if state is None:
+        state = new_scoring_state()
+    with conn.cursor() as cur:
+        cur.execute(NEW_ANSWERS_SQL, (assignment_id, last_response_id))
+        rows = cur.fetchall()
+    if rows:
+        update_scoring_state_pairs(state, [(q_id, val) for _, q_id, val in rows])
+        save_state(conn, assignment_id, state, max(row[0] for row in rows))
+    return state
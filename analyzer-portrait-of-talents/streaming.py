@@ -0,0 +1,65 @@
+# analyzer-portrait-of-talents/streaming.py
+# Потоковое чтение ответов многих назначений для пакетного пересчёта и выгрузок.
+# Строки идут через именованный (серверный) курсор порциями по itersize,
+# группируются по назначению генератором и сразу отдаются на расчёт — в памяти
+# одновременно только ответы одного назначения и одна порция строк.
+# Настройки:
+#   ANALYZER_STREAM_ITERSIZE — строк за один обмен с сервером (по умолчанию 2000)
+
+import os
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from analyzer_main import analyze_pairs
+from metrics import ANSWERS_PROCESSED, ASSIGNMENTS_SCORED, observe_scoring
+
+STREAM_ITERSIZE = int(os.environ.get("ANALYZER_STREAM_ITERSIZE", "2000"))
+
+STREAM_ANSWERS_SQL = """
+  SELECT survey_assignment_id, question_id, answer_value
+  FROM survey_responses
+  WHERE survey_assignment_id = ANY(%s)
+  ORDER BY survey_assignment_id, responded_at ASC
+"""
+
+
+def iter_response_rows(conn, assignment_ids: List[int], itersize: int = None) -> Iterator[Tuple]:
+    # Именованный курсор живёт внутри транзакции соединения; пул откатит её при возврате
+    cur = conn.cursor(name="analyze_stream")
+    cur.itersize = itersize or STREAM_ITERSIZE
+    try:
+        cur.execute(STREAM_ANSWERS_SQL, (assignment_ids,))
+        for row in cur:
+            yield row
+    finally:
+        cur.close()
+
+
+def group_answers(rows: Iterable[Tuple], assignment_ids: List[int]) -> Iterator[Tuple[int, List[Tuple[Any, Any]]]]:
+    """(assignment_id, пары (question_id, answer_value)) по возрастанию assignment_id;
+    строки должны быть отсортированы так же. Назначение без ответов выдаётся
+    с пустым списком, как в одиночном /analyze."""
+    groups = groupby(rows, key=itemgetter(0))
+    current = next(groups, None)
+    for aid in sorted(set(assignment_ids)):
+        pairs = []
+        if current is not None and current[0] == aid:
+            pairs = [(question_id, answer_value) for _, question_id, answer_value in current[1]]
+            current = next(groups, None)
+        yield aid, pairs
+
+
+def score_stream(grouped: Iterable[Tuple[int, List[Tuple[Any, Any]]]]) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    for aid, pairs in grouped:
+        results = analyze_pairs(aid, pairs, observe_scoring)
+        ANSWERS_PROCESSED.inc(len(pairs))
+        ASSIGNMENTS_SCORED.labels("computed").inc()
+        yield aid, results
+
+
+def stream_scores(conn, assignment_ids: List[int], itersize: int = None,
+                  executor=None) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    # С пулом процессов (executor.py) назначения считаются порциями параллельно, порядок тот же
+    grouped = group_answers(iter_response_rows(conn, assignment_ids, itersize), assignment_ids)
+    return executor.score_many(grouped) if executor is not None else score_stream(grouped)
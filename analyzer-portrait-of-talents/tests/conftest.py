@@ -0,0 +1,7 @@
+# analyzer-portrait-of-talents/tests/conftest.py
+# Модули сервиса лежат плоско рядом с main.py: тесты импортируют их из каталога сервиса.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,33 @@
+# analyzer-portrait-of-talents/tests/test_analyze_baseline.py
+# Регрессия расчёта: analyze на зафиксированных наборах ответов совпадает с результатами
+# расчёта до перехода на общую спецификацию SCORING_SPEC, таблицы процентов и пороги уровней.
+# data/analyze_baseline.json записан расчётом исходной версии analyzer_main.py по каждому
+# тесту в порядке analyze; тексты интерпретаций хранятся как первые 16 знаков sha256.
+# interpretation_key в исходной версии не было — он не сравнивается.
+
+import json
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from analyzer_main import analyze
+
+BASELINE = json.loads((Path(__file__).parent / "data" / "analyze_baseline.json").read_text(encoding="utf-8"))
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def comparable(row):
+    row = {key: value for key, value in row.items() if key != "interpretation_key"}
+    row["interpretation_text"] = text_digest(row["interpretation_text"])
+    return row
+
+
+@pytest.mark.parametrize("case", range(len(BASELINE)))
+def test_analyze_matches_baseline(case):
+    answers = BASELINE[case]["answers"]
+    expected = BASELINE[case]["results"]
+    assert [comparable(row) for row in analyze(1, answers)] == expected
@@ -0,0 +1,75 @@
+# analyzer-portrait-of-talents/tests/test_bulk.py
+# Пакетный расчёт (answers_to_matrices + bulk_score) даёт те же баллы, проценты и уровни,
+# что analyze, в том числе на повторных строках ответов и повторяющихся полях Теста 3.
+
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analyzer_main import (
+    EI_COMPETENCY_ITEMS, PAEI_SCALE_ITEMS, TEAM_ROLE_FIELDS, TEAM_ROLE_QUESTIONS,
+    analyze, answers_to_matrices, bulk_score,
+)
+
+FIELDS = sorted({field for fields in TEAM_ROLE_FIELDS.values() for field in fields})
+LEVELS = {"низкий": "low", "средний": "medium", "высокий": "high", "очень высокий": "very_high", "потенциал": "potential"}
+
+
+def answer_set(rng: random.Random):
+    answers = []
+    # Тест 1: ответы суммируются, в том числе повторные строки на тот же вопрос
+    for q_id in range(1, 49):
+        for _ in range(rng.choice([1, 1, 2])):
+            answers.append({"question_id": rng.choice([q_id, str(q_id)]), "answer_value": rng.randint(1, 4)})
+    # Тест 2: изменённый ответ приходит новой строкой — учитывается последний
+    for q_id in sorted({q for items in EI_COMPETENCY_ITEMS.values() for q in items}):
+        for _ in range(rng.choice([1, 2])):
+            answers.append({"question_id": f"ei:{q_id}", "answer_value": rng.choice([-3, -1, 1, 3])})
+    # Тест 3: поле может повториться в ответах на разные вопросы
+    for q_id in TEAM_ROLE_QUESTIONS:
+        for _ in range(rng.choice([1, 2])):
+            value = {field: rng.randint(0, 3) for field in rng.sample(FIELDS, 6)}
+            answers.append({"question_id": q_id, "answer_value": value})
+    # Тест 4: экраны backend — пара баллов списком
+    for number in range(50, 78):
+        a = rng.randint(0, 5)
+        answers.append({"question_id": f"m1_q{number}", "answer_value": [a, 5 - a]})
+    rng.shuffle(answers)
+    return answers
+
+
+def test_bulk_matches_analyze():
+    rng = random.Random(6)
+    sets = [answer_set(rng) for _ in range(40)]
+    out = bulk_score(*answers_to_matrices(sets))
+
+    names = {"paei": lambda scale: f"{scale}_result"}
+    for i, answers in enumerate(sets):
+        results = {row["parameter_name"]: row for row in analyze(1, answers)}
+        for test, block in out.items():
+            for j, scale in enumerate(block["scales"]):
+                row = results[names.get(test, str)(scale)]
+                assert row["raw_score"] == block["raw"][i, j], (i, test, scale)
+                assert row["standardized_score"] == block["standardized"][i, j], (i, test, scale)
+                assert LEVELS[row["expression_level"]] == block["categories"][block["level"][i, j]], (i, test, scale)
+        total = results["total_emotional_intelligence"]
+        assert total["raw_score"] == out["ei"]["total_raw"][i]
+        assert total["standardized_score"] == out["ei"]["total_standardized"][i]
+
+
+def test_duplicate_rows_are_summed_for_paei_only():
+    answers = [
+        {"question_id": 1, "answer_value": 3},
+        {"question_id": 1, "answer_value": 4},
+        {"question_id": 97, "answer_value": {"B7": 2}},
+        {"question_id": 98, "answer_value": {"B7": 5}},
+    ]
+    out = bulk_score(*answers_to_matrices([answers]))
+    p = list(PAEI_SCALE_ITEMS).index("P")
+    im = list(TEAM_ROLE_FIELDS).index("Im")
+    assert out["paei"]["raw"][0, p] == 7
+    assert out["team_roles"]["raw"][0, im] == 7
+    # Вопрос 1 входит и в Тест 2: там учитывается только последний ответ
+    assert out["ei"]["total_raw"][0] == 4
@@ -0,0 +1,67 @@
+# analyzer-portrait-of-talents/tests/test_db_pool.py
+# Пул соединений проверяет соединение при выдаче и заменяет разорванное сервером.
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import psycopg2
+
+from db import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.dropped = False
+        self.info = type("Info", (), {"transaction_status": psycopg2.extensions.TRANSACTION_STATUS_IDLE})()
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.dropped:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__("postgres://", **kwargs)
+        self.opened = []
+
+    def _connect(self):
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+
+def test_dropped_connection_is_replaced_on_checkout():
+    pool = FakePool(max_size=1)
+    first = pool.getconn()
+    pool.putconn(first)
+    # Сервер разорвал соединение сразу после возврата в пул
+    first.dropped = True
+
+    second = pool.getconn()
+    assert second is not first
+    assert first.closed
+    assert pool.stats()["discarded"] == 1
+
+
+def test_idle_shortcut_is_opt_in():
+    pool = FakePool(max_size=1, validate_after=60)
+    first = pool.getconn()
+    pool.putconn(first)
+    first.dropped = True
+    assert pool.getconn() is first
@@ -0,0 +1,22 @@
+# analyzer-portrait-of-talents/tests/test_export.py
+# Файлы выгрузки удаляются по сроку хранения ANALYZER_EXPORT_TTL.
+
+import os
+
+import export
+
+
+def test_sweep_removes_only_expired_export_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    names = ("old.parquet", "old.arrow.part", "fresh.parquet", "notes.txt")
+    for name in names:
+        (tmp_path / name).write_bytes(b"x")
+    now = 1_000_000.0
+    for name in ("old.parquet", "old.arrow.part", "notes.txt"):
+        os.utime(tmp_path / name, (now - 7200, now - 7200))
+    os.utime(tmp_path / "fresh.parquet", (now - 60, now - 60))
+
+    assert export.sweep_exports(ttl=3600, now=now) == 2
+    assert sorted(os.listdir(tmp_path)) == ["fresh.parquet", "notes.txt"]
+    # 0 — файлы не удаляются
+    assert export.sweep_exports(ttl=0, now=now + 10 ** 6) == 0
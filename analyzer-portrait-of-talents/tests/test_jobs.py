@@ -0,0 +1,58 @@
+# analyzer-portrait-of-talents/tests/test_jobs.py
+# Очередь заданий: граница хранения завершённых заданий в SQLite и остановка без потери заданий.
+
+import time
+import threading
+import sqlite3
+
+from jobs import JobQueue, SQLiteJobStore
+
+
+def wait_all_taken(queue, timeout=5.0):
+    # Взятые задания stop() дождётся сам, не взятые остались бы в очереди
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(queue.stats()["queued"].values()):
+            return
+        time.sleep(0.01)
+    raise AssertionError("задания не взяты за %.1f с" % timeout)
+
+
+def test_finished_jobs_are_trimmed_in_sqlite(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(lambda payload: {"n": payload["n"]}, workers=2, keep=3, store=SQLiteJobStore(path)).start()
+    ids = [queue.submit({"n": n})["id"] for n in range(10)]
+    wait_all_taken(queue)
+    queue.stop()
+
+    rows = sqlite3.connect(path).execute("SELECT id, status FROM jobs").fetchall()
+    assert len(rows) == 3
+    assert all(status == "done" for _, status in rows)
+    assert {job_id for job_id, _ in rows} <= set(ids)
+
+
+def test_stop_waits_for_running_jobs(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(payload):
+        started.set()
+        release.wait()
+        return {"n": payload["n"]}
+
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(slow, workers=2, store=SQLiteJobStore(path)).start()
+    job_id = queue.submit({"n": 1})["id"]
+    assert started.wait(5)
+
+    stopper = threading.Thread(target=queue.stop)
+    stopper.start()
+    stopper.join(0.2)
+    # Задание ещё считается — stop() не возвращается, и пулы соединений не закрываются
+    assert stopper.is_alive()
+    release.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+
+    status = sqlite3.connect(path).execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    assert status == ("done",)
@@ -0,0 +1,81 @@
+# analyzer-portrait-of-talents/tests/test_jobs_incremental.py
+# Задание /jobs/analyze на одно назначение при ANALYZER_INCREMENTAL=1 догоняет состояние,
+# сохранённое в scoring_states после М1, а не пересчитывает все ответы заново.
+
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("psycopg2")
+
+import main
+from analyzer_main import analyze_pairs, dump_scoring_state, new_scoring_state, update_scoring_state_pairs
+from cache import LRUCache, ResultCache
+from state_store import NEW_ANSWERS_SQL, SELECT_STATE_SQL, UPSERT_STATE_SQL
+
+M1 = [(q_id, 3) for q_id in range(1, 57)] + [(97, {"B1": 4, "B7": 6})]
+FINAL = [("q1", "a"), (50, 5), ("q2", 2)]
+
+
+class FakeDatabase:
+    """scoring_states и survey_responses одного назначения в памяти."""
+
+    def __init__(self, responses, state, last_response_id):
+        self.responses = responses  # [(id, question_id, answer_value)]
+        self.state = state
+        self.last_response_id = last_response_id
+        self.queries = []
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.queries.append((sql, params))
+        if sql == UPSERT_STATE_SQL:
+            _, self.last_response_id, state = params
+            self.state = state.adapted
+
+    def fetchone(self):
+        sql, _ = self.queries[-1]
+        assert sql == SELECT_STATE_SQL
+        return (self.last_response_id, self.state) if self.state is not None else None
+
+    def fetchall(self):
+        sql, (_, after_id) = self.queries[-1]
+        assert sql == NEW_ANSWERS_SQL
+        return [row for row in self.responses if row[0] > after_id]
+
+    def commit(self):
+        pass
+
+
+def test_single_assignment_job_consumes_stored_state(monkeypatch):
+    responses = [(i, q_id, val) for i, (q_id, val) in enumerate(M1 + FINAL, 1)]
+    after_m1 = update_scoring_state_pairs(new_scoring_state(), M1)
+    database = FakeDatabase(responses, dump_scoring_state(after_m1), len(M1))
+
+    def full_rescore(*args, **kwargs):
+        raise AssertionError("задание пересчитало все ответы вместо сохранённого состояния")
+
+    monkeypatch.setattr(main, "INCREMENTAL_SCORING", True)
+    monkeypatch.setattr(main, "result_cache", ResultCache(LRUCache(maxsize=0)))
+    monkeypatch.setattr(main, "get_pool", lambda: database)
+    monkeypatch.setattr(main, "stream_scores", full_rescore)
+
+    job = main.run_job({"assignment_ids": [7], "text_mode": "full", "persist": False})
+
+    new_answers = [params for sql, params in database.queries if sql == NEW_ANSWERS_SQL]
+    assert new_answers == [(7, len(M1))]
+    assert database.last_response_id == len(responses)
+    assert job["results"] == [{"assignment_id": 7, "results": analyze_pairs(7, M1 + FINAL)}]
@@ -0,0 +1,110 @@
+# analyzer-portrait-of-talents/tests/test_question_ids.py
+# Ответы с question_id backend ("m1_q13", "m2_q7") считаются так же, как ответы
+# на вопросы спецификации каждого теста по отдельности.
+
+import json
+import random
+
+import pytest
+
+from analyzer_main import (
+    ANSWER_KEY, EI_COMPETENCY_ITEMS, HYGIENE_FACTOR_ITEMS, MOTIVATION_FACTOR_ITEMS, PAEI_SCALE_ITEMS,
+    RESULT_BUILDERS, TEAM_ROLE_FIELDS, TEAM_ROLE_QUESTIONS, TEST_SCORING_INDEXES,
+    accumulate_pairs, analyze, analyze_pairs, analyze_scoring_state, dump_scoring_state, load_scoring_state,
+    new_scoring_state, update_scoring_state_pairs,
+)
+
+SECTIONS = sorted({field[0] for fields in TEAM_ROLE_FIELDS.values() for field in fields})
+MOTIVATION_ITEMS = sorted({q for items in (*HYGIENE_FACTOR_ITEMS.values(), *MOTIVATION_FACTOR_ITEMS.values()) for q in items})
+EI_ITEMS = sorted({q for items in EI_COMPETENCY_ITEMS.values() for q in items})
+
+
+def respondent(rng: random.Random, as_dicts: bool):
+    """(ответы по экранам backend, ответы по вопросам спецификации каждого теста)."""
+    screens = []
+    native = {test: [] for test, _ in RESULT_BUILDERS}
+    number = 0
+    for i in range(len(PAEI_SCALE_ITEMS["P"])):
+        number += 1
+        ranks = rng.sample([1, 2, 3, 4], 4)
+        value = dict(zip("PAEI", ranks)) if as_dicts else ranks
+        screens.append((f"m1_q{number}", value))
+        native["paei"].extend((items[i], rank) for items, rank in zip(PAEI_SCALE_ITEMS.values(), ranks))
+    for q_id in EI_ITEMS:
+        number += 1
+        value = rng.choice([-3, -2, -1, 1, 2, 3])
+        screens.append((f"m1_q{number}", value))
+        native["ei"].append((q_id, value))
+    for section, q_id in zip(SECTIONS, TEAM_ROLE_QUESTIONS):
+        number += 1
+        points = [0] * 8
+        for _ in range(10):
+            points[rng.randrange(8)] += 1
+        value = {f"{section}{k + 1}": p for k, p in enumerate(points)}
+        screens.append((f"m1_q{number}", value))
+        native["team_roles"].append((q_id, value))
+    for first, second in zip(MOTIVATION_ITEMS[::2], MOTIVATION_ITEMS[1::2]):
+        number += 1
+        a = rng.randint(0, 5)
+        value = {f"B{first}": a, f"B{second}": 5 - a} if as_dicts else [a, 5 - a]
+        screens.append((f"m1_q{number}", value))
+        native["motivation"].extend([(first, a), (second, 5 - a)])
+    for q_id, correct in ANSWER_KEY.items():
+        if rng.random() < 0.2:
+            continue
+        value = rng.choice(list(correct)) if rng.random() < 0.6 else "нет"
+        screens.append((f"m2_{q_id}", value))
+        native["iq"].append((q_id, value))
+    rng.shuffle(screens)
+    return screens, native
+
+
+@pytest.mark.parametrize("as_dicts", [False, True])
+def test_screen_ids_score_like_spec_questions(as_dicts):
+    rng = random.Random(20260101 + as_dicts)
+    for _ in range(50):
+        screens, native = respondent(rng, as_dicts)
+        state = accumulate_pairs(screens)
+        for test, build in RESULT_BUILDERS:
+            expected = build(accumulate_pairs(native[test], TEST_SCORING_INDEXES[test]))
+            assert build(state) == expected, test
+
+
+def test_screen_ids_are_not_ignored():
+    screens, _ = respondent(random.Random(7), as_dicts=False)
+    raw = [row["raw_score"] for row in analyze_pairs(1, screens) if isinstance(row.get("raw_score"), (int, float))]
+    assert any(raw)
+
+
+def test_screen_ids_through_answer_dicts_and_incremental_state():
+    screens, _ = respondent(random.Random(11), as_dicts=True)
+    expected = analyze(1, [{"question_id": q, "answer_value": v} for q, v in screens])
+    assert analyze_pairs(1, screens) == expected
+
+    # М1, сохранение состояния в JSON, затем М2 — как при ANALYZER_INCREMENTAL=1
+    m1 = [pair for pair in screens if pair[0].startswith("m1_")]
+    m2 = [pair for pair in screens if pair[0].startswith("m2_")]
+    state = update_scoring_state_pairs(new_scoring_state(), m1)
+    restored = load_scoring_state(json.loads(json.dumps(dump_scoring_state(state))))
+    assert analyze_scoring_state(update_scoring_state_pairs(restored, m2)) == expected
+
+
+def test_unknown_and_malformed_screens_are_counted():
+    baseline = analyze_pairs(1, [])
+    pairs = [("m1_q999", 3), ("m3_q1", 1), ("m1_q1", "abc"), ("m1_q50", None), ("m1_q13", [1])]
+    assert analyze_pairs(1, pairs) == baseline
+    assert update_scoring_state_pairs(new_scoring_state(), pairs)["unscored"] == len(pairs)
+
+
+def test_backend_e2e_payload(caplog):
+    # Ответы в том виде, в каком их отправляет backend/src/tests/survey.e2e.spec.js
+    pairs = [("m1_q1", 3), ("m1_q2", 4), ("m2_q1", [1, 2, 3]), ("m2_q2", {"a": 1})]
+    with caplog.at_level("WARNING", logger="analyzer"):
+        state = update_scoring_state_pairs(new_scoring_state(), pairs)
+    # Одно число на экране четырёх оценок P/A/E/I и словарь без value/score не угадываются
+    assert state["unscored"] == 3
+    assert "m1_q1" in caplog.text and "m2_q2" in caplog.text
+    restored = load_scoring_state(json.loads(json.dumps(dump_scoring_state(state))))
+    assert restored["unscored"] == 3
+    # Ответ m2_q1 учтён как ответ на вопрос q1 Теста 5
+    assert analyze_scoring_state(state) == analyze_pairs(1, [("q1", [1, 2, 3])])
@@ -0,0 +1,16 @@
+-- backend/migrations/08_survey_results_upsert.sql
+-- Уникальный ключ (назначение, параметр) для upsert результатов из анализатора
+-- и поля, которые анализатор возвращает вместе с баллами.
+ALTER TABLE survey_results ADD COLUMN IF NOT EXISTS expression_level TEXT;
+ALTER TABLE survey_results ADD COLUMN IF NOT EXISTS interpretation_key TEXT;
+ALTER TABLE survey_results ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT NOW();
+
+-- Повторные расчёты раньше дописывали строки — оставляем последнюю по каждому параметру
+DELETE FROM survey_results older
+USING survey_results newer
+WHERE older.survey_assignment_id = newer.survey_assignment_id
+  AND older.parameter_name = newer.parameter_name
+  AND older.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sresults_assignment_parameter
+  ON survey_results(survey_assignment_id, parameter_name);
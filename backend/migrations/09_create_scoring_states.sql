@@ -0,0 +1,9 @@
+-- backend/migrations/09_create_scoring_states.sql
+-- Инкрементальное состояние расчёта анализатора: накопители шкал и последние ответы
+-- по назначению, а также id последней учтённой строки survey_responses.
+CREATE TABLE IF NOT EXISTS scoring_states (
+  survey_assignment_id INTEGER PRIMARY KEY REFERENCES survey_assignments(id) ON DELETE CASCADE,
+  last_response_id INTEGER NOT NULL DEFAULT 0,
+  state JSONB NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
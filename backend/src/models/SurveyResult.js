@@ -12,28 +12,45 @@ class SurveyResult {
     this.standardized_score = data.standardized_score;
     this.interpretation_text = data.interpretation_text;
     this.indicator = data.indicator;
+    this.expression_level = data.expression_level;
+    this.interpretation_key = data.interpretation_key;
     this.created_at = data.created_at;
   }
 
-  // Сохраняет результаты (без шифрования)
+  // Сохраняет результаты (без шифрования); повторный расчёт обновляет строки по (назначение, параметр),
+  // а строки параметров, которых нет в новом результате, удаляет тем же запросом
   static async saveResults(assignmentId, results) {
     const query = `
+      WITH stale AS (
+        DELETE FROM survey_results
+        WHERE survey_assignment_id = $1 AND NOT (parameter_name = ANY($${results.length * 8 + 1}::text[]))
+      )
       INSERT INTO survey_results 
-      (survey_assignment_id, parameter_name, raw_score, standardized_score, interpretation_text, indicator)
-      VALUES ${results.map((_, i) => `($${i*6+1}, $${i*6+2}, $${i*6+3}, $${i*6+4}, $${i*6+5}, $${i*6+6})`).join(', ')}
+      (survey_assignment_id, parameter_name, raw_score, standardized_score, interpretation_text, indicator, expression_level, interpretation_key)
+      VALUES ${results.map((_, i) => `(${[1, 2, 3, 4, 5, 6, 7, 8].map(j => `$${i*8+j}`).join(', ')})`).join(', ')}
+      ON CONFLICT (survey_assignment_id, parameter_name) DO UPDATE SET
+        raw_score = EXCLUDED.raw_score,
+        standardized_score = EXCLUDED.standardized_score,
+        interpretation_text = EXCLUDED.interpretation_text,
+        indicator = EXCLUDED.indicator,
+        expression_level = EXCLUDED.expression_level,
+        interpretation_key = EXCLUDED.interpretation_key,
+        updated_at = NOW()
     `;
 
     const values = [];
     for (const r of results) {
-      values.push(assignmentId, r.parameter_name, r.raw_score, r.standardized_score, r.interpretation_text, r.indicator);
+      values.push(assignmentId, r.parameter_name, r.raw_score, r.standardized_score, r.interpretation_text, r.indicator,
+        r.expression_level ?? null, r.interpretation_key ?? null);
     }
+    values.push(results.map(r => r.parameter_name));
 
     await db.query(query, values);
   }
 
   // Получает результаты по ID назначения
   static async findByAssignmentId(assignmentId) {
-    const result = await db.query('SELECT * FROM survey_results WHERE survey_assignment_id = $1', [assignmentId]);
+    const result = await db.query('SELECT * FROM survey_results WHERE survey_assignment_id = $1 ORDER BY id', [assignmentId]);
     return result.rows;
   }
 }
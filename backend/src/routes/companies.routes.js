@@ -12,6 +12,8 @@ const authenticateToken = require('../middleware/authenticateToken');
 const checkRole = require('../middleware/checkRole');
 const validateRequest = require('../middleware/validateRequest');
 const { pagination, companyCreate, idParam } = require('../utils/validation');
+const { decryptField } = require('../utils/encryption.service');
+const { aggregateCohort } = require('../services/analysis.service');
 
 // Хелпер: проверка доступа user к своей компании
 async function ensureUserCompanyAccess(req, res, next) {
@@ -128,4 +130,38 @@ router.delete('/:id',
   }
 );
 
+// GET /api/companies/:id/results/aggregate — распределения результатов по компании и подразделениям
+// (admin или user своей компании). Подразделения зашифрованы, поэтому группы собираются здесь,
+// а сами агрегаты считает анализатор, не передавая в backend результаты каждого сотрудника.
+router.get('/:id/results/aggregate',
+  authenticateToken, checkRole('admin','user'),
+  idParam('id'), validateRequest, ensureUserCompanyAccess,
+  async (req, res) => {
+    const { id } = req.params;
+    const source = req.query.source === 'computed' ? 'computed' : 'stored';
+    try {
+      const { rows: companies } = await db.query('SELECT name FROM companies WHERE id = $1', [id]);
+      if (!companies.length) return res.status(404).json({ error: 'Компания не найдена' });
+      const companyName = companies[0].name || 'default_company';
+
+      const { rows } = await db.query(
+        `SELECT sa.id, e.department
+         FROM survey_assignments sa
+         JOIN employees e ON e.id = sa.employee_id
+         WHERE e.company_id = $1 AND sa.status = 'completed'`, [id]);
+
+      const groups = {};
+      for (const row of rows) {
+        const department = decryptField(row.department, companyName) || 'Без подразделения';
+        (groups[department] = groups[department] || []).push(row.id);
+      }
+
+      res.json(await aggregateCohort({ companyId: Number(id), groups, source }));
+    } catch (e) {
+      console.error('GET /companies/:id/results/aggregate error:', e);
+      res.status(500).json({ error: 'Не удалось посчитать агрегаты по компании' });
+    }
+  }
+);
+
 module.exports = router;
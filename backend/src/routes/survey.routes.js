@@ -11,7 +11,7 @@ const db = require('../config/db');
 const SurveyAssignment = require('../models/SurveyAssignment');
 const SurveyResponse = require('../models/SurveyResponse');
 const SurveyResult = require('../models/SurveyResult');
-const { analyzeResults } = require('../services/analysis.service');
+const { analyzeResults, refreshPartialResults, incrementalScoringEnabled } = require('../services/analysis.service');
 const authenticateToken = require('../middleware/authenticateToken');
 const checkRole = require('../middleware/checkRole');
 
@@ -197,6 +197,14 @@ router.post('/public/survey/:uniqueLink/complete', async (req, res) => {
          WHERE id = $1`,
         [a.id]
       );
+      // Промежуточный расчёт после М1 (только при ANALYZER_INCREMENTAL=1): анализатор сохраняет
+      // состояние, и финальный /analyze досчитает только ответы М2. Ошибка здесь — в том числе
+      // синхронная — не мешает завершению модуля.
+      if (incrementalScoringEnabled) {
+        Promise.resolve()
+          .then(() => refreshPartialResults(a.id))
+          .catch(err => console.error('partial analyze error:', err.message));
+      }
       return res.json({ status: 'completed_m1' });
     }
 
@@ -1,23 +1,98 @@
 // backend/src/services/analysis.service.js
-// Интеграция с Python FastAPI анализатором: POST /analyze { assignment_id } -> results[].
+// Интеграция с Python FastAPI анализатором.
+// Завершение исследования идёт через очередь заданий анализатора:
+// POST /jobs/analyze { assignment_id, persist } -> job_id, затем опрос GET /jobs/:id до done/failed.
+// Так запрос не упирается в таймаут одного HTTP-вызова, когда анализатор нагружен.
+// Ответы с результатами запрашиваются в MessagePack (ANALYZER_MSGPACK=1, по умолчанию):
+// компактнее JSON и быстрее разбирается; анализатор без msgpack отвечает JSON — тип берётся из Content-Type.
 
 const axios = require('axios');
-const SurveyResult = require('../models/SurveyResult');
+const { unpack } = require('msgpackr');
 const SurveyAssignment = require('../models/SurveyAssignment');
 
-async function analyzeResults(assignmentId) {
+const JOB_POLL_INTERVAL_MS = Number(process.env.ANALYZER_JOB_POLL_MS || 300);
+const JOB_DEADLINE_MS = Number(process.env.ANALYZER_JOB_DEADLINE_MS || 120000);
+
+const ANALYZER_MSGPACK = (process.env.ANALYZER_MSGPACK || '1') === '1';
+// Тот же флаг, что у анализатора: без сохранённого состояния промежуточный расчёт
+// ничего не ускоряет, а только добавляет полный /analyze на каждое завершение модуля
+const incrementalScoringEnabled = process.env.ANALYZER_INCREMENTAL === '1';
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Опции axios для ответов с результатами: тело читается как Buffer и разбирается в decodeResponse
+function resultRequest(timeout) {
+  if (!ANALYZER_MSGPACK) return { timeout };
+  return { timeout, responseType: 'arraybuffer', headers: { Accept: 'application/msgpack, application/json' } };
+}
+
+function decodeResponse({ data, headers }) {
+  if (!Buffer.isBuffer(data)) return data;
+  if (String(headers['content-type'] || '').startsWith('application/msgpack')) return unpack(data);
+  return JSON.parse(data.toString('utf8'));
+}
+
+// Ставит задание в очередь анализатора и ждёт результат; 429 (очередь заполнена) — повтор после паузы
+async function runAnalysisJob(body) {
   const baseURL = process.env.ANALYZER_BASE_URL || 'http://analyzer:8000';
+  const deadline = Date.now() + JOB_DEADLINE_MS;
+
+  let job;
+  while (!job) {
+    try {
+      ({ data: job } = await axios.post(`${baseURL}/jobs/analyze`, body, { timeout: 10000 }));
+    } catch (e) {
+      if (e.response?.status !== 429 || Date.now() > deadline) throw e;
+      await sleep(Number(e.response.headers['retry-after'] || 1) * 1000);
+    }
+  }
+
+  while (Date.now() < deadline) {
+    const data = decodeResponse(await axios.get(`${baseURL}/jobs/${job.job_id}`, resultRequest(10000)));
+    if (data.status === 'done') return data.result;
+    if (data.status === 'failed') throw new Error(`Ошибка анализатора: ${data.error}`);
+    await sleep(JOB_POLL_INTERVAL_MS);
+  }
+  throw new Error(`Задание анализатора ${job.job_id} не завершилось за ${JOB_DEADLINE_MS} мс`);
+}
 
-  const { data } = await axios.post(`${baseURL}/analyze`, { assignment_id: assignmentId }, { timeout: 25000 });
+async function analyzeResults(assignmentId) {
+  // persist: анализатор сам сохраняет результаты в survey_results одним upsert
+  const result = await runAnalysisJob({ assignment_id: assignmentId, persist: true, priority: 'interactive' });
+  const results = result?.results?.[0]?.results;
 
-  if (!data || !Array.isArray(data.results)) {
+  if (!Array.isArray(results)) {
     throw new Error('Неверный ответ анализатора: нет массива results');
   }
 
-  await SurveyResult.bulkInsert(assignmentId, data.results);
   await SurveyAssignment.markAsCompleted(assignmentId);
 
-  return data.results;
+  return results;
+}
+
+// Промежуточные результаты (например, после М1) — без сохранения в survey_results
+// и без смены статуса назначения. При ANALYZER_INCREMENTAL=1 анализатор при этом
+// продвигает сохранённое состояние расчёта.
+async function refreshPartialResults(assignmentId) {
+  const baseURL = process.env.ANALYZER_BASE_URL || 'http://analyzer:8000';
+
+  const data = decodeResponse(await axios.post(`${baseURL}/analyze`, { assignment_id: assignmentId, persist: false }, resultRequest(25000)));
+
+  return data && Array.isArray(data.results) ? data.results : [];
+}
+
+// Распределения результатов по компании и подразделениям считает анализатор за один проход;
+// groups: { "Подразделение": [assignment_id, ...] } — отделы расшифровываются здесь, в backend.
+async function aggregateCohort({ companyId, groups = {}, source = 'stored' }) {
+  const baseURL = process.env.ANALYZER_BASE_URL || 'http://analyzer:8000';
+
+  const data = decodeResponse(await axios.post(`${baseURL}/cohorts/aggregate`, { company_id: companyId, groups, source }, resultRequest(120000)));
+
+  if (!data || !data.cohort) {
+    throw new Error('Неверный ответ анализатора: нет агрегатов когорты');
+  }
+
+  return data;
 }
 
-module.exports = { analyzeResults };
+module.exports = { analyzeResults, refreshPartialResults, aggregateCohort, incrementalScoringEnabled };
@@ -13,7 +13,9 @@ jest.mock('../services/analysis.service', () => ({
       { parameter_name: 'Creativity', raw_score: 12, standardized_score: 65, interpretation_text: 'Высокая креативность' },
       { parameter_name: 'Leadership', raw_score: 9, standardized_score: 55, interpretation_text: 'Хорошие лидерские качества' },
     ];
-  }
+  },
+  refreshPartialResults: async () => [],
+  incrementalScoringEnabled: true,
 }));
 
 const app = require('../app');